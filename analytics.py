@@ -0,0 +1,278 @@
+# --- โหมดวิเคราะห์แบบคอลัมน์ในหน่วยความจำ (Columnar Analytics) -- ไม่บังคับ ---
+#
+# สำหรับรายงานที่รวมยอดทั้งประวัติ (สรุปตามหมวดหมู่, ยอดทุกกระเป๋า, เทียบรายปี) ของผู้ใช้ที่มีธุรกรรมเป็นล้านแถว:
+#   1. โหลดธุรกรรมทั้งหมดของผู้ใช้ครั้งเดียว เก็บเป็น array ของ NumPy แยกตามคอลัมน์ (~20 ไบต์ต่อแถว)
+#   2. Query = กรองด้วย boolean mask + รวมยอดด้วย np.bincount (ไม่มีลูป Python ต่อแถว)
+#   3. เขียนธุรกรรม -> ต่อท้าย "แถวเปลี่ยนแปลง" (ลบ/แก้ = แถวติดลบ) ไม่ต้องโหลดใหม่ทั้งก้อน
+#   4. เก็บไว้ใน LRU ต่อ worker จำกัดจำนวนแถวรวม (ANALYTICS_MAX_ROWS) ผู้ใช้ที่ไม่ได้ใช้นานสุดถูกลบก่อน
+#
+# ต้องติดตั้ง numpy (pip install numpy) และตั้ง ANALYTICS_ENGINE=columnar
+#
+# ไฟล์นี้ไม่ import app.py
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EPOCH = date(1970, 1, 1).toordinal()
+TYPE_NAMES = ('income', 'expense')
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+GROUP_KEYS = ('wallet', 'category', 'type', 'year', 'month')
+
+# (ชื่อ, ชนิด) ของแต่ละคอลัมน์
+COLUMNS = (
+    ('day', 'int32'),       # วันที่ นับวันจาก 1970-01-01
+    ('month', 'int16'),     # เดือน นับจาก 1970-01 (ปี = month // 12 + 1970)
+    ('amount', 'int64'),    # จำนวนเงินหน่วยสตางค์ (แถวยกเลิก = ติดลบ)
+    ('count', 'int8'),      # +1 = แถวปกติ, -1 = แถวยกเลิก
+    ('wallet', 'int16'),    # รหัสกระเป๋า (index ใน wallet_ids)
+    ('category', 'int16'),  # รหัสหมวดหมู่ (0 = ไม่มีหมวดหมู่)
+    ('type', 'int8'),       # 0 = income, 1 = expense
+)
+
+# ถ้าจำนวนกลุ่มที่เป็นไปได้ไม่เกินนี้ ใช้ bincount ตรง ๆ (เร็วสุด) ไม่อย่างนั้นใช้ np.unique ก่อน
+DIRECT_BINCOUNT_LIMIT = 1 << 20
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError('ANALYTICS_ENGINE=columnar ต้องติดตั้งแพ็กเกจ numpy ก่อน (pip install numpy)')
+
+
+def _day(value):
+    return value.toordinal() - EPOCH
+
+
+class ColumnarLedger:
+    # ธุรกรรมทั้งหมดของผู้ใช้ 1 คน (version = เวอร์ชันของข้อมูลตอนโหลด ดู LedgerCache)
+    def __init__(self, version, capacity=1024):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.size = 0
+        self.cancelled = 0
+        self.wallet_ids = []
+        self.category_ids = [None]
+        self._wallet_codes = {}
+        self._category_codes = {None: 0}
+        self._columns = {name: np.empty(capacity, dtype) for name, dtype in COLUMNS}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns.values())
+
+    def _code(self, codes, ids, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(ids)
+            ids.append(value)
+        return code
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(self._columns['day'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # สร้าง array ใหม่ (Query ที่กำลังอ่าน array เดิมอยู่ไม่ได้รับผลกระทบ)
+        for name, dtype in COLUMNS:
+            grown = np.empty(capacity, dtype)
+            grown[:self.size] = self._columns[name][:self.size]
+            self._columns[name] = grown
+
+    def append(self, rows):
+        # rows = [(date, จำนวนเงินหน่วยสตางค์, wallet_id, category_id, 'income'/'expense', +1/-1), ...]
+        rows = [row for row in rows if row[4] in TYPE_CODES]
+        if not rows:
+            return
+        with self._lock:
+            self._reserve(len(rows))
+            start, end = self.size, self.size + len(rows)
+            columns = self._columns
+            days = np.fromiter((_day(row[0]) for row in rows), np.int32, len(rows))
+            columns['day'][start:end] = days
+            columns['month'][start:end] = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+            columns['amount'][start:end] = np.fromiter((row[1] for row in rows), np.int64, len(rows))
+            columns['count'][start:end] = np.fromiter((row[5] for row in rows), np.int8, len(rows))
+            columns['wallet'][start:end] = np.fromiter(
+                (self._code(self._wallet_codes, self.wallet_ids, row[2]) for row in rows), np.int16, len(rows))
+            columns['category'][start:end] = np.fromiter(
+                (self._code(self._category_codes, self.category_ids, row[3]) for row in rows), np.int16, len(rows))
+            columns['type'][start:end] = np.fromiter((TYPE_CODES[row[4]] for row in rows), np.int8, len(rows))
+            self.cancelled += sum(1 for row in rows if row[5] < 0)
+            self.size = end
+
+    def _snapshot(self):
+        # array ที่ใช้ตอบ Query นี้ (แถวที่ต่อท้ายระหว่าง Query จะไม่ถูกนับ)
+        with self._lock:
+            return {name: column[:self.size] for name, column in self._columns.items()}
+
+    def _mask(self, columns, date_from, date_to, wallet_ids, tx_type):
+        mask = np.ones(len(columns['day']), dtype=bool)
+        if date_from is not None:
+            mask &= columns['day'] >= _day(date_from)
+        if date_to is not None:
+            mask &= columns['day'] <= _day(date_to)
+        if wallet_ids is not None:
+            codes = [self._wallet_codes[w] for w in wallet_ids if w in self._wallet_codes]
+            mask &= np.isin(columns['wallet'], codes)
+        if tx_type is not None:
+            mask &= columns['type'] == TYPE_CODES[tx_type]
+        return mask
+
+    def group_sum(self, by, date_from=None, date_to=None, wallet_ids=None, tx_type=None):
+        # คืนค่า {(key, ...): (ยอดรวมหน่วยสตางค์, จำนวนธุรกรรม)} เรียงตาม by
+        # by เลือกจาก GROUP_KEYS: wallet -> wallet_id, category -> category_id (None = ไม่มีหมวดหมู่),
+        #                        type -> 'income'/'expense', year -> 2025, month -> (2025, 1)
+        unknown = set(by) - set(GROUP_KEYS)
+        if unknown:
+            raise ValueError(f'unknown group key(s): {", ".join(sorted(unknown))}')
+        columns = self._snapshot()
+        mask = self._mask(columns, date_from, date_to, wallet_ids, tx_type)
+        if not mask.any():
+            return {}
+
+        # รวมทุก key เป็นเลขเดียว (mixed radix) แล้วรวมยอดด้วย bincount ครั้งเดียว
+        keys, radices, offsets = [], [], []
+        for name in by:
+            values = columns['month'][mask] // 12 if name == 'year' else columns[name][mask]
+            values = values.astype(np.int64)
+            low, high = int(values.min()), int(values.max())
+            keys.append(values - low)
+            radices.append(high - low + 1)
+            offsets.append(low)
+        composite = np.zeros(int(mask.sum()), dtype=np.int64)
+        for values, radix in zip(keys, radices):
+            composite = composite * radix + values
+
+        amounts = columns['amount'][mask]
+        counts = columns['count'][mask]
+        space = int(np.prod(radices, dtype=np.int64)) if radices else 1
+        # float64 รวมจำนวนเต็มได้แม่นยำถึง 2**53 สตางค์ (~9 หมื่นล้านล้านบาท)
+        if space <= DIRECT_BINCOUNT_LIMIT:
+            groups = np.flatnonzero(np.bincount(composite, minlength=space))
+            totals = np.bincount(composite, weights=amounts, minlength=space)[groups]
+            numbers = np.bincount(composite, weights=counts, minlength=space)[groups]
+        else:
+            groups, inverse = np.unique(composite, return_inverse=True)
+            totals = np.bincount(inverse, weights=amounts)
+            numbers = np.bincount(inverse, weights=counts)
+        totals = np.rint(totals)
+
+        result = {}
+        for group, total, number in zip(groups.tolist(), totals.tolist(), numbers.tolist()):
+            if not number and not total:
+                continue  # ธุรกรรมที่ถูกลบไปแล้วทั้งหมด
+            parts = []
+            for radix in reversed(radices):
+                group, part = divmod(group, radix)
+                parts.append(part)
+            key = tuple(self._decode(name, part + offset)
+                        for name, part, offset in zip(by, reversed(parts), offsets))
+            result[key] = (int(total), int(number))
+        return result
+
+    def _decode(self, name, value):
+        if name == 'wallet':
+            return self.wallet_ids[value]
+        if name == 'category':
+            return self.category_ids[value]
+        if name == 'type':
+            return TYPE_NAMES[value]
+        if name == 'year':
+            return value + 1970
+        return value // 12 + 1970, value % 12 + 1
+
+
+class LedgerCache:
+    # LRU ของ ColumnarLedger ต่อ worker จำกัดจำนวนแถวรวม
+    # ความสดของข้อมูลตรวจด้วย "เวอร์ชัน" ต่อผู้ใช้ (เพิ่มทุกครั้งที่มีการเขียนธุรกรรม ดู apply)
+    def __init__(self, max_rows, max_age=None, batch_size=50000):
+        require_numpy()
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.rows = 0
+        self.hits = 0
+        self.loads = 0
+        self._ledgers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._ledgers), 'rows': self.rows, 'max_rows': self.max_rows,
+                    'bytes': sum(ledger.nbytes for ledger in self._ledgers.values()),
+                    'hits': self.hits, 'loads': self.loads}
+
+    def _fresh(self, ledger, version):
+        return ledger.version == version and \
+            (not self.max_age or time.monotonic() - ledger.loaded_at < self.max_age)
+
+    def get(self, user_id, version, load_rows, still_current=None):
+        # load_rows() คืน iterator ของแถวแบบเดียวกับ ColumnarLedger.append (ไม่ต้องมีคอลัมน์ +1/-1)
+        # still_current() = เวอร์ชันยังเป็น version อยู่หรือไม่ (ถ้ามีการเขียนระหว่างโหลด จะไม่เก็บลง Cache)
+        with self._lock:
+            ledger = self._ledgers.get(user_id)
+            if ledger is not None and self._fresh(ledger, version):
+                self._ledgers.move_to_end(user_id)
+                self.hits += 1
+                return ledger
+
+        ledger = ColumnarLedger(version)
+        batch = []
+        for row in load_rows():
+            batch.append(tuple(row) + (1,))
+            if len(batch) >= self.batch_size:
+                ledger.append(batch)
+                batch = []
+        ledger.append(batch)
+
+        with self._lock:
+            self.loads += 1
+            if still_current is not None and not still_current():
+                return ledger
+            self._store(user_id, ledger)
+        return ledger
+
+    def _store(self, user_id, ledger):
+        self._remove(user_id)
+        if ledger.size > self.max_rows:
+            return
+        self._ledgers[user_id] = ledger
+        self.rows += ledger.size
+        while self.rows > self.max_rows:
+            self._remove(next(iter(self._ledgers)))
+
+    def _remove(self, user_id):
+        ledger = self._ledgers.pop(user_id, None)
+        if ledger is not None:
+            self.rows -= ledger.size
+
+    def evict(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+
+    def apply(self, user_id, expected_version, new_version, rows):
+        # เรียกหลัง commit: rows = แถวเปลี่ยนแปลง
+        # ต่อท้ายได้เฉพาะเมื่อ Cache อยู่ที่ expected_version (เวอร์ชันก่อนการเขียนครั้งนี้) พอดี
+        # ไม่อย่างนั้นอาจขาด/ซ้ำ -> ลบทิ้งให้โหลดใหม่ (รวมถึงกรณีแถวยกเลิกเกินครึ่งหนึ่ง)
+        with self._lock:
+            ledger = self._ledgers.get(user_id)
+            if ledger is None:
+                return
+            cancelled = ledger.cancelled + sum(1 for row in rows if row[5] < 0)
+            if ledger.version != expected_version or cancelled * 2 > ledger.size + len(rows):
+                self._remove(user_id)
+                return
+            ledger.append(rows)
+            ledger.version = new_version
+            self.rows += len(rows)
+            while self.rows > self.max_rows:
+                self._remove(next(iter(self._ledgers)))
@@ -1,58 +1,218 @@
+import json
 import os
-from flask import Flask
+import socket
+import textwrap
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from flask import Flask, current_app, make_response
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from flask import render_template, request, redirect, url_for, flash, jsonify
-from datetime import datetime
-
-from sqlalchemy import func
+from flask_login import LoginManager, UserMixin
+from flask import render_template, request, url_for, flash, jsonify
+from flask import g, has_request_context, before_render_template, template_rendered
+from flask import session as client_session
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
+from markupsafe import Markup
+from flask.cli import AppGroup
+from werkzeug.local import LocalProxy
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import click
+from sqlalchemy import func, update, and_, or_, bindparam, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.sql.elements import BindParameter
+
+import migrations
+from audit import AuditWriter, audit_record, to_json_value
+from cache import create_cache
+from dbconfig import build_engine_options, check_connection_budget, instrument_engine, pool_stats
+from importers import chunked
+from partitioning import DEFAULT_HASH_PARTITIONS, PARTITION_SCHEMES, partition_statements, year_partition_sql
+from metrics import COUNT_BUCKETS, Registry
+from ratelimit import TokenBucketLimiter, check_limits
+from rates import ExchangeRates, format_money, iter_rate_rows, month_end
+from recurrence import occurrences
+from search import description_search_filter
 
 
 # --- 1. ตั้งค่าแอปพลิเคชัน (App Setup) ---
-app = Flask(__name__)
-
-############################################################################
-
-try:
-    # 1. พยายามดึงค่าจากไฟล์ config.py (สำหรับรันบน Local PC)
-    from config import YOUR_CONNECTION_STRING, YOUR_SECRET_KEY
-
-    print("--- Loading config from local config.py file (Development) ---")
-
-    app.config['SQLALCHEMY_DATABASE_URI'] = YOUR_CONNECTION_STRING
-    app.config['SECRET_KEY'] = YOUR_SECRET_KEY
-
-except ImportError:
-    # 2. ถ้า import ล้มเหลว (แปลว่ารันบน Render เพราะไม่มีไฟล์ config.py)
-    #    ให้ดึงค่าจาก Environment Variables แทน
-    print("--- Loading config from Environment Variables (Production) ---")
-
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI')
-    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+# (อัปเกรด!) ไม่สร้างแอปตอน import แล้ว -> เรียก create_app() (ท้ายไฟล์) ซึ่งอ่าน config, ผูก Extension และ Blueprint
+#   flask --app app run                      (Flask หา create_app ให้เอง)
+#   gunicorn -c gunicorn.conf.py wsgi:app    (ดู gunicorn.conf.py เรื่อง --preload)
+
+def load_config(app, overrides=None):
+    try:
+        # 1. พยายามดึงค่าจากไฟล์ config.py (สำหรับรันบน Local PC)
+        from config import YOUR_CONNECTION_STRING, YOUR_SECRET_KEY
+
+        app.logger.info('Loading config from local config.py file (Development)')
+
+        app.config['SQLALCHEMY_DATABASE_URI'] = YOUR_CONNECTION_STRING
+        app.config['SECRET_KEY'] = YOUR_SECRET_KEY
+
+    except ImportError:
+        # 2. ถ้า import ล้มเหลว (แปลว่ารันบน Render เพราะไม่มีไฟล์ config.py)
+        #    ให้ดึงค่าจาก Environment Variables แทน
+        app.logger.info('Loading config from Environment Variables (Production)')
+
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI')
+        app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+
+    # (ใหม่!) ตั้งค่า Cache (ดู cache.py) -- ค่าเริ่มต้นคือเก็บใน RAM ของแต่ละ worker
+    # ถ้ารันหลาย worker ควรใช้ 'redis' ไม่อย่างนั้น worker อื่นอาจเห็นข้อมูลเก่าได้นานสุด CACHE_TTL วินาที
+    app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')  # 'memory' หรือ 'redis'
+    app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))  # วินาที
+
+    # (ใหม่!) ความยากของ bcrypt (ทุก +1 = ช้าลง 2 เท่า) เปลี่ยนค่าได้ รหัสผ่านเก่าจะถูก hash ใหม่ตอนล็อกอินครั้งถัดไป
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    # จำนวน Thread ที่คำนวณ bcrypt พร้อมกันได้ และจำนวนที่รอคิวได้ (เกินนี้ตอบ 503 ทันที)
+    app.config['BCRYPT_MAX_WORKERS'] = int(os.environ.get('BCRYPT_MAX_WORKERS', os.cpu_count() or 2))
+    app.config['BCRYPT_MAX_PENDING'] = int(os.environ.get('BCRYPT_MAX_PENDING', 32))
+    # จำกัดความถี่การล็อกอิน/สมัคร (ต่อ username และต่อ IP): burst = ทำติดกันได้กี่ครั้ง, per_minute = เติมคืนนาทีละกี่ครั้ง
+    app.config['LOGIN_LIMIT_USER_BURST'] = int(os.environ.get('LOGIN_LIMIT_USER_BURST', 5))
+    app.config['LOGIN_LIMIT_USER_PER_MINUTE'] = float(os.environ.get('LOGIN_LIMIT_USER_PER_MINUTE', 5))
+    app.config['LOGIN_LIMIT_IP_BURST'] = int(os.environ.get('LOGIN_LIMIT_IP_BURST', 20))
+    app.config['LOGIN_LIMIT_IP_PER_MINUTE'] = float(os.environ.get('LOGIN_LIMIT_IP_PER_MINUTE', 30))
+    # ถ้ารันหลัง Reverse Proxy (เช่น Render) ให้ตั้งจำนวน Proxy เพื่อให้ได้ IP จริงของผู้ใช้จาก X-Forwarded-For
+    app.config['PROXY_COUNT'] = int(os.environ.get('PROXY_COUNT', 0))
+    # ถ้าตั้งค่านี้ จะเปิด /internal/pool ให้ดูสถิติ pool ได้ (ส่ง header: Authorization: Bearer <token>)
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    # (ใหม่!) request ที่ช้ากว่านี้ (ms) จะถูกเขียนลง log พร้อม Query ที่ช้าที่สุด
+    app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 500))
+    # (ใหม่!) สร้างธุรกรรมที่เกิดซ้ำทุก ๆ กี่วินาที (Thread ในแต่ละ worker) 0 = ปิด แล้วใช้ "flask recurring run" กับ cron แทน
+    app.config['RECURRING_SCHEDULER_INTERVAL'] = float(os.environ.get('RECURRING_SCHEDULER_INTERVAL', 0))
+    # (ใหม่!) สกุลเงินที่ใช้แสดงยอดรวมข้ามกระเป๋า/รายงาน/งบประมาณ (ต้องตรงกับสกุลเงินหลักของไฟล์อัตราแลกเปลี่ยน)
+    app.config['REPORTING_CURRENCY'] = os.environ.get('REPORTING_CURRENCY', 'THB').upper()
+    # (ใหม่!) ฐานข้อมูลสำรองสำหรับอ่านอย่างเดียว (Read Replica) หน้าที่อ่านอย่างเดียวจะ Query ที่นี่แทน (ไม่ตั้ง = ใช้ตัวหลักอย่างเดียว)
+    app.config['SQLALCHEMY_REPLICA_URI'] = os.environ.get('SQLALCHEMY_REPLICA_URI')
+    # หลังผู้ใช้เขียนข้อมูล ให้อ่านจากตัวหลักต่ออีกกี่วินาที (ต้องนานกว่าความล่าช้าของ replica) จะได้เห็นสิ่งที่เพิ่งบันทึก
+    app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    # (ใหม่!) รายงานรวมยอดทั้งประวัติ (สรุปหมวดหมู่, ยอดกระเป๋า) คำนวณจากสำเนาแบบคอลัมน์ใน RAM แทน SQL (ดู analytics.py)
+    # 'sql' = ปิด (ค่าเริ่มต้น), 'columnar' = เปิด (ต้องติดตั้ง numpy) ใช้ RAM ~20 ไบต์ต่อธุรกรรมต่อ worker
+    app.config['ANALYTICS_ENGINE'] = os.environ.get('ANALYTICS_ENGINE', 'sql')
+    # จำนวนธุรกรรมรวมสูงสุดที่เก็บไว้ต่อ worker (เกินแล้วลบของผู้ใช้ที่ไม่ได้ใช้นานสุดออก)
+    app.config['ANALYTICS_MAX_ROWS'] = int(os.environ.get('ANALYTICS_MAX_ROWS', 5_000_000))
+    # (ใหม่!) บันทึกการเพิ่ม/แก้ไข/ลบข้อมูลทุกครั้งลงตาราง audit_log (ค่าก่อน/หลัง) ด้วย Thread เบื้องหลัง (ดู audit.py)
+    # เปิดเป็นค่าเริ่มต้น (ข้อกำหนดของผู้ตรวจสอบ) Thread และโฟลเดอร์ spool เริ่มเมื่อมีรายการแรกหลัง commit เท่านั้น
+    # -> process ที่ไม่เขียนข้อมูล (คำสั่ง CLI อ่านอย่างเดียว, benchmark เวลาเริ่มต้น) ไม่เริ่ม Thread และไม่สร้างโฟลเดอร์
+    app.config['AUDIT_LOG'] = os.environ.get('AUDIT_LOG', '1').lower() in ('1', 'true', 'yes', 'on')
+    # โฟลเดอร์ไฟล์ spool กันรายการหายตอน process ตาย (ต้องอยู่บนดิสก์ที่ไม่หายตอน restart) ไม่ตั้ง = instance/audit-spool
+    app.config['AUDIT_SPOOL_DIR'] = os.environ.get('AUDIT_SPOOL_DIR')
+    # เขียนลงฐานข้อมูลทีละกี่รายการ / รอรวมก้อนนานสุดกี่วินาที
+    app.config['AUDIT_BATCH_SIZE'] = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+    app.config['AUDIT_FLUSH_SECONDS'] = float(os.environ.get('AUDIT_FLUSH_SECONDS', 1.0))
+    # ฐานข้อมูลล่ม: ลองเขียนก้อนเดิมกี่ครั้งก่อนยอมแพ้ (รายการยังอยู่ในไฟล์ spool รอเขียนใหม่ ไม่บล็อก Thread ตลอดไป)
+    app.config['AUDIT_MAX_ATTEMPTS'] = int(os.environ.get('AUDIT_MAX_ATTEMPTS', 5))
+    # fsync ไฟล์ spool ทุกครั้ง (รอดไฟดับด้วย แต่ทุก commit ช้าลงตามความเร็วดิสก์)
+    app.config['AUDIT_FSYNC'] = os.environ.get('AUDIT_FSYNC', '0').lower() in ('1', 'true', 'yes', 'on')
+
+    # ค่าที่ส่งมากับ create_app(config) มาก่อนทุกอย่าง (เช่น สคริปต์ทดสอบ/benchmark)
+    app.config.update(overrides or {})
 
     # (สำคัญ!) ตรวจสอบว่า Render ตั้งค่าไว้ครบหรือไม่
     if not app.config['SQLALCHEMY_DATABASE_URI'] or not app.config['SECRET_KEY']:
-        print("ERROR: Environment variables are not set on the server!")
+        app.logger.error('Environment variables are not set on the server!')
+
+    # (ใหม่!) ขนาด Connection Pool / timeout ของฐานข้อมูล (ดูรายละเอียดใน dbconfig.py)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', build_engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    if app.config['SQLALCHEMY_REPLICA_URI']:
+        app.config['SQLALCHEMY_BINDS'] = {
+            'replica': dict(build_engine_options(app.config['SQLALCHEMY_REPLICA_URI']),
+                            url=app.config['SQLALCHEMY_REPLICA_URI']),
+        }
 # --- (จบส่วน Config) ---
 
 ############################################################################
 
+class RoutingSession(FlaskSQLAlchemySession):
+    # (ใหม่!) เลือกฐานข้อมูลทีละคำสั่ง: เขียน (flush / INSERT / UPDATE / DELETE) -> ตัวหลักเสมอ
+    # อ่านในหน้าที่ติด @read_replica -> replica (ดูส่วน replica ด้านล่าง)
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                mark_primary_write()
+            elif use_read_replica():
+                return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
 # สร้าง "ล่าม" แปล Python เป็น SQL
-db = SQLAlchemy(app)
+# (อัปเกรด!) Extension ทุกตัวสร้างไว้ก่อนแบบยังไม่ผูกกับแอป แล้วค่อย init_app ใน create_app()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # สร้าง "เครื่องเข้ารหัส" รหัสผ่าน
-bcrypt = Bcrypt(app)
+bcrypt = Bcrypt()
 
 # สร้าง "ผู้จัดการการล็อกอิน"
-login_manager = LoginManager(app)
-# (ยังไม่ต้องทำอะไรต่อ แค่สร้างไว้ก่อน)
-# ... หลังบรรทัด login_manager = LoginManager(app) ...
+login_manager = LoginManager()
+
+
+def app_service(name):
+    # ของที่ create_app() สร้างให้แต่ละแอป (เก็บใน app.extensions)
+    # ใช้ผ่านชื่อเดิมได้ทุกที่ที่มี app context เช่น cache.get(...)
+    return LocalProxy(lambda: current_app.extensions[name])
+
+
+# สร้าง "ที่เก็บ Cache"
+cache = app_service('cache')
+
+# (ใหม่!) Thread Pool สำหรับคำนวณ bcrypt (จำกัดจำนวนที่ทำพร้อมกัน ไม่ให้กิน CPU ทุก core)
+password_pool = app_service('password_pool')
+
+# (ใหม่!) ตัวจำกัดความถี่การล็อกอิน (ดู ratelimit.py)
+login_user_limiter = app_service('login_user_limiter')
+login_ip_limiter = app_service('login_ip_limiter')
+
 
 @login_manager.user_loader
 def load_user(user_id):
     # Flask-Login จะใช้ฟังก์ชันนี้เพื่อดึงข้อมูลผู้ใช้จาก ID ที่เก็บใน Session
-    return User.query.get(int(user_id))
+    # (อัปเกรด!) ถ้ามีใน Cache แล้วไม่ต้องยิง SELECT ทุก request
+    # หน้าเว็บใช้แค่ user_id / username จึงเก็บแค่นั้น (ไม่เก็บ password_hash ไว้ใน Cache)
+    # ของจาก Cache ถูกผูกเข้า Session เป็นแถวที่มีอยู่จริง (ไม่ยิง SELECT) คอลัมน์ที่ไม่ได้เก็บจะโหลดเองเมื่อถูกอ่าน
+    # แก้/ลบผู้ใช้ผ่าน ORM -> ลบออกจาก Cache หลัง commit (ดู _track_user_changes)
+    cache_key = f'user:{int(user_id)}'
+    cached = cache.get(cache_key)
+    if cached is not None:
+        user = User(user_id=cached['user_id'], username=cached['username'])
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, int(user_id))
+    if user is not None:
+        cache.set(cache_key, {'user_id': user.user_id, 'username': user.username})
+    return user
+
+
+def forget_cached_user(user_id):
+    # เรียกเองหลังแก้ตาราง users โดยไม่ผ่าน ORM (เช่น UPDATE แบบ bulk) ให้ load_user โหลดใหม่
+    cache.delete(f'user:{int(user_id)}')
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def _track_user_changes(session, flush_context):
+    changed = {obj.user_id for obj in list(session.dirty) + list(session.deleted)
+               if isinstance(obj, User) and (obj in session.deleted or session.is_modified(obj))}
+    if changed:
+        session.info.setdefault('users_changed', set()).update(changed)
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def _forget_changed_users(session):
+    for user_id in session.info.pop('users_changed', ()):
+        forget_cached_user(user_id)
+
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('users_changed', None)
 
 # --- 3. สร้าง "Route" หรือหน้าเว็บแรก (Homepage) ---
 # --- 3. สร้าง "โมเดล" (Database Models) ---
@@ -88,6 +248,8 @@ class Wallet(db.Model):
 
     wallet_id = db.Column(db.Integer, primary_key=True)
     wallet_name = db.Column(db.String(100), nullable=False)
+    # (ใหม่!) สกุลเงินของกระเป๋า (ISO 4217 เช่น 'THB', 'USD') ธุรกรรมในกระเป๋าเป็นสกุลเงินนี้ทั้งหมด
+    currency = db.Column(db.String(3), nullable=False, default='THB', server_default='THB')
 
     # --- นี่คือหัวใจของความสัมพันธ์ ---
     # 1. กำหนด Foreign Key ที่ชี้ไปหาตาราง users
@@ -97,6 +259,11 @@ class Wallet(db.Model):
     #    เพื่อให้เราเรียก .wallets จากฝั่ง User ได้ (เช่น current_user.wallets)
     user = db.relationship('User', backref='wallets')
 
+    # Index (ต้องตรงกับ migrations.py)
+    __table_args__ = (
+        db.Index('ix_wallets_user', 'user_id'),
+    )
+
 ########################################################################################
 
 class Transaction(db.Model):
@@ -112,18 +279,67 @@ class Transaction(db.Model):
 
     # --- หัวใจของความสัมพันธ์ ---
     # 1. Foreign Key ที่ชี้ไปหาตาราง wallets
-    wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.wallet_id'), nullable=False)
+    wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.wallet_id', ondelete='CASCADE'), nullable=False)
 
     # 2. Back Reference
     wallet = db.relationship('Wallet', backref='transactions')
 
     # --- (เพิ่มส่วนนี้เข้าไป!) ---
     # Foreign Key ที่ชี้ไปหา categories (จาก create_tables.py)
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.category_id'), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.category_id', ondelete='SET NULL'), nullable=True)
     # Back Reference
     category = db.relationship('Category', backref='transactions')
     # --- (จบส่วนที่เพิ่ม) ---
 
+    # Index สำหรับ Query ที่ใช้บ่อย (ต้องตรงกับ migrations.py)
+    __table_args__ = (
+        db.Index('ix_transactions_wallet_date', 'wallet_id', 'date', 'transaction_id'),
+        db.Index('ix_transactions_wallet_type_date', 'wallet_id', 'type', 'date'),
+        db.Index('ix_transactions_category', 'category_id'),
+    )
+    # index ค้นหา description (FTS5 / pg_trgm) สร้างใน migration 6 เท่านั้น (ดู search.py)
+
+########################################################################################
+
+# (ใหม่!) ตารางเก็บ "ยอดสะสม" ของแต่ละกระเป๋า
+# แทนที่จะต้องดึงธุรกรรมทั้งหมดมารวมใหม่ทุกครั้งที่เปิด Dashboard
+# ตารางนี้จะถูกอัปเดตพร้อมกับการเพิ่ม/แก้ไข/ลบธุรกรรม (ใน Transaction เดียวกัน)
+class WalletBalance(db.Model):
+    __tablename__ = 'wallet_balances'
+
+    wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.wallet_id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+
+    income_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)   # รายรับรวม
+    expense_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)  # รายจ่ายรวม
+    balance = db.Column(db.Numeric(14, 2), nullable=False, default=0)        # ยอดคงเหลือ
+
+########################################################################################
+
+# (ใหม่!) ยอดรวมรายเดือน แยกตาม กระเป๋า / หมวดหมู่ / ประเภท
+# อัปเดตทีละนิดทุกครั้งที่มีการเขียนธุรกรรม -> รายงานย้อนหลังหลายปีไม่ต้องสแกนตาราง transactions
+class MonthlyRollup(db.Model):
+    __tablename__ = 'monthly_rollups'
+
+    rollup_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.wallet_id', ondelete='CASCADE'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.category_id'), nullable=True)
+    type = db.Column(db.String(10), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)  # ยอดรวมของเดือน
+    tx_count = db.Column(db.Integer, nullable=False, default=0)      # จำนวนธุรกรรม
+
+    # Index (ต้องตรงกับ migrations.py)
+    # category_id เป็น NULL ได้ จึงใช้ COALESCE เพื่อให้ "ไม่มีหมวดหมู่" ซ้ำกันไม่ได้เหมือนกัน
+    __table_args__ = (
+        db.Index('ux_monthly_rollups_key', 'wallet_id', func.coalesce(category_id, 0), 'type', 'year', 'month',
+                 unique=True),
+        db.Index('ix_monthly_rollups_user_period', 'user_id', 'year', 'month'),
+    )
+
 ########################################################################################
 
 # (เพิ่ม Class ใหม่นี้เข้าไป)
@@ -141,91 +357,492 @@ class Category(db.Model):
     # Back Reference
     user = db.relationship('User', backref='categories')
 
+    # Index (ต้องตรงกับ migrations.py)
+    __table_args__ = (
+        db.Index('ix_categories_user_type', 'user_id', 'type'),
+    )
+
 ########################################################################################
-####################################home####################################################
-
-# --- 4. สร้าง Routes (หน้าเว็บ) ---
-
-# แก้ไขฟังก์ชัน @app.route("/") เดิม
-@app.route("/")
-def home():
-    # ตรวจสอบว่าผู้ใช้ล็อกอินอยู่หรือไม่
-    if current_user.is_authenticated:
-        # ถ้าล็อกอินแล้ว ให้ส่งไปหน้า Dashboard เลย
-        return redirect(url_for('dashboard'))
-
-    # ถ้ายังไม่ล็อกอิน ให้แสดงหน้าต้อนรับ
-    return render_template('landing.html')
-
-####################################register#######################################################
-
-# (เพิ่ม Route ใหม่นี้เข้ามา)
-@app.route("/register", methods=['GET', 'POST'])
-def register():
-    # ตรวจสอบว่าเป็นการ "ส่งข้อมูล" (POST) หรือแค่ "เปิดหน้าเว็บ" (GET)
-    if request.method == 'POST':
-        # 1. ดึงข้อมูลจากฟอร์ม
-        username = request.form.get('username')
-        password = request.form.get('password')
-
-        # 2. ตรวจสอบว่ามี username นี้ในระบบหรือยัง
-        existing_user = User.query.filter_by(username=username).first()
-        if existing_user:
-            flash('ชื่อผู้ใช้นี้มีคนใช้แล้ว กรุณาเลือกชื่ออื่น', 'danger')
-            return redirect(url_for('register'))
-
-        # 3. เข้ารหัสรหัสผ่าน (Hashing)
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-
-        # 4. สร้างผู้ใช้ใหม่ (ด้วย Model) และบันทึกลงฐานข้อมูล
-        new_user = User(username=username, password_hash=hashed_password)
-        db.session.add(new_user)
-        db.session.commit()
 
-        flash('ลงทะเบียนสำเร็จ! กรุณาล็อกอิน', 'success')
-        return redirect(url_for('login')) # (เดี๋ยวเราจะสร้างหน้า login ต่อไป)
+# (ใหม่!) ลำดับการเปลี่ยนแปลงของผู้ใช้แต่ละคน (ใช้กับ /api/sync)
+# ทุกครั้งที่ กระเป๋า/หมวดหมู่/ธุรกรรม ถูกเพิ่ม/แก้ไข/ลบ จะได้หมายเลข seq ใหม่ที่มากขึ้นเรื่อย ๆ
+class SyncCounter(db.Model):
+    __tablename__ = 'sync_counters'
 
-    # 5. ถ้าเป็นการเปิดหน้าเว็บ (GET) ให้แสดงไฟล์ HTML
-    return render_template('register.html')
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
+    last_seq = db.Column(db.BigInteger, nullable=False, default=0)  # seq ล่าสุดที่แจกไปแล้ว
 
-#######################################login#################################################
 
-@app.route("/login", methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
-        # 1. ดึงข้อมูลจากฟอร์ม
-        username = request.form.get('username')
-        password = request.form.get('password')
+# เก็บแค่ "การเปลี่ยนแปลงล่าสุด" ของแต่ละรายการ (1 แถวต่อ 1 รายการ ไม่ใช่ 1 แถวต่อ 1 ครั้งที่แก้)
+# deleted = True คือ tombstone (รายการถูกลบไปแล้ว)
+class SyncChange(db.Model):
+    __tablename__ = 'sync_changes'
 
-        # 2. ค้นหาผู้ใช้ในฐานข้อมูล
-        user = User.query.filter_by(username=username).first()
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
+    entity = db.Column(db.String(20), primary_key=True)  # 'wallet', 'category', 'transaction'
+    entity_id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.BigInteger, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
 
-        # 3. ตรวจสอบผู้ใช้และรหัสผ่าน
-        # (ตรวจสอบว่า user มีอยู่จริง และ รหัสผ่านที่เข้ารหัสไว้ ตรงกับ รหัสผ่านที่กรอกมา)
-        if user and bcrypt.check_password_hash(user.password_hash, password):
-            # 4. ล็อกอินผู้ใช้สำเร็จ (Flask-Login จะสร้าง Session)
-            login_user(user)
-            flash('ล็อกอินสำเร็จ!', 'success')
-            return redirect(url_for('dashboard')) # (เดี๋ยวเราจะสร้างหน้า dashboard ต่อไป)
-        else:
-            flash('ชื่อผู้ใช้หรือรหัสผ่านไม่ถูกต้อง', 'danger')
-            return redirect(url_for('login'))
+    # Index (ต้องตรงกับ migrations.py)
+    __table_args__ = (
+        db.Index('ix_sync_changes_user_seq', 'user_id', 'seq'),
+    )
 
-    # 5. ถ้าเป็น GET (เปิดหน้าเว็บ) ให้แสดงไฟล์ HTML
-    return render_template('login.html')
+########################################################################################
+
+# (ใหม่!) ธุรกรรมที่เกิดซ้ำ (เงินเดือน, ค่าสมาชิกรายเดือน ฯลฯ)
+# งานเบื้องหลังจะสร้างธุรกรรมให้เมื่อถึงวัน next_run แล้วเลื่อน next_run ไปครั้งถัดไป (ดู recurrence.py)
+class RecurringRule(db.Model):
+    __tablename__ = 'recurring_rules'
+
+    rule_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.wallet_id', ondelete='CASCADE'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.category_id', ondelete='SET NULL'), nullable=True)
+
+    # ค่าของธุรกรรมที่จะถูกสร้าง
+    description = db.Column(db.Text, nullable=True)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    type = db.Column(db.String(10), nullable=False)
+
+    # 'daily', 'weekly', 'monthly', 'yearly' (ทุก ๆ interval) หรือ 'rrule' (ใช้ค่าในคอลัมน์ rrule)
+    frequency = db.Column(db.String(10), nullable=False)
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    rrule = db.Column(db.String(255), nullable=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=True)
+
+    next_run = db.Column(db.Date, nullable=False)  # วันที่ของครั้งถัดไปที่ยังไม่ได้สร้าง
+    active = db.Column(db.Boolean, nullable=False, default=True)  # False = จบกฎแล้ว
+
+    # Index (ต้องตรงกับ migrations.py)
+    __table_args__ = (
+        db.Index('ix_recurring_rules_due', 'active', 'next_run'),
+        db.Index('ix_recurring_rules_user', 'user_id'),
+    )
+
+
+# ใครถือสิทธิ์รันงานเบื้องหลังอยู่ และถึงเมื่อไร (เวลา UTC)
+class SchedulerLease(db.Model):
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+########################################################################################
+
+# (ใหม่!) งบประมาณรายเดือนของหมวดหมู่รายจ่าย (1 หมวดหมู่ = 1 งบ ใช้ยอดเดียวกันทุกเดือน)
+class Budget(db.Model):
+    __tablename__ = 'budgets'
+
+    budget_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.category_id', ondelete='CASCADE'),
+                            nullable=False, unique=True)
+    amount = db.Column(db.Numeric(14, 2), nullable=False)  # วงเงินต่อเดือน
+
+    # Index (ต้องตรงกับ migrations.py)
+    __table_args__ = (
+        db.Index('ix_budgets_user', 'user_id'),
+    )
+
+
+# ยอดที่ใช้ไปของงบแต่ละเดือน อัปเดตพร้อมกับการเขียนธุรกรรม (เหมือน MonthlyRollup)
+# -> Dashboard แสดงความคืบหน้าของทุกงบได้โดยไม่ต้อง SUM ธุรกรรม
+class BudgetUsage(db.Model):
+    __tablename__ = 'budget_usage'
+
+    budget_id = db.Column(db.Integer, db.ForeignKey('budgets.budget_id', ondelete='CASCADE'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    spent = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    # ระดับการแจ้งเตือนสูงสุดที่ส่งไปแล้วในเดือนนี้ (0, 80, 100) กันแจ้งซ้ำ
+    alert_level = db.Column(db.Integer, nullable=False, default=0)
+
+
+# การแจ้งเตือนที่รอผู้ใช้อ่าน (เช่น ใช้งบเกิน 80%)
+# ถูกเขียนใน Transaction เดียวกับธุรกรรมที่ทำให้เกิด -> ไม่มีการแจ้งเตือนของธุรกรรมที่ถูก rollback
+class Notification(db.Model):
+    __tablename__ = 'notifications'
 
-####################################dashboard########################################################
+    notification_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    kind = db.Column(db.String(30), nullable=False)  # เช่น 'budget_80', 'budget_100'
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    is_read = db.Column(db.Boolean, nullable=False, default=False)
+
+    # Index (ต้องตรงกับ migrations.py)
+    __table_args__ = (
+        db.Index('ix_notifications_user_unread', 'user_id', 'is_read', 'notification_id'),
+    )
+
+########################################################################################
+
+# (ใหม่!) อัตราแลกเปลี่ยน: 1 หน่วยของ currency = rate หน่วยของ REPORTING_CURRENCY ณ rate_date
+class ExchangeRate(db.Model):
+    __tablename__ = 'exchange_rates'
+
+    currency = db.Column(db.String(3), primary_key=True)
+    rate_date = db.Column(db.Date, primary_key=True)
+    rate = db.Column(db.Numeric(18, 8), nullable=False)
+
+########################################################################################
+
+# (ใหม่!) ประวัติการเปลี่ยนแปลงข้อมูล 1 แถวต่อการเพิ่ม/แก้ไข/ลบ 1 รายการ (ดูส่วน audit ด้านล่าง)
+# old_values / new_values เป็น JSON ของทั้งแถว (create ไม่มี old_values, delete ไม่มี new_values)
+class AuditLog(db.Model):
+    __tablename__ = 'audit_log'
+
+    audit_id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    event_id = db.Column(db.String(32), nullable=False, unique=True)
+    occurred_at = db.Column(db.DateTime, nullable=False)  # เวลา UTC
+    actor_id = db.Column(db.Integer, nullable=True)  # ผู้ใช้ที่ทำ (None = งานเบื้องหลัง / CLI)
+    entity = db.Column(db.String(20), nullable=False)  # 'user', 'wallet', 'category', 'transaction', ...
+    entity_id = db.Column(db.Integer, nullable=True)
+    action = db.Column(db.String(10), nullable=False)  # 'create', 'update', 'delete'
+    old_values = db.Column(db.Text, nullable=True)
+    new_values = db.Column(db.Text, nullable=True)
+    source = db.Column(db.String(200), nullable=True)  # เช่น 'POST /add_transaction', 'flask recurring run'
+
+    # Index (ต้องตรงกับ migrations.py)
+    __table_args__ = (
+        db.Index('ix_audit_log_entity', 'entity', 'entity_id', 'audit_id'),
+        db.Index('ix_audit_log_actor', 'actor_id', 'audit_id'),
+    )
+
+########################################################################################
+####################################aggregation#############################################
+
+# รวมยอดเงินด้วย SQL (SUM ... GROUP BY) แทนการดึงธุรกรรมทุกแถวมาบวกใน Python
+# - รวมเป็น "สตางค์" (จำนวนเต็ม) เพื่อไม่ให้เกิดเศษทศนิยมเพี้ยน (โดยเฉพาะบน SQLite)
+# - ผลลัพธ์ที่ส่งกลับเป็น Decimal ทั้งหมด
 
-@app.route("/dashboard")
-@login_required
-def dashboard():
-    # --- 1. (อัปเกรด!) อ่านค่า Filter จาก URL ---
-    # ใช้ .get() เพื่อดึงค่า 'date_from' และ 'date_to'
+def _minor_to_decimal(value):
+    # แปลงยอดรวมหน่วยสตางค์ (เช่น 12345) กลับเป็นบาท (Decimal('123.45'))
+    if value is None:
+        return Decimal('0.00')
+    return Decimal(int(value)).scaleb(-2)
+
+
+def sum_by_wallet_and_type(wallet_ids=None, date_from=None, date_to=None, search=None):
+    # คืนค่า {(wallet_id, 'income'/'expense'): Decimal} จาก Query เดียว
+    # wallet_ids=None หมายถึงทุกกระเป๋า (ใช้ตอน rebuild ยอดสะสม)
+    # search = คำค้นหาในรายละเอียด (เงื่อนไขเดียวกับรายการใน dashboard ดู filtered_transaction_query)
+    query = db.session.query(
+        Transaction.wallet_id,
+        Transaction.type,
+        func.sum(func.round(Transaction.amount * 100))
+    )
+    if wallet_ids is not None:
+        if not wallet_ids:
+            return {}
+        query = query.filter(Transaction.wallet_id.in_(wallet_ids))
+    if date_from is not None and date_to is not None:
+        query = query.filter(Transaction.date.between(date_from, date_to))
+    condition = description_search_filter(db.engine.dialect.name, Transaction.transaction_id,
+                                          Transaction.description, search)
+    if condition is not None:
+        query = query.filter(condition)
+
+    rows = query.group_by(Transaction.wallet_id, Transaction.type).all()
+    return {(wallet_id, tx_type): _minor_to_decimal(total) for wallet_id, tx_type, total in rows}
+
+
+def aggregate_totals(wallet_ids, date_from=None, date_to=None, user_id=None, search=None):
+    # ยอดรวมทั้งช่วง + ยอดแยกตามกระเป๋า (จาก Query เดียวกัน)
+    # (ใหม่!) ส่ง user_id มาด้วย = อ่านจากสำเนาแบบคอลัมน์ได้ถ้าเปิด ANALYTICS_ENGINE (ห้ามใช้ระหว่างเขียนที่ยังไม่ commit)
+    # search = นับเฉพาะธุรกรรมที่ตรงคำค้นหา (สำเนาแบบคอลัมน์ไม่มีรายละเอียด -> ใช้ SQL เสมอ)
+    zero = Decimal('0.00')
+    result = {'income': zero, 'expense': zero, 'balance': zero, 'wallets': {}}
+
+    if user_id is not None and ledger_cache() is not None and not search:
+        groups = user_ledger(user_id).group_sum(('wallet', 'type'), date_from, date_to, wallet_ids)
+        sums = {key: _minor_to_decimal(total) for key, (total, _) in groups.items()}
+    else:
+        sums = sum_by_wallet_and_type(wallet_ids, date_from, date_to, search)
+
+    for (wallet_id, tx_type), total in sums.items():
+        wallet_totals = result['wallets'].setdefault(
+            wallet_id, {'income': zero, 'expense': zero, 'balance': zero})
+        if tx_type in ('income', 'expense'):
+            wallet_totals[tx_type] += total
+            result[tx_type] += total
+
+    for wallet_totals in result['wallets'].values():
+        wallet_totals['balance'] = wallet_totals['income'] - wallet_totals['expense']
+    result['balance'] = result['income'] - result['expense']
+    return result
+
+########################################################################################
+####################################cache###################################################
+
+# "เวอร์ชัน" ของข้อมูลแต่ละผู้ใช้ (แยกตามประเภท เช่น 'summary')
+# ทุกครั้งที่ข้อมูลเปลี่ยน ให้เพิ่มเวอร์ชัน -> Cache เก่าจะไม่ถูกใช้อีก (แล้วหมดอายุไปเอง)
+
+def cache_version(user_id, scope):
+    return cache.get_counter(f'version:{scope}:{user_id}')
+
+
+def bump_cache_version(user_id, *scopes):
+    for scope in scopes:
+        cache.incr(f'version:{scope}:{user_id}')
+
+
+def user_refdata(user_id):
+    # (ใหม่!) ข้อมูลอ้างอิงของผู้ใช้ (กระเป๋า, หมวดหมู่) ที่แทบทุกหน้าต้องใช้
+    # เก็บใน Cache แยกตามเวอร์ชัน 'refdata' -> เพิ่ม/แก้ไข/ลบ กระเป๋าหรือหมวดหมู่ ต้อง bump_cache_version
+    # ค่าที่ได้เป็น dict ธรรมดา (ใช้ใน Template แบบ wallet.wallet_name ได้เหมือนเดิม) ห้ามแก้ไขค่าข้างใน
+    # ใช้แสดงผลเท่านั้น ห้ามใช้ตรวจสิทธิ์ (ใช้ owned_wallet_ids / owned_category_types แทน)
+    cache_key = f'refdata:{user_id}:v{cache_version(user_id, "refdata")}'
+    refdata = cache.get(cache_key)
+    if refdata is not None:
+        return refdata
+
+    wallets = db.session.query(Wallet.wallet_id, Wallet.wallet_name, Wallet.currency) \
+        .filter(Wallet.user_id == user_id) \
+        .order_by(Wallet.wallet_id) \
+        .all()
+    categories = db.session.query(Category.category_id, Category.category_name, Category.type) \
+        .filter(Category.user_id == user_id) \
+        .order_by(Category.category_name) \
+        .all()
+    refdata = {
+        'wallets': [{'wallet_id': w.wallet_id, 'wallet_name': w.wallet_name, 'currency': w.currency}
+                    for w in wallets],
+        'categories': [{'category_id': c.category_id, 'category_name': c.category_name, 'type': c.type}
+                       for c in categories],
+    }
+    cache.set(cache_key, refdata)
+    return refdata
+
+
+def owned_wallet_ids(user_id):
+    # (อัปเกรด!) ใช้ตรวจความเป็นเจ้าของกระเป๋า -> อ่านจากฐานข้อมูลทุกครั้ง (Query เดียว) ไม่อ่านจาก Cache
+    # CACHE_BACKEND=memory แยกกันคนละ worker: กระเป๋าที่ถูกลบใน worker หนึ่งจะยังค้างใน worker อื่นได้ถึง CACHE_TTL
+    # (SQLite ใช้ wallet_id ซ้ำได้ -> อาจกลายเป็นกระเป๋าของผู้ใช้อื่น)
+    return {wallet_id for (wallet_id,) in db.session.query(Wallet.wallet_id).filter(Wallet.user_id == user_id)}
+
+
+def owned_category_types(user_id):
+    # {category_id: 'income'/'expense'} ของผู้ใช้ จากฐานข้อมูล (ใช้ตรวจสิทธิ์ เหตุผลเดียวกับ owned_wallet_ids)
+    return dict(db.session.query(Category.category_id, Category.type).filter(Category.user_id == user_id))
+
+
+def cached_fragment(name, versions, render):
+    # (ใหม่!) HTML บางส่วนของหน้าเว็บ เก็บใน Cache ตาม versions (ต้องมี user_id และเวอร์ชันของข้อมูลทุกอย่างที่ใช้ render)
+    cache_key = f'fragment:{name}:' + ':'.join(str(v) for v in versions)
+    html = cache.get(cache_key)
+    if html is None:
+        html = render()
+        cache.set(cache_key, str(html))
+    return Markup(html)
+
+
+def cached_json_response(payload, etag):
+    # ส่ง JSON พร้อม ETag ถ้าเบราว์เซอร์มีข้อมูลชุดเดิมอยู่แล้วจะได้ 304 (ไม่ต้องส่งข้อมูลซ้ำ)
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+########################################################################################
+####################################currency################################################
+
+# (ใหม่!) กระเป๋าหลายสกุลเงิน -> ยอดรวมข้ามกระเป๋าแปลงเป็น REPORTING_CURRENCY
+# - แปลง "ยอดรวมของแต่ละกระเป๋า" (ได้จาก SUM ... GROUP BY wallet_id อยู่แล้ว) ไม่ใช่ทีละธุรกรรม
+#   -> คูณแค่ไม่กี่ครั้งต่อหน้า ไม่มี Query เพิ่ม
+# - ตารางอัตราทั้งหมดอยู่ใน RAM ของ worker (rates.ExchangeRates) โหลดใหม่เมื่อ "flask rates load" เพิ่มเวอร์ชัน
+#   (Cache แบบ memory มองไม่เห็นเวอร์ชันจาก process อื่น จึงโหลดใหม่ทุก CACHE_TTL วินาทีด้วย)
+# - ผู้ใช้ที่มีแต่กระเป๋าสกุลเงินหลักไม่ต้องแตะตารางอัตราเลย
+
+RATES_VERSION_KEY = 'version:rates:all'
+exchange_rate_table = app_service('exchange_rates')
+
+
+def rates_version():
+    return cache.get_counter(RATES_VERSION_KEY)
+
+
+def exchange_rates():
+    version = rates_version()
+    if exchange_rate_table.version != version or \
+            time.monotonic() - exchange_rate_table.loaded_at > current_app.config['CACHE_TTL']:
+        exchange_rate_table.replace(
+            db.session.query(ExchangeRate.currency, ExchangeRate.rate_date, ExchangeRate.rate).all(), version)
+    return exchange_rate_table
+
+
+def wallet_currencies(user_id):
+    return {w['wallet_id']: w['currency'] for w in user_refdata(user_id)['wallets']}
+
+
+def convert_wallet_amounts(amounts, currencies, day):
+    # amounts = {wallet_id: Decimal} -> (ยอดรวมเป็น REPORTING_CURRENCY, {สกุลเงินที่ไม่มีอัตรา ณ วันนั้น})
+    base = current_app.config['REPORTING_CURRENCY']
+    pairs = [(currencies.get(wallet_id, base), amount) for wallet_id, amount in amounts.items()]
+    if all(currency == base for currency, _ in pairs):
+        return sum((amount for _, amount in pairs), Decimal('0.00')), set()
+    return exchange_rates().convert_many(pairs, day)
+
+
+rates_cli = AppGroup('rates', help='จัดการตารางอัตราแลกเปลี่ยน (exchange_rates)')
+
+
+@rates_cli.command('load')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, default=1000)
+def load_rates_command(path, batch_size):
+    """นำเข้าอัตราแลกเปลี่ยนจากไฟล์ CSV (date,currency,rate) แถวที่มีอยู่แล้วจะถูกเขียนทับ"""
+    connection = db.session.connection()
+    insert = _dialect_insert(connection)
+    count = 0
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        try:
+            for batch in chunked(iter_rate_rows(stream), batch_size):
+                statement = insert(ExchangeRate.__table__)
+                db.session.execute(
+                    statement.on_conflict_do_update(index_elements=['currency', 'rate_date'],
+                                                    set_={'rate': statement.excluded.rate}),
+                    [{'currency': currency, 'rate_date': day, 'rate': rate} for currency, day, rate in batch])
+                count += len(batch)
+        except ValueError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+
+    # งบประมาณเก็บยอดที่แปลงแล้ว -> คำนวณใหม่ด้วยอัตราชุดใหม่ (ใน Transaction เดียวกัน)
+    # เพิ่มเวอร์ชันก่อน rebuild (process นี้โหลดอัตราใหม่ที่ยังไม่ commit) และหลัง commit (worker อื่นโหลดใหม่)
+    cache.incr(RATES_VERSION_KEY)
+    rebuild_budget_usage()
+    db.session.commit()
+    cache.incr(RATES_VERSION_KEY)
+    click.echo(f'Loaded {count:,} exchange rates.')
+
+########################################################################################
+####################################analytics###############################################
+
+# (ใหม่!) ANALYTICS_ENGINE=columnar: ธุรกรรมทั้งหมดของผู้ใช้เก็บเป็นคอลัมน์ใน RAM (analytics.LedgerCache)
+# - โหลดครั้งแรกที่ผู้ใช้เปิดรายงาน (Query เดียว) จากนั้นรายงานรวมยอดไม่ต้องแตะฐานข้อมูลเลย
+# - เขียนธุรกรรม (ผ่าน apply_bulk_transaction_effects) -> ต่อท้ายแถวเปลี่ยนแปลงหลัง commit ไม่ต้องโหลดใหม่
+# - เวอร์ชัน 'analytics' ของผู้ใช้เพิ่ม 2 ครั้งต่อการเขียน (ก่อนและหลัง commit) สำเนาที่โหลดระหว่างนั้นจะไม่ถูกใช้ต่อ
+# - ลบกระเป๋า/หมวดหมู่ (แก้ธุรกรรมแบบ bulk) -> bump_cache_version(..., 'analytics') ให้โหลดใหม่ทั้งก้อน
+# - Cache แบบ memory มองไม่เห็นการเขียนของ worker อื่น จึงโหลดใหม่ทุก CACHE_TTL วินาทีด้วย
+
+
+def ledger_cache():
+    # analytics.LedgerCache ของแอปนี้ (None = ANALYTICS_ENGINE=sql) สร้างใน create_app()
+    return current_app.extensions.get('analytics')
+
+
+def _ledger_row(snapshot, sign=1):
+    # snapshot_transaction(...) -> แถวของ ColumnarLedger (จำนวนเงินหน่วยสตางค์)
+    minor = int((snapshot['amount'] * 100).to_integral_value())
+    return (snapshot['date'], minor * sign, snapshot['wallet_id'], snapshot['category_id'], snapshot['type'], sign)
+
+
+def user_ledger(user_id):
+    ledgers = ledger_cache()
+    version = cache_version(user_id, 'analytics')
+
+    def load_rows():
+        wallet_ids = owned_wallet_ids(user_id)
+        if not wallet_ids:
+            return
+        # อ่านจากฐานข้อมูลหลักเสมอ (replica อาจยังไม่มีธุรกรรมที่เวอร์ชันนี้นับไปแล้ว)
+        with db.engine.connect() as connection:
+            yield from connection.execution_options(yield_per=ledgers.batch_size).execute(
+                db.select(Transaction.date, func.round(Transaction.amount * 100), Transaction.wallet_id,
+                          Transaction.category_id, Transaction.type)
+                .where(Transaction.wallet_id.in_(wallet_ids)))
+
+    return ledgers.get(user_id, version, load_rows,
+                       still_current=lambda: cache_version(user_id, 'analytics') == version)
+
+
+def queue_analytics_changes(changes):
+    # changes = [(snapshot, +1/-1), ...] จะถูกนำไปใช้หลัง commit (ดู _analytics_before_commit)
+    if ledger_cache() is not None and changes:
+        db.session.info.setdefault('analytics_changes', []).extend(changes)
+
+
+@db.event.listens_for(db.session, 'before_commit')
+def _analytics_before_commit(session):
+    changes = session.info.pop('analytics_changes', None)
+    if not changes:
+        return
+    owners = dict(session.query(Wallet.wallet_id, Wallet.user_id)
+                  .filter(Wallet.wallet_id.in_({snapshot['wallet_id'] for snapshot, _ in changes})))
+    by_user = {}
+    for snapshot, sign in changes:
+        user_id = owners.get(snapshot['wallet_id'])
+        if user_id is not None:
+            by_user.setdefault(user_id, []).append(_ledger_row(snapshot, sign))
+    session.info['analytics_pending'] = {
+        user_id: (cache.incr(f'version:analytics:{user_id}'), rows) for user_id, rows in by_user.items()}
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def _analytics_after_commit(session):
+    for user_id, (version, rows) in session.info.pop('analytics_pending', {}).items():
+        ledger_cache().apply(user_id, version - 1, cache.incr(f'version:analytics:{user_id}'), rows)
+
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _analytics_after_rollback(session):
+    session.info.pop('analytics_changes', None)
+    session.info.pop('analytics_pending', None)
+
+########################################################################################
+####################################replica#################################################
+
+# (ใหม่!) หน้าที่อ่านอย่างเดียวติด @read_replica -> SELECT ไปที่ SQLALCHEMY_REPLICA_URI (แบ่งโหลดอ่านออกจากตัวหลัก)
+# Read-your-writes: request ที่เขียนข้อมูลลงตัวหลัก จะบันทึกเวลาไว้ใน Session cookie ของผู้ใช้
+# -> REPLICA_STICKY_SECONDS วินาทีถัดไป หน้าเหล่านี้ยังอ่านจากตัวหลัก (replica อาจยังไม่ได้รับข้อมูลใหม่)
+# ใช้ cookie แทน Cache เพื่อให้ถูกต้องแม้ Cache แบบ memory จะแยกกันคนละ worker
+
+REPLICA_STICKY_KEY = '_primary_until'
+
+
+def use_read_replica():
+    return has_request_context() and g.get('read_replica', False)
+
+
+def mark_primary_write():
+    if has_request_context():
+        g.wrote_primary = True
+
+
+def read_replica(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = bool(current_app.config['SQLALCHEMY_REPLICA_URI']) and \
+            time.time() >= client_session.get(REPLICA_STICKY_KEY, 0)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _stick_to_primary_after_write(response):
+    config = current_app.config
+    if g.get('wrote_primary') and config['SQLALCHEMY_REPLICA_URI'] and config['REPLICA_STICKY_SECONDS'] > 0:
+        client_session[REPLICA_STICKY_KEY] = time.time() + config['REPLICA_STICKY_SECONDS']
+    return response
+
+########################################################################################
+####################################pagination##############################################
+
+# จำนวนธุรกรรมต่อ "หน้า" (โหลดเพิ่มทีละหน้าเมื่อเลื่อนลงมาถึงท้ายตาราง)
+TRANSACTION_PAGE_SIZE = 50
+
+
+def read_date_filters():
+    # อ่านค่า Filter จาก URL (ใช้ร่วมกันระหว่าง dashboard, API และหน้าอื่น ๆ)
     date_from_str = request.args.get('date_from')
     date_to_str = request.args.get('date_to')
     selected_wallet_id = request.args.get('wallet_id', type=int)
 
-    # --- 2. (อัปเกรด!) ตั้งค่าวันที่เริ่มต้น ---
     today = datetime.now()
     if date_from_str:
         date_from_obj = datetime.strptime(date_from_str, '%Y-%m-%d').date()
@@ -236,411 +853,1427 @@ def dashboard():
     if date_to_str:
         date_to_obj = datetime.strptime(date_to_str, '%Y-%m-%d').date()
     else:
-        # ถ้าไม่ได้เลือก ให้ใช้Tวันปัจจุบัน
+        # ถ้าไม่ได้เลือก ให้ใช้วันปัจจุบัน
         date_to_obj = today.date()
 
-    # --- 3. ดึงข้อมูลพื้นฐาน (เหมือนเดิม) ---
-    user_wallets = Wallet.query.filter_by(user_id=current_user.user_id).all()
-    wallet_ids = [wallet.wallet_id for wallet in user_wallets]
-    categories = Category.query.filter_by(user_id=current_user.user_id).order_by(Category.category_name).all()
-    income_categories = [c for c in categories if c.type == 'income']
-    expense_categories = [c for c in categories if c.type == 'expense']
-
-    # --- 4. (อัปเกรด!) สร้าง Query ธุรกรรม ---
-    query = Transaction.query.filter(Transaction.wallet_id.in_(wallet_ids))
+    return date_from_obj, date_to_obj, selected_wallet_id
+
+
+def transaction_listing_query():
+    # ดึงเฉพาะคอลัมน์ที่ตารางธุรกรรมใช้ พร้อมชื่อกระเป๋า/หมวดหมู่ ใน Query เดียว
+    # (ถ้าใช้ Object เต็ม ๆ แล้วเรียก transaction.wallet / transaction.category ในหน้าเว็บ
+    #  SQLAlchemy จะยิง SELECT เพิ่มทีละแถว)
+    return db.session.query(
+        Transaction.transaction_id,
+        Transaction.date,
+        Transaction.description,
+        Transaction.amount,
+        Transaction.type,
+        Wallet.wallet_name,
+        Category.category_name
+    ).join(Wallet, Transaction.wallet_id == Wallet.wallet_id) \
+        .outerjoin(Category, Transaction.category_id == Category.category_id)
+
+
+def filtered_transaction_query(wallet_ids, date_from, date_to, selected_wallet_id=None, search=None):
+    # Filter เดียวกับหน้า dashboard (ใช้ร่วมกันกับ API โหลดหน้าถัดไป และการส่งออกไฟล์)
+    query = transaction_listing_query().filter(Transaction.wallet_id.in_(wallet_ids)) \
+        .filter(Transaction.date.between(date_from, date_to))
     if selected_wallet_id:
         query = query.filter(Transaction.wallet_id == selected_wallet_id)
+    # (ใหม่!) ค้นหาจากรายละเอียด (?q=...) ผ่าน index ค้นหา (ดู search.py)
+    condition = description_search_filter(db.engine.dialect.name, Transaction.transaction_id,
+                                          Transaction.description, search)
+    if condition is not None:
+        query = query.filter(condition)
+    return query
+
+
+def encode_cursor(transaction):
+    # Cursor = "วันที่:transaction_id" ของแถวสุดท้ายในหน้า
+    return f"{transaction.date.strftime('%Y-%m-%d')}:{transaction.transaction_id}"
+
+
+def decode_cursor(cursor):
+    # คืนค่า (date, transaction_id) หรือ None ถ้า cursor ไม่ถูกต้อง
+    try:
+        date_str, transaction_id = cursor.split(':')
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), int(transaction_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def fetch_transaction_page(query, cursor=None, limit=TRANSACTION_PAGE_SIZE):
+    # แบ่งหน้าแบบ Keyset (date DESC, transaction_id DESC)
+    # ใช้ WHERE แทน OFFSET เพื่อให้หน้าลึก ๆ เร็วเท่าหน้าแรก
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.filter(or_(
+            Transaction.date < cursor_date,
+            and_(Transaction.date == cursor_date, Transaction.transaction_id < cursor_id)
+        ))
+
+    rows = query.order_by(Transaction.date.desc(), Transaction.transaction_id.desc()) \
+        .limit(limit + 1) \
+        .all()
+
+    # ดึงเกินมา 1 แถว เพื่อดูว่ายังมีหน้าถัดไปหรือไม่
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def transaction_to_json(t):
+    return {
+        'transaction_id': t.transaction_id,
+        'date': t.date.strftime('%Y-%m-%d'),
+        'wallet_name': t.wallet_name,
+        'category_name': t.category_name,
+        'description': t.description,
+        'amount': str(t.amount),
+        'type': t.type,
+        'edit_url': url_for('transactions.edit_transaction', transaction_id=t.transaction_id),
+        'delete_url': url_for('transactions.delete_transaction', transaction_id=t.transaction_id),
+    }
+
+
+def transaction_page_response(query):
+    # ใช้ร่วมกันระหว่าง API ของ dashboard และ wallet_detail
+    cursor = None
+    if request.args.get('cursor'):
+        cursor = decode_cursor(request.args.get('cursor'))
+        if cursor is None:
+            return jsonify(error='invalid cursor'), 400
+
+    rows, next_cursor = fetch_transaction_page(query, cursor)
+    return jsonify(transactions=[transaction_to_json(t) for t in rows], next_cursor=next_cursor)
 
-    # (ใหม่!) กรองตามช่วงวันที่
-    query = query.filter(Transaction.date.between(date_from_obj, date_to_obj))
-
-    all_transactions = query.order_by(Transaction.date.desc()).all()
-
-    # --- 5. คำนวณยอด (เหมือนเดิม) ---
-    total_income = sum(float(t.amount) for t in all_transactions if t.type == 'income')
-    total_expense = sum(float(t.amount) for t in all_transactions if t.type == 'expense')
-    total_balance = total_income - total_expense
-
-    # (โค้ดส่วนคำนวณ wallet_data เหมือนเดิม ไม่ต้องแก้)
-    wallet_data = []
-    for wallet in user_wallets:
-        all_wallet_tx = Transaction.query.filter_by(wallet_id=wallet.wallet_id).all()
-        wallet_income = sum(float(t.amount) for t in all_wallet_tx if t.type == 'income')
-        wallet_expense = sum(float(t.amount) for t in all_wallet_tx if t.type == 'expense')
-        wallet_balance = wallet_income - wallet_expense
-        wallet_data.append({
-            'id': wallet.wallet_id,
-            'name': wallet.wallet_name,
-            'balance': wallet_balance
-        })
+########################################################################################
+####################################ledger##################################################
+
+# เก็บค่าที่จำเป็นของธุรกรรมไว้ "ก่อน" ถูกแก้ไข/ลบ
+# (ใช้คำนวณว่าต้องบวก/ลบยอดสะสมเท่าไร)
+def snapshot_transaction(t):
+    return {
+        'wallet_id': int(t.wallet_id),
+        'category_id': int(t.category_id) if t.category_id else None,
+        'type': t.type,
+        'amount': Decimal(str(t.amount)),
+        'date': t.date,
+    }
+
+
+def rebuild_wallet_balance(wallet_id):
+    # คำนวณยอดของกระเป๋าใหม่ทั้งหมดจากตาราง transactions (ใช้กรณีที่ยังไม่มีแถวยอดสะสม)
+    db.session.flush()
+    wallet = db.session.get(Wallet, wallet_id)
+    if wallet is None:
+        return
+
+    totals = aggregate_totals([wallet_id])
+
+    row = db.session.get(WalletBalance, wallet_id)
+    if row is None:
+        row = WalletBalance(wallet_id=wallet_id, user_id=wallet.user_id)
+        db.session.add(row)
+    row.income_total = totals['income']
+    row.expense_total = totals['expense']
+    row.balance = totals['balance']
+
+
+def apply_transaction_effects(old=None, new=None):
+    # old = ค่าของธุรกรรม "ก่อน" แก้ไข/ลบ, new = ค่า "หลัง" เพิ่ม/แก้ไข
+    # (เรียกหลังจากแก้ไข Object แล้ว ระบบจะ flush ให้ก่อนอัปเดตยอด)
+    apply_bulk_transaction_effects(removed=[old] if old else [], added=[new] if new else [])
+
+
+def apply_bulk_transaction_effects(removed=(), added=()):
+    # อัปเดตตารางสรุปทั้งหมด (ยอดสะสมกระเป๋า, ยอดรายเดือน) จากรายการ snapshot หลายรายการพร้อมกัน
+    changes = [(snapshot, -1) for snapshot in removed] + [(snapshot, 1) for snapshot in added]
+    _apply_balance_changes(changes)
+    _apply_rollup_changes(changes)
+    # (ใหม่!) ต้องมาหลัง rollup (แถวงบของเดือนใหม่ตั้งต้นจากยอดรายเดือนที่รวมการเปลี่ยนแปลงนี้แล้ว)
+    _apply_budget_changes(changes)
+    # (ใหม่!) สำเนาแบบคอลัมน์ (ANALYTICS_ENGINE=columnar) ต่อท้ายการเปลี่ยนแปลงหลัง commit
+    queue_analytics_changes(changes)
+
+
+def _apply_balance_changes(changes):
+    deltas = {}
+    for snapshot, sign in changes:
+        amount = snapshot['amount'] * sign
+        income, expense = deltas.get(snapshot['wallet_id'], (Decimal('0'), Decimal('0')))
+        if snapshot['type'] == 'income':
+            income += amount
+        elif snapshot['type'] == 'expense':
+            expense += amount
+        deltas[snapshot['wallet_id']] = (income, expense)
+
+    for wallet_id, (income, expense) in deltas.items():
+        # ใช้ UPDATE ... SET x = x + ? เพื่อไม่ให้ยอดหายเวลามีหลาย request พร้อมกัน
+        result = db.session.execute(
+            update(WalletBalance)
+            .where(WalletBalance.wallet_id == wallet_id)
+            .values(income_total=WalletBalance.income_total + income,
+                    expense_total=WalletBalance.expense_total + expense,
+                    balance=WalletBalance.balance + income - expense)
+        )
+        if result.rowcount == 0:
+            # กระเป๋าเก่าที่ยังไม่มียอดสะสม -> คำนวณใหม่ทั้งก้อน (รวมการเปลี่ยนแปลงนี้แล้ว)
+            rebuild_wallet_balance(wallet_id)
+
+
+def _apply_rollup_changes(changes):
+    deltas = {}
+    for snapshot, sign in changes:
+        key = (snapshot['wallet_id'], snapshot['category_id'], snapshot['type'],
+               snapshot['date'].year, snapshot['date'].month)
+        amount, count = deltas.get(key, (Decimal('0'), 0))
+        deltas[key] = (amount + snapshot['amount'] * sign, count + sign)
+
+    deltas = {key: value for key, value in deltas.items() if value[0] or value[1]}
+    if not deltas:
+        return
+
+    # หาแถวที่มีอยู่แล้วทั้งหมดในคำสั่งเดียว (สำคัญมากตอนนำเข้าไฟล์ที่มีหลายร้อย key ต่อก้อน)
+    db.session.flush()
+    years = {key[3] for key in deltas}
+    existing = {}
+    for rollup_id, *key in db.session.query(
+            MonthlyRollup.rollup_id, MonthlyRollup.wallet_id, MonthlyRollup.category_id,
+            MonthlyRollup.type, MonthlyRollup.year, MonthlyRollup.month) \
+            .filter(MonthlyRollup.wallet_id.in_({key[0] for key in deltas})) \
+            .filter(MonthlyRollup.year.between(min(years), max(years))):
+        existing[tuple(key)] = rollup_id
+
+    updates = [{'rid': existing[key], 'amount': amount, 'count': count}
+               for key, (amount, count) in deltas.items() if key in existing]
+    if updates:
+        # UPDATE ... SET total = total + ? แบบ executemany
+        db.session.execute(
+            MonthlyRollup.__table__.update()
+            .where(MonthlyRollup.__table__.c.rollup_id == bindparam('rid'))
+            .values(total=MonthlyRollup.__table__.c.total + bindparam('amount'),
+                    tx_count=MonthlyRollup.__table__.c.tx_count + bindparam('count')),
+            updates
+        )
 
-    today_date = datetime.now().strftime('%Y-%m-%d')
-
-    # --- 6. ส่งข้อมูลไป HTML (อัปเกรด!) ---
-    return render_template('dashboard.html',
-                           wallet_data=wallet_data,
-                           transactions=all_transactions,
-                           total_balance=total_balance,
-                           today_date=today_date,
-                           # (ใหม่!) ส่งค่าวันที่ที่เลือกกลับไปให้ฟอร์ม
-                           date_from=date_from_obj.strftime('%Y-%m-%d'),
-                           date_to=date_to_obj.strftime('%Y-%m-%d'),
-                           selected_wallet_id=selected_wallet_id,
-                           income_categories=income_categories,
-                           expense_categories=expense_categories
-                           )
-
-###################################wallet#####################################################
-
-@app.route("/add_wallet", methods=['POST'])
-@login_required # ต้องล็อกอินก่อนถึงจะสร้างได้
-def add_wallet():
-    # 1. ดึงชื่อกระเป๋าจากฟอร์ม
-    wallet_name = request.form.get('wallet_name')
-
-    if wallet_name:
-        # 2. สร้าง Object ใหม่
-        new_wallet = Wallet(wallet_name=wallet_name, user_id=current_user.user_id)
-
-        # 3. บันทึกลงฐานข้อมูล
-        db.session.add(new_wallet)
-        db.session.commit()
-        flash('สร้างกระเป๋าเงินใหม่สำเร็จ!', 'success')
+    missing = [(key, value) for key, value in deltas.items() if key not in existing]
+    if not missing:
+        return
+    user_ids = dict(db.session.query(Wallet.wallet_id, Wallet.user_id)
+                    .filter(Wallet.wallet_id.in_({key[0] for key, _ in missing})))
+    try:
+        with db.session.begin_nested():
+            db.session.execute(MonthlyRollup.__table__.insert(), [
+                {'user_id': user_ids[wallet_id], 'wallet_id': wallet_id, 'category_id': category_id,
+                 'type': tx_type, 'year': year, 'month': month, 'total': amount, 'tx_count': count}
+                for (wallet_id, category_id, tx_type, year, month), (amount, count) in missing
+            ])
+    except IntegrityError:
+        # มี request อื่นสร้างแถวเดียวกันตัดหน้า -> ค่อย ๆ ทำทีละ key
+        for key, (amount, count) in missing:
+            upsert_monthly_rollup(key, amount, count)
+
+
+def upsert_monthly_rollup(key, amount, count):
+    # key = (wallet_id, category_id, type, year, month)
+    wallet_id, category_id, tx_type, year, month = key
+    condition = and_(
+        MonthlyRollup.wallet_id == wallet_id,
+        MonthlyRollup.category_id.is_(None) if category_id is None else MonthlyRollup.category_id == category_id,
+        MonthlyRollup.type == tx_type,
+        MonthlyRollup.year == year,
+        MonthlyRollup.month == month,
+    )
+    values = {'total': MonthlyRollup.total + amount, 'tx_count': MonthlyRollup.tx_count + count}
+
+    result = db.session.execute(update(MonthlyRollup).where(condition).values(**values))
+    if result.rowcount:
+        return
+
+    # ยังไม่มีแถวของเดือนนี้ -> สร้างใหม่ (ถ้ามี request อื่นสร้างตัดหน้าไปแล้ว ให้กลับไป UPDATE)
+    wallet = db.session.get(Wallet, wallet_id)
+    try:
+        with db.session.begin_nested():
+            db.session.add(MonthlyRollup(user_id=wallet.user_id, wallet_id=wallet_id, category_id=category_id,
+                                         type=tx_type, year=year, month=month, total=amount, tx_count=count))
+    except IntegrityError:
+        db.session.execute(update(MonthlyRollup).where(condition).values(**values))
+
+
+def compute_wallet_balances():
+    # คำนวณยอดของทุกกระเป๋าจากตาราง transactions (ใช้ตัวรวมยอดเดียวกับ Dashboard)
+    sums = sum_by_wallet_and_type()
+    zero = Decimal('0.00')
+    return {
+        wallet_id: (user_id, sums.get((wallet_id, 'income'), zero), sums.get((wallet_id, 'expense'), zero))
+        for wallet_id, user_id in db.session.query(Wallet.wallet_id, Wallet.user_id).all()
+    }
+
+
+balances_cli = AppGroup('balances', help='จัดการตารางยอดสะสมของกระเป๋าเงิน (wallet_balances)')
+
+
+@balances_cli.command('rebuild')
+def rebuild_balances_command():
+    """คำนวณ wallet_balances ใหม่ทั้งหมดจากตาราง transactions (รัน "flask db upgrade" ก่อน)"""
+    computed = compute_wallet_balances()
+    db.session.query(WalletBalance).delete()
+    for wallet_id, (user_id, income, expense) in computed.items():
+        db.session.add(WalletBalance(wallet_id=wallet_id, user_id=user_id,
+                                     income_total=income, expense_total=expense,
+                                     balance=income - expense))
+    db.session.commit()
+    click.echo(f'Rebuilt balances for {len(computed)} wallets.')
+
+
+@balances_cli.command('verify')
+def verify_balances_command():
+    """ตรวจว่า wallet_balances ตรงกับยอดจริงในตาราง transactions"""
+    computed = compute_wallet_balances()
+    stored = {row.wallet_id: row for row in WalletBalance.query.all()}
+
+    mismatches = 0
+    for wallet_id, (user_id, income, expense) in computed.items():
+        row = stored.get(wallet_id)
+        if row is None:
+            click.echo(f'wallet {wallet_id}: missing balance row')
+            mismatches += 1
+        elif (row.income_total, row.expense_total, row.balance) != (income, expense, income - expense):
+            click.echo(f'wallet {wallet_id}: stored {row.income_total}/{row.expense_total}/{row.balance}, '
+                       f'expected {income}/{expense}/{income - expense}')
+            mismatches += 1
+
+    if mismatches:
+        raise click.ClickException(f'{mismatches} wallet balance(s) out of sync, run "flask balances rebuild"')
+    click.echo(f'All {len(computed)} wallet balances are in sync.')
+
+
+rollups_cli = AppGroup('rollups', help='จัดการตารางยอดรวมรายเดือน (monthly_rollups)')
+
+
+@rollups_cli.command('rebuild')
+def rebuild_rollups_command():
+    """คำนวณ monthly_rollups ใหม่ทั้งหมดจากตาราง transactions (รัน "flask db upgrade" ก่อน)"""
+    year = func.extract('year', Transaction.date)
+    month = func.extract('month', Transaction.date)
+    rows = db.session.query(
+        Wallet.user_id, Transaction.wallet_id, Transaction.category_id, Transaction.type,
+        year, month,
+        func.sum(func.round(Transaction.amount * 100)), func.count(Transaction.transaction_id)
+    ).join(Wallet, Transaction.wallet_id == Wallet.wallet_id) \
+        .group_by(Wallet.user_id, Transaction.wallet_id, Transaction.category_id, Transaction.type, year, month) \
+        .all()
+
+    db.session.query(MonthlyRollup).delete()
+    if rows:
+        db.session.execute(MonthlyRollup.__table__.insert(), [
+            {'user_id': user_id, 'wallet_id': wallet_id, 'category_id': category_id, 'type': tx_type,
+             'year': int(y), 'month': int(m), 'total': _minor_to_decimal(total), 'tx_count': count}
+            for user_id, wallet_id, category_id, tx_type, y, m, total, count in rows
+        ])
+    db.session.commit()
+    click.echo(f'Rebuilt {len(rows)} monthly rollup rows.')
 
-    # 4. กลับไปหน้า Dashboard (ซึ่งจะโหลดข้อมูลใหม่)
-    return redirect(url_for('dashboard'))
+########################################################################################
+####################################budgets#################################################
+
+# แจ้งเตือนเมื่อใช้งบถึงกี่ % (แต่ละระดับแจ้งครั้งเดียวต่อเดือน ถ้ายอดลดลงต่ำกว่าระดับแล้วขึ้นมาใหม่จะแจ้งอีก)
+BUDGET_ALERT_LEVELS = (80, 100)
+
+# จำนวนการแจ้งเตือนที่แสดงบน Dashboard
+NOTIFICATION_LIMIT = 5
+
+
+def budget_level(spent, limit):
+    if not limit or limit <= 0:
+        return 0
+    percent = spent * 100 / limit
+    return max([level for level in BUDGET_ALERT_LEVELS if percent >= level], default=0)
+
+
+# (ใหม่!) งบและยอดใช้เก็บเป็น REPORTING_CURRENCY (แปลงยอดของแต่ละกระเป๋าด้วยอัตรา ณ สิ้นเดือน)
+# โหลดอัตราใหม่แล้วต้อง rebuild_budget_usage() ("flask rates load" ทำให้เอง)
+
+def _wallet_currency_map(wallet_ids):
+    return dict(db.session.query(Wallet.wallet_id, Wallet.currency).filter(Wallet.wallet_id.in_(wallet_ids)))
+
+
+def _convert_monthly(rows, currencies):
+    # rows = [(key, year, month, wallet_id, total), ...] -> {(key, year, month): ยอดเป็นสกุลเงินหลัก}
+    amounts = {}
+    for key, year, month, wallet_id, total in rows:
+        amounts.setdefault((key, year, month), {})[wallet_id] = Decimal(str(total))
+    return {(key, year, month): convert_wallet_amounts(by_wallet, currencies, month_end(year, month))[0]
+            for (key, year, month), by_wallet in amounts.items()}
+
+
+def _rollup_spent(user_id, category_id, year, month):
+    # ยอดรายจ่ายของหมวดหมู่ในเดือนนั้น (รวมทุกกระเป๋าของเจ้าของงบเท่านั้น) จาก monthly_rollups
+    rows = db.session.query(MonthlyRollup.wallet_id, func.sum(MonthlyRollup.total)) \
+        .filter(MonthlyRollup.user_id == user_id, MonthlyRollup.category_id == category_id,
+                MonthlyRollup.type == 'expense',
+                MonthlyRollup.year == year, MonthlyRollup.month == month) \
+        .group_by(MonthlyRollup.wallet_id) \
+        .all()
+    if not rows:
+        return Decimal('0')
+    converted = _convert_monthly([(category_id, year, month, wallet_id, total) for wallet_id, total in rows],
+                                 _wallet_currency_map([wallet_id for wallet_id, _ in rows]))
+    return converted[(category_id, year, month)]
+
+
+def _add_budget_usage(budget_id, user_id, category_id, year, month, delta):
+    # คืนค่า (spent, alert_level) หลังบวก delta
+    condition = and_(BudgetUsage.budget_id == budget_id, BudgetUsage.year == year, BudgetUsage.month == month)
+    add_delta = update(BudgetUsage).where(condition).values(spent=BudgetUsage.spent + delta) \
+        .returning(BudgetUsage.spent, BudgetUsage.alert_level)
+    row = db.session.execute(add_delta).first()
+    if row is not None:
+        return row
+
+    # เดือนนี้ยังไม่มีแถว -> ตั้งต้นจากยอดรายเดือน (ซึ่งรวม delta นี้ไว้แล้ว)
+    spent = _rollup_spent(user_id, category_id, year, month)
+    try:
+        with db.session.begin_nested():
+            db.session.execute(BudgetUsage.__table__.insert().values(
+                budget_id=budget_id, year=year, month=month, spent=spent, alert_level=0))
+        return spent, 0
+    except IntegrityError:
+        return db.session.execute(add_delta).first()
+
+
+def _apply_budget_changes(changes):
+    deltas = {}
+    for snapshot, sign in changes:
+        if snapshot['type'] != 'expense' or not snapshot['category_id']:
+            continue
+        key = (snapshot['category_id'], snapshot['date'].year, snapshot['date'].month, snapshot['wallet_id'])
+        deltas[key] = deltas.get(key, Decimal('0')) + snapshot['amount'] * sign
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    # งบนับเฉพาะธุรกรรมในกระเป๋าของเจ้าของงบ (ธุรกรรมที่อ้าง category_id ของคนอื่นไม่ไปกินงบของเขา)
+    owners = dict(db.session.query(Wallet.wallet_id, Wallet.user_id)
+                  .filter(Wallet.wallet_id.in_({key[3] for key in deltas})))
+    budgets = {category_id: (budget_id, user_id, limit, category_name)
+               for budget_id, category_id, user_id, limit, category_name in db.session.query(
+                   Budget.budget_id, Budget.category_id, Budget.user_id, Budget.amount, Category.category_name)
+               .join(Category, Budget.category_id == Category.category_id)
+               .filter(Budget.category_id.in_({key[0] for key in deltas}))}
+    deltas = {key: delta for key, delta in deltas.items()
+              if key[0] in budgets and owners.get(key[3]) == budgets[key[0]][1]}
+    if not deltas:
+        return
+
+    # แปลง delta ของแต่ละกระเป๋าเป็นสกุลเงินหลักก่อนบวกเข้ายอดใช้งบ
+    deltas = _convert_monthly([key + (delta,) for key, delta in deltas.items()],
+                              _wallet_currency_map({key[3] for key in deltas}))
+    base = current_app.config['REPORTING_CURRENCY']
+    today = datetime.now().date()
+    for (category_id, year, month), delta in deltas.items():
+        if not delta:
+            continue
+        budget_id, user_id, limit, category_name = budgets[category_id]
+        spent, alerted = _add_budget_usage(budget_id, user_id, category_id, year, month, delta)
+
+        level = budget_level(spent, limit)
+        if level == alerted:
+            continue
+        if level > alerted and (year, month) == (today.year, today.month):
+            # ข้ามระดับไปแล้ว -> แจ้งเตือน (เฉพาะเดือนปัจจุบัน แก้ธุรกรรมเดือนเก่าไม่ต้องแจ้ง)
+            db.session.execute(Notification.__table__.insert().values(
+                user_id=user_id, kind=f'budget_{level}', created_at=_utcnow(), is_read=False,
+                message=f'ใช้งบ "{category_name}" เดือนนี้ไปแล้ว {spent * 100 / limit:.0f}% '
+                        f'({format_money(spent, base)} จาก {format_money(limit, base)})'))
+        db.session.execute(update(BudgetUsage)
+                           .where(BudgetUsage.budget_id == budget_id, BudgetUsage.year == year,
+                                  BudgetUsage.month == month)
+                           .values(alert_level=level))
+
+
+def rebuild_budget_usage(budget_ids=None, user_id=None):
+    # คำนวณ budget_usage ใหม่จาก monthly_rollups (ไม่แจ้งเตือน แค่ตั้งระดับการแจ้งเตือนให้ตรงกับยอด)
+    query = db.session.query(Budget.budget_id, Budget.category_id, Budget.amount)
+    if budget_ids is not None:
+        query = query.filter(Budget.budget_id.in_(budget_ids))
+    if user_id is not None:
+        query = query.filter(Budget.user_id == user_id)
+    budgets = {category_id: (budget_id, limit) for budget_id, category_id, limit in query}
+    if not budgets:
+        return 0
+
+    db.session.query(BudgetUsage) \
+        .filter(BudgetUsage.budget_id.in_([budget_id for budget_id, _ in budgets.values()])) \
+        .delete(synchronize_session=False)
+    # นับเฉพาะยอดรายเดือนของเจ้าของงบ (join กับ budgets ด้วย user_id)
+    rows = db.session.query(MonthlyRollup.category_id, MonthlyRollup.year, MonthlyRollup.month,
+                            MonthlyRollup.wallet_id, func.sum(MonthlyRollup.total)) \
+        .join(Budget, and_(Budget.category_id == MonthlyRollup.category_id,
+                           Budget.user_id == MonthlyRollup.user_id)) \
+        .filter(MonthlyRollup.category_id.in_(budgets), MonthlyRollup.type == 'expense') \
+        .group_by(MonthlyRollup.category_id, MonthlyRollup.year, MonthlyRollup.month, MonthlyRollup.wallet_id) \
+        .all()
+    usage = _convert_monthly(rows, _wallet_currency_map({row[3] for row in rows})) if rows else {}
+    if usage:
+        db.session.execute(BudgetUsage.__table__.insert(), [
+            {'budget_id': budgets[category_id][0], 'year': year, 'month': month, 'spent': spent,
+             'alert_level': budget_level(spent, budgets[category_id][1])}
+            for (category_id, year, month), spent in usage.items()
+        ])
+    return len(usage)
+
+
+def budget_progress(user_id, year, month):
+    # งบทุกหมวดหมู่ของผู้ใช้ในเดือนนั้น (Query เดียว ไม่ต้อง SUM) เก็บใน Cache จนกว่าจะมีการเขียนธุรกรรม
+    cache_key = f'budgets:{user_id}:{cache_version(user_id, "summary")}:r{rates_version()}:{year}-{month}'
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    rows = db.session.query(Budget.category_id, Category.category_name, Budget.amount, BudgetUsage.spent) \
+        .join(Category, Budget.category_id == Category.category_id) \
+        .outerjoin(BudgetUsage, and_(BudgetUsage.budget_id == Budget.budget_id,
+                                     BudgetUsage.year == year, BudgetUsage.month == month)) \
+        .filter(Budget.user_id == user_id) \
+        .order_by(Category.category_name) \
+        .all()
+    progress = []
+    for category_id, category_name, limit, spent in rows:
+        spent = spent or Decimal('0')
+        progress.append({
+            'category_id': category_id,
+            'category_name': category_name,
+            'amount': str(limit),
+            'spent': str(spent),
+            'percent': round(float(spent * 100 / limit), 1) if limit else 0.0,
+        })
+    cache.set(cache_key, progress)
+    return progress
 
-#################################delete_wallet###################################################
 
-@app.route("/delete_wallet/<int:wallet_id>", methods=['POST'])
-@login_required
-def delete_wallet(wallet_id):
-    # 1. ค้นหากระเป๋า และตรวจสอบว่าเป็นของ User ที่ล็อกอินอยู่
-    wallet_to_delete = Wallet.query.filter_by(
-        wallet_id=wallet_id,
-        user_id=current_user.user_id
-    ).first_or_404()  # first_or_404 ปลอดภัยกว่า
+budgets_cli = AppGroup('budgets', help='จัดการตารางยอดใช้งบ (budget_usage)')
 
-    # 2. (สำคัญ!) ฐานข้อมูลของเราตั้งค่า ON DELETE CASCADE
-    #    หมายความว่า "ถ้าลบกระเป๋า ให้ลบธุรกรรมทั้งหมดในกระเป๋านี้ด้วย"
-    #    SQLAlchemy จะจัดการเรื่องนี้ให้เราอัตโนมัติ
 
-    db.session.delete(wallet_to_delete)
+@budgets_cli.command('rebuild')
+def rebuild_budgets_command():
+    """คำนวณ budget_usage ใหม่ทั้งหมดจาก monthly_rollups (รัน "flask rollups rebuild" ก่อนถ้ายอดรายเดือนไม่ตรง)"""
+    count = rebuild_budget_usage()
     db.session.commit()
+    click.echo(f'Rebuilt {count} budget usage rows.')
 
-    flash(f'ลบกระเป๋าเงิน "{wallet_to_delete.wallet_name}" เรียบร้อยแล้ว (ธุรกรรมทั้งหมดในกระเป๋านี้ถูกลบด้วย)',
-          'success')
-    return redirect(url_for('dashboard'))
-
-#################################edit_wallet###################################################
-
-@app.route("/edit_wallet/<int:wallet_id>", methods=['GET', 'POST'])
-@login_required
-def edit_wallet(wallet_id):
-    # 1. ค้นหากระเป๋า และตรวจสอบเจ้าของ
-    wallet_to_edit = Wallet.query.filter_by(
-        wallet_id=wallet_id,
-        user_id=current_user.user_id
-    ).first_or_404()
-
-    # 2. ถ้าเป็นการ POST (กดบันทึก)
-    if request.method == 'POST':
-        new_name = request.form.get('wallet_name')
-        if new_name:
-            wallet_to_edit.wallet_name = new_name
-            db.session.commit()
-            flash('อัปเดตชื่อกระเป๋าเงินเรียบร้อยแล้ว', 'success')
-            return redirect(url_for('dashboard'))
-
-    # 3. ถ้าเป็นการ GET (เปิดหน้าครั้งแรก)
-    #    ให้แสดงหน้า HTML สำหรับแก้ไข
-    return render_template('edit_form_template.html',
-                           item=wallet_to_edit,
-                           title="แก้ไขกระเป๋าเงิน",
-                           form_url=url_for('edit_wallet', wallet_id=wallet_id),
-                           label="ชื่อกระเป๋าเงินใหม่:",
-                           value=wallet_to_edit.wallet_name,
-                           name_field="wallet_name")
-
-###################################transaction######################################################
-
-@app.route("/add_transaction", methods=['POST'])
-@login_required
-def add_transaction():
-    # 1. ดึงข้อมูลทั้งหมดจากฟอร์ม
-    wallet_id = request.form.get('wallet_id')
-    description = request.form.get('description')
-    amount = request.form.get('amount')
-    date_str = request.form.get('date') # ได้มาเป็น string
-    type = request.form.get('type')
-    category_id = request.form.get('category_id')  # <-- (เพิ่ม!) บรรทัดที่ 1/2
-
-    # 2. (สำคัญ) ตรวจสอบว่ากระเป๋านี้เป็นของผู้ใช้จริงหรือไม่ (ป้องกันการปลอมแปลง)
-    wallet = Wallet.query.filter_by(wallet_id=wallet_id, user_id=current_user.user_id).first()
-
-    # 3. แปลง string วันที่เป็น object date
-    date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-
-    # (อัปเกรด!) ตรวจสอบ category_id ด้วย
-    if wallet and amount and date_obj and type and category_id:
-        # 4. สร้าง Object ธุรกรรมใหม่
-        new_trans = Transaction(
-            description=description,
-            amount=amount,
-            date=date_obj,
-            type=type,
-            wallet_id=wallet_id,
-            category_id=category_id  # <-- (เพิ่ม!) บรรทัดที่ 2/2
+########################################################################################
+####################################sync####################################################
+
+# ทุกครั้งที่ flush จะบันทึกการเปลี่ยนแปลงของ Wallet / Category / Transaction ลง sync_changes อัตโนมัติ
+# (ใน Transaction เดียวกับข้อมูลจริง) ส่วนคำสั่งแบบ bulk (เช่น import) ต้องเรียก record_sync_changes เอง
+#
+# หมายเหตุ: ลบกระเป๋า -> มี tombstone ของกระเป๋าแค่แถวเดียว แอปฝั่ง client ต้องลบธุรกรรมในกระเป๋านั้นเอง
+
+SYNC_ENTITIES = {Wallet: 'wallet', Category: 'category', Transaction: 'transaction'}
+SYNC_COLLECTIONS = {'wallet': 'wallets', 'category': 'categories', 'transaction': 'transactions'}
+
+# จำนวนการเปลี่ยนแปลงสูงสุดต่อหนึ่งหน้าของ /api/sync
+SYNC_PAGE_SIZE = 1000
+
+
+def _dialect_insert(connection):
+    # INSERT ... ON CONFLICT (มีทั้งใน SQLite และ PostgreSQL แต่ SQLAlchemy แยกไว้คนละ dialect)
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def record_sync_changes(connection, user_id, changes):
+    # changes = [(entity, entity_id, deleted), ...] -> แจก seq ให้ต่อจากล่าสุดของผู้ใช้
+    changes = list(dict.fromkeys(changes))
+    if not changes:
+        return
+
+    # UPDATE ... SET last_seq = last_seq + n จะล็อกแถวของผู้ใช้ไว้จนจบ Transaction
+    # -> seq ของผู้ใช้คนเดียวกันไม่ชนกัน และ commit เรียงตามลำดับ seq เสมอ (client จะไม่พลาดการเปลี่ยนแปลง)
+    counters = SyncCounter.__table__
+    result = connection.execute(
+        counters.update()
+        .where(counters.c.user_id == user_id)
+        .values(last_seq=counters.c.last_seq + len(changes))
+    )
+    if result.rowcount == 0:
+        connection.execute(counters.insert().values(user_id=user_id, last_seq=len(changes)))
+    last_seq = connection.execute(
+        db.select(counters.c.last_seq).where(counters.c.user_id == user_id)
+    ).scalar()
+
+    first_seq = last_seq - len(changes) + 1
+    insert = _dialect_insert(connection)
+    statement = insert(SyncChange.__table__)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=['user_id', 'entity', 'entity_id'],
+            set_={'seq': statement.excluded.seq, 'deleted': statement.excluded.deleted}
+        ),
+        [{'user_id': user_id, 'entity': entity, 'entity_id': entity_id, 'seq': first_seq + i, 'deleted': deleted}
+         for i, (entity, entity_id, deleted) in enumerate(changes)]
+    )
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def _track_sync_changes(session, flush_context):
+    # รวบรวมรายการที่เปลี่ยนใน flush นี้ แยกตามผู้ใช้
+    by_user = {}
+    wallet_lookups = []
+    for objects, deleted in ((session.new, False), (session.dirty, False), (session.deleted, True)):
+        for obj in objects:
+            entity = SYNC_ENTITIES.get(type(obj))
+            if entity is None or (not deleted and obj in session.dirty and not session.is_modified(obj)):
+                continue
+            change = (entity, getattr(obj, f'{entity}_id'), deleted)
+            if entity == 'transaction':
+                wallet_lookups.append((obj.wallet_id, change))
+            else:
+                by_user.setdefault(obj.user_id, []).append(change)
+
+    if not by_user and not wallet_lookups:
+        return
+
+    connection = session.connection()
+    if wallet_lookups:
+        # ธุรกรรมไม่มี user_id -> ดูจากกระเป๋า (กระเป๋าที่เพิ่งถูกลบใน flush เดียวกันจะหาไม่เจอ ซึ่งไม่เป็นไร
+        # เพราะ tombstone ของกระเป๋าครอบคลุมแล้ว)
+        owners = dict(connection.execute(
+            db.select(Wallet.wallet_id, Wallet.user_id)
+            .where(Wallet.wallet_id.in_({int(wallet_id) for wallet_id, _ in wallet_lookups}))
+        ).all())
+        for wallet_id, change in wallet_lookups:
+            user_id = owners.get(int(wallet_id))
+            if user_id is not None:
+                by_user.setdefault(user_id, []).append(change)
+
+    for user_id, changes in by_user.items():
+        record_sync_changes(connection, user_id, changes)
+
+
+def sync_entity_to_json(entity, row):
+    if entity == 'wallet':
+        return {'wallet_id': row.wallet_id, 'wallet_name': row.wallet_name, 'currency': row.currency}
+    if entity == 'category':
+        return {'category_id': row.category_id, 'category_name': row.category_name, 'type': row.type}
+    return {
+        'transaction_id': row.transaction_id,
+        'wallet_id': row.wallet_id,
+        'category_id': row.category_id,
+        'description': row.description,
+        'amount': str(row.amount),
+        'date': row.date.strftime('%Y-%m-%d'),
+        'type': row.type,
+    }
+
+
+def build_sync_delta(user_id, since, limit=SYNC_PAGE_SIZE):
+    # คืนค่าเฉพาะรายการที่เปลี่ยนหลัง seq = since (เรียงตาม seq)
+    changes = SyncChange.query.filter(SyncChange.user_id == user_id, SyncChange.seq > since) \
+        .order_by(SyncChange.seq) \
+        .limit(limit + 1) \
+        .all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    delta = {'wallets': [], 'categories': [], 'transactions': []}
+    deleted = {'wallets': [], 'categories': [], 'transactions': []}
+    upserts = {'wallet': [], 'category': [], 'transaction': []}
+    for change in changes:
+        if change.deleted:
+            deleted[SYNC_COLLECTIONS[change.entity]].append(change.entity_id)
+        else:
+            upserts[change.entity].append(change.entity_id)
+
+    # ดึงข้อมูลจริงครั้งเดียวต่อประเภท (ตรวจ user อีกชั้นเพื่อความปลอดภัย)
+    if upserts['wallet']:
+        delta['wallets'] = [sync_entity_to_json('wallet', w) for w in Wallet.query.filter(
+            Wallet.wallet_id.in_(upserts['wallet']), Wallet.user_id == user_id)]
+    if upserts['category']:
+        delta['categories'] = [sync_entity_to_json('category', c) for c in Category.query.filter(
+            Category.category_id.in_(upserts['category']), Category.user_id == user_id)]
+    if upserts['transaction']:
+        delta['transactions'] = [sync_entity_to_json('transaction', t) for t in Transaction.query
+                                 .join(Wallet, Transaction.wallet_id == Wallet.wallet_id)
+                                 .filter(Transaction.transaction_id.in_(upserts['transaction']),
+                                         Wallet.user_id == user_id)]
+
+    if changes:
+        seq = changes[-1].seq
+    else:
+        seq = max(since, db.session.query(SyncCounter.last_seq).filter_by(user_id=user_id).scalar() or 0)
+    return {'seq': seq, 'has_more': has_more, 'changed': delta, 'deleted': deleted}
+
+########################################################################################
+####################################audit###################################################
+
+# (ใหม่!) บันทึกการเพิ่ม/แก้ไข/ลบของตารางใน AUDIT_ENTITIES ทุกครั้ง พร้อมค่าก่อน/หลัง -> ตาราง audit_log
+# - ผ่าน ORM (db.session.add / แก้ attribute / db.session.delete): จับใน after_flush จาก history ของ attribute
+# - คำสั่งแบบ bulk ผ่าน db.session.execute (Query.delete / Query.update / INSERT หลายแถว): จับใน do_orm_execute
+#   DELETE/UPDATE -> SELECT แถวที่โดนก่อนครั้งเดียวต่อคำสั่ง (ค่าหลัง UPDATE = ค่าก่อน + ค่าใน SET ไม่ต้อง SELECT ซ้ำ
+#   ยกเว้น SET เป็นนิพจน์ SQL เช่น amount + 1), INSERT -> ค่าจาก parameters + id ที่ได้
+#   จึงไม่ต้องเรียกเองเหมือน record_sync_changes (ยกเว้นคำสั่งที่รันผ่าน db.engine ตรง ๆ ไม่ผ่าน Session)
+# - รายการรอใน session.info แล้วส่งให้ AuditWriter หลัง commit (rollback = ทิ้ง) request ไม่ต้องรอเขียน audit_log
+# - ข้ามได้ทีละคำสั่ง: db.session.execute(..., execution_options={'audit': False}) (เช่น seed ข้อมูลทดสอบ)
+# - DELETE ที่โดนได้ทีละมาก ๆ (เช่น ธุรกรรมทั้งกระเป๋าตอนลบกระเป๋า) ยังเก็บค่าก่อนลบครบทุกแถว
+#   อ่านทีละ AUDIT_SELECT_CHUNK แถว (yield_per) แล้วแปลงเป็นรายการทันที ไม่ถือผลลัพธ์ทั้งหมดของ SELECT ไว้พร้อมกัน
+
+AUDIT_ENTITIES = {User: 'user', Wallet: 'wallet', Category: 'category', Transaction: 'transaction',
+                  Budget: 'budget', RecurringRule: 'recurring_rule'}
+AUDIT_TABLES = {model.__table__: entity for model, entity in AUDIT_ENTITIES.items()}
+# คอลัมน์ที่ไม่เก็บค่าจริง (รู้แค่ว่ามีการเปลี่ยน)
+AUDIT_REDACTED = {'password_hash'}
+# จำนวนแถวต่อรอบที่อ่านค่าก่อนแก้/ลบของคำสั่ง bulk
+AUDIT_SELECT_CHUNK = 500
+
+
+def audit_writer():
+    # audit.AuditWriter ของแอปนี้ (None = AUDIT_LOG ปิด) สร้างใน create_app()
+    return current_app.extensions.get('audit')
+
+
+def _audit_values(table, values):
+    # {คอลัมน์: ค่า} -> dict ที่เก็บเป็น JSON ได้ (เฉพาะคอลัมน์ของตารางที่มีค่าอยู่)
+    return {column.key: '[redacted]' if column.key in AUDIT_REDACTED else to_json_value(values[column.key])
+            for column in table.columns if column.key in values}
+
+
+def _audit_actor():
+    # Flask-Login เก็บผู้ใช้ที่โหลดแล้วไว้ใน g._login_user (ไม่ไปโหลดใหม่ระหว่าง flush)
+    user = g.get('_login_user') if has_request_context() else None
+    return user.user_id if user is not None and user.is_authenticated else None
+
+
+def _audit_source():
+    if has_request_context():
+        return f'{request.method} {request.path}'[:200]
+    command = click.get_current_context(silent=True)
+    if command is not None:
+        return command.command_path[:200]
+    return f'thread:{threading.current_thread().name}'[:200]
+
+
+def queue_audit_records(session, records):
+    # records = [(entity, entity_id, action, before, after), ...] -> ส่งให้ AuditWriter หลัง commit
+    if not records:
+        return
+    actor_id, source = _audit_actor(), _audit_source()
+    session.info.setdefault('audit_pending', []).extend(
+        audit_record(entity, entity_id, action, before, after, actor_id, source)
+        for entity, entity_id, action, before, after in records)
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def _audit_flush(session, flush_context):
+    if audit_writer() is None:
+        return
+    records = []
+    for objects, action in ((session.new, 'create'), (session.dirty, 'update'), (session.deleted, 'delete')):
+        for obj in objects:
+            entity = AUDIT_ENTITIES.get(type(obj))
+            if entity is None:
+                continue
+            table = obj.__table__
+            state = db.inspect(obj)
+            values = _audit_values(table, state.dict)
+            entity_id = state.dict.get(table.primary_key.columns[0].key)
+            if action == 'create':
+                records.append((entity, entity_id, action, None, values))
+            elif action == 'delete':
+                records.append((entity, entity_id, action, values, None))
+            else:
+                # ค่าก่อนแก้มาจาก history (ค่าเดิมที่ไม่เคยโหลดขึ้นมา = None)
+                old = {column.key: (state.attrs[column.key].history.deleted or [None])[0]
+                       for column in table.columns if state.attrs[column.key].history.has_changes()}
+                if old:
+                    records.append((entity, entity_id, action, dict(values, **_audit_values(table, old)), values))
+    queue_audit_records(session, records)
+
+
+def _audit_set_values(table, statement):
+    # ค่าใน SET ของ UPDATE เป็น {คอลัมน์: ค่า} (None = มีนิพจน์ SQL / ค่าที่ฐานข้อมูลคำนวณเอง ต้อง SELECT ค่าหลังจริง)
+    if not statement._values or any(column.onupdate is not None for column in table.columns):
+        return None
+    values = {}
+    for key, value in statement._values.items():
+        key = key if isinstance(key, str) else getattr(key, 'key', None)
+        if key is None or key not in table.columns:
+            return None
+        if not isinstance(value, BindParameter) or value.callable is not None:
+            return None
+        values[key] = value.value
+    return values
+
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _audit_bulk_statement(orm_execute_state):
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete) or not state.execution_options.get('audit', True):
+        return None
+    table = getattr(state.statement, 'table', None)
+    entity = AUDIT_TABLES.get(table)
+    if entity is None or audit_writer() is None:
+        return None
+    primary_key = table.primary_key.columns[0]
+
+    if state.is_insert:
+        parameters = state.parameters or [state.statement.compile().params]
+        if isinstance(parameters, dict):
+            parameters = [parameters]
+        if state.statement.returning_column_descriptions:
+            # INSERT ... RETURNING ของผู้เรียก: อ่านผลไว้ก่อนแล้วคืนสำเนาให้ผู้เรียกอ่านต่อได้ตามปกติ
+            frozen = state.invoke_statement().freeze()
+            ids = [row._mapping.get(primary_key.key) for row in frozen()]
+            result = frozen()
+        else:
+            result = state.invoke_statement(statement=state.statement.return_defaults(sort_by_parameter_order=True))
+            ids = [row[0] for row in result.inserted_primary_key_rows]
+        if len(ids) != len(parameters):
+            ids = [None] * len(parameters)
+        queue_audit_records(state.session, [
+            (entity, entity_id, 'create', None, _audit_values(table, dict(values, **{primary_key.key: entity_id})))
+            for values, entity_id in zip(parameters, ids)])
+        return result
+
+    if state.is_executemany:
+        # UPDATE/DELETE ทีละหลายชุด parameter (เช่น เลื่อน next_run ของกฎที่เกิดซ้ำ) เป็นงานภายในระบบ ไม่บันทึก
+        return None
+    if state.session.autoflush:
+        state.session.flush()  # ให้ SELECT ด้านล่างเห็นสิ่งที่ยังค้างใน Session เหมือนคำสั่งจริง
+    # ใช้ connection เดียวกับคำสั่งจริง (ฐานข้อมูลหลัก ใน Transaction เดียวกัน)
+    connection = state.session.connection(bind_arguments=state.bind_arguments)
+    query = db.select(table)
+    if state.statement.whereclause is not None:
+        query = query.where(state.statement.whereclause)
+    rows = connection.execution_options(yield_per=AUDIT_SELECT_CHUNK).execute(query).mappings()
+
+    if state.is_delete:
+        # อ่านค่าก่อนลบให้ครบก่อนรันคำสั่งจริง (ทีละก้อน)
+        for chunk in rows.partitions():
+            queue_audit_records(state.session, [
+                (entity, row[primary_key.key], 'delete', _audit_values(table, row), None) for row in chunk])
+        return state.invoke_statement()
+    before = {row[primary_key.key]: _audit_values(table, row) for row in rows}
+    result = state.invoke_statement()
+    changes = None if state.parameters else _audit_set_values(table, state.statement)
+    if changes is not None:
+        changes = _audit_values(table, changes)
+        after = {entity_id: dict(values, **changes) for entity_id, values in before.items()}
+    else:
+        after = {}
+        for chunk in chunked(list(before), AUDIT_SELECT_CHUNK):
+            for row in connection.execute(db.select(table).where(primary_key.in_(chunk))).mappings():
+                after[row[primary_key.key]] = _audit_values(table, row)
+    queue_audit_records(state.session, [(entity, entity_id, 'update', before[entity_id], values)
+                                        for entity_id, values in after.items() if values != before[entity_id]])
+    return result
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def _audit_after_commit(session):
+    records = session.info.pop('audit_pending', None)
+    writer = audit_writer()
+    if records and writer is not None:
+        writer.submit(records)
+
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _audit_after_rollback(session):
+    session.info.pop('audit_pending', None)
+
+
+def _write_audit_batch(app, records):
+    # เรียกจาก Thread ของ AuditWriter (นอก request) -> ใช้ connection แยก ไม่ผ่าน db.session (ไม่ถูก audit ซ้ำ)
+    # event_id ที่มีอยู่แล้ว (เขียนซ้ำจากไฟล์ spool) จะถูกข้าม
+    rows = [{
+        'event_id': record['event_id'],
+        'occurred_at': datetime.fromisoformat(record['occurred_at']),
+        'actor_id': record['actor_id'],
+        'entity': record['entity'],
+        'entity_id': record['entity_id'],
+        'action': record['action'],
+        'old_values': json.dumps(record['before'], ensure_ascii=False) if record['before'] is not None else None,
+        'new_values': json.dumps(record['after'], ensure_ascii=False) if record['after'] is not None else None,
+        'source': record['source'],
+    } for record in records]
+    with app.app_context(), db.engine.begin() as connection:
+        insert = _dialect_insert(connection)
+        connection.execute(insert(AuditLog.__table__).on_conflict_do_nothing(index_elements=['event_id']), rows)
+
+
+audit_cli = AppGroup('audit', help='บันทึกการเปลี่ยนแปลงข้อมูล (audit_log)')
+
+
+@audit_cli.command('replay')
+def replay_audit_command():
+    """เขียนรายการที่ค้างในไฟล์ spool ของ process ที่ตายไปแล้วลงฐานข้อมูล"""
+    writer = audit_writer()
+    if writer is None:
+        raise click.ClickException('AUDIT_LOG is disabled')
+    click.echo(f'Replayed {writer.replay_orphans():,} audit records from {writer.spool_dir}.')
+
+########################################################################################
+####################################recurring###############################################
+
+# (ใหม่!) สร้างธุรกรรมจาก RecurringRule ที่ถึงกำหนด
+# - ทีละก้อน: ดึงกฎที่ถึงกำหนดทีละ RECURRING_RULE_BATCH กฎ -> INSERT ธุรกรรมทั้งก้อนในคำสั่งเดียว
+#   + อัปเดตยอดสะสม / sync ครั้งเดียวต่อก้อน แล้ว commit
+# - ระบบล่มไปหลายวัน: รอบถัดไปจะสร้างย้อนหลังให้ครบ (ไม่เกิน RECURRING_MAX_CATCHUP ครั้งต่อกฎต่อก้อน)
+# - รันซ้ำ/รันพร้อมกันไม่สร้างซ้ำ:
+#     1. ต้องถือ lease ชื่อ 'recurring' ก่อน (ตาราง scheduler_leases) -> ทั้งระบบมีคนรันได้ทีละคน
+#     2. เลื่อน next_run แบบ compare-and-set (WHERE next_run = ค่าเดิม) ใน Transaction เดียวกับ INSERT
+#        ถ้ามีใครเลื่อนไปก่อนแล้ว -> rollback ทั้งก้อน
+
+RECURRING_RULE_BATCH = 200
+RECURRING_MAX_CATCHUP = 400
+RECURRING_LEASE_NAME = 'recurring'
+RECURRING_LEASE_SECONDS = 300
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def acquire_lease(name, owner, seconds):
+    # ได้ lease ถ้ายังไม่มีใครถือ / lease เดิมหมดอายุแล้ว / เราถืออยู่แล้ว (ต่ออายุ)
+    # ใช้ connection แยกจาก db.session -> commit ทันที ไม่ปนกับงานที่ทำอยู่
+    table = SchedulerLease.__table__
+    now = _utcnow()
+    expires_at = now + timedelta(seconds=seconds)
+    with db.engine.begin() as connection:
+        result = connection.execute(
+            table.update()
+            .where(table.c.name == name)
+            .where(or_(table.c.owner == owner, table.c.expires_at < now))
+            .values(owner=owner, expires_at=expires_at)
         )
-        db.session.add(new_trans)
+        if result.rowcount:
+            return True
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(table.insert().values(name=name, owner=owner, expires_at=expires_at))
+        return True
+    except IntegrityError:
+        return False
+
+
+def release_lease(name, owner):
+    table = SchedulerLease.__table__
+    with db.engine.begin() as connection:
+        connection.execute(table.delete().where(table.c.name == name).where(table.c.owner == owner))
+
+
+def materialize_recurring_rules(today=None, owner=None, batch_size=RECURRING_RULE_BATCH,
+                                max_catchup=RECURRING_MAX_CATCHUP, rule_ids=None):
+    # สร้างธุรกรรมของกฎที่ถึงกำหนด (next_run <= today) จนหมด
+    # owner = ชื่อผู้ถือ lease (ต่ออายุทุกก้อน ถ้าเสีย lease ไประหว่างทางจะหยุดทันที)
+    # rule_ids = ทำเฉพาะกฎเหล่านี้ (เช่น กฎที่เพิ่งสร้าง ไม่ต้องรอรอบของงานเบื้องหลัง)
+    today = today or datetime.now().date()
+    rules_table = RecurringRule.__table__
+    advance_rule = rules_table.update() \
+        .where(rules_table.c.rule_id == bindparam('b_rule_id')) \
+        .where(rules_table.c.next_run == bindparam('b_old_next_run')) \
+        .values(next_run=bindparam('b_next_run'), active=bindparam('b_active'))
+    result = {'rules': 0, 'transactions': 0}
+
+    while True:
+        if owner and not acquire_lease(RECURRING_LEASE_NAME, owner, RECURRING_LEASE_SECONDS):
+            break
+        query = db.session.query(RecurringRule) \
+            .filter(RecurringRule.active.is_(True), RecurringRule.next_run <= today)
+        if rule_ids is not None:
+            query = query.filter(RecurringRule.rule_id.in_(rule_ids))
+        rules = query.order_by(RecurringRule.next_run, RecurringRule.rule_id).limit(batch_size).all()
+        if not rules:
+            break
+
+        values, value_users, advances = [], [], []
+        for rule in rules:
+            dates, next_date = occurrences(rule.frequency, rule.interval, rule.rrule, rule.start_date,
+                                           rule.end_date, rule.next_run, today, max_catchup)
+            for occurrence_date in dates:
+                values.append({
+                    'description': rule.description,
+                    'amount': Decimal(str(rule.amount)),
+                    'date': occurrence_date,
+                    'type': rule.type,
+                    'wallet_id': rule.wallet_id,
+                    'category_id': rule.category_id,
+                })
+                value_users.append(rule.user_id)
+            advances.append({'b_rule_id': rule.rule_id, 'b_old_next_run': rule.next_run,
+                             'b_next_run': next_date or rule.next_run, 'b_active': next_date is not None})
+
+        updated = db.session.execute(advance_rule, advances).rowcount
+        # driver บางตัวนับ rowcount ของ executemany ไม่ได้ -> เหลือแค่ lease ที่กันการรันซ้ำ
+        if db.engine.dialect.supports_sane_multi_rowcount and updated != len(advances):
+            # มีคนอื่นสร้างธุรกรรมของกฎเหล่านี้ไปแล้ว (เช่น lease หมดอายุระหว่างรัน)
+            db.session.rollback()
+            current_app.logger.warning('Recurring rules changed while materialising, stopping this run')
+            break
+
+        user_ids = set(value_users)
+        if values:
+            # sort_by_parameter_order -> transaction_id ที่ได้กลับมาเรียงตาม values (จับคู่กับเจ้าของได้)
+            new_ids = db.session.execute(
+                Transaction.__table__.insert().returning(Transaction.__table__.c.transaction_id,
+                                                         sort_by_parameter_order=True), values
+            ).scalars().all()
+            changes_by_user = {}
+            for user_id, transaction_id in zip(value_users, new_ids):
+                changes_by_user.setdefault(user_id, []).append(('transaction', transaction_id, False))
+            for user_id, changes in changes_by_user.items():
+                record_sync_changes(db.session.connection(), user_id, changes)
+            apply_bulk_transaction_effects(added=values)
         db.session.commit()
-        flash('บันทึกธุรกรรมสำเร็จ!', 'success')
-    else:
-        flash('ข้อมูลไม่ถูกต้อง หรือคุณไม่ได้เลือกหมวดหมู่', 'danger')
 
-    return redirect(url_for('dashboard'))
+        for user_id in user_ids:
+            bump_cache_version(user_id, 'summary')
+        result['rules'] += len(rules)
+        result['transactions'] += len(values)
+
+    return result
+
+
+def run_recurring_rules(owner, today=None):
+    # 1 รอบของงานเบื้องหลัง คืนค่า None ถ้ามีคนอื่นกำลังรันอยู่
+    if not acquire_lease(RECURRING_LEASE_NAME, owner, RECURRING_LEASE_SECONDS):
+        return None
+    try:
+        return materialize_recurring_rules(today, owner)
+    finally:
+        release_lease(RECURRING_LEASE_NAME, owner)
+
+
+def _recurring_scheduler_loop(app, owner, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                result = run_recurring_rules(owner)
+                if result and result['transactions']:
+                    app.logger.info('Created %d recurring transactions from %d rules',
+                                    result['transactions'], result['rules'])
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Recurring scheduler run failed')
+
+
+_recurring_thread = None
+_recurring_thread_lock = threading.Lock()
+
+
+def _start_recurring_scheduler():
+    # เริ่ม Thread ตอนมี request แรก (ไม่ใช่ตอน import -> ไม่ติดไปกับคำสั่ง flask CLI)
+    # ทุก worker เริ่ม Thread ของตัวเอง แต่ lease ทำให้มีแค่ตัวเดียวที่ได้รันในแต่ละรอบ
+    global _recurring_thread
+    interval = current_app.config['RECURRING_SCHEDULER_INTERVAL']
+    if not interval or _recurring_thread is not None:
+        return
+    with _recurring_thread_lock:
+        if _recurring_thread is None:
+            owner = f'{socket.gethostname()}:{os.getpid()}'
+            _recurring_thread = threading.Thread(target=_recurring_scheduler_loop,
+                                                 args=(current_app._get_current_object(), owner, interval),
+                                                 name='recurring-scheduler', daemon=True)
+            _recurring_thread.start()
+
+
+recurring_cli = AppGroup('recurring', help='ธุรกรรมที่เกิดซ้ำ (recurring_rules)')
+
+
+@recurring_cli.command('run')
+@click.option('--date', 'run_date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='สร้างธุรกรรมที่ถึงกำหนดถึงวันที่นี้ (ค่าเริ่มต้น = วันนี้)')
+def run_recurring_command(run_date):
+    """สร้างธุรกรรมจากกฎที่ถึงกำหนด (ใช้กับ cron แทน Thread ในเว็บได้)"""
+    owner = f'cli:{socket.gethostname()}:{os.getpid()}'
+    result = run_recurring_rules(owner, run_date.date() if run_date else None)
+    if result is None:
+        raise click.ClickException('Another worker is running recurring rules right now')
+    click.echo(f'Created {result["transactions"]:,} transactions from {result["rules"]:,} rule runs.')
 
+########################################################################################
+####################################metrics#################################################
+
+# (ใหม่!) วัดเวลา/จำนวน Query ของทุก request แล้วเปิดดูที่ /metrics (ดู metrics.py)
+# ถ้า request ไหนช้ากว่า SLOW_REQUEST_MS จะเขียน log พร้อม Query ที่ช้าที่สุดของ request นั้น
+#
+# หมายเหตุ: response แบบ streaming (เช่น /export) นับเวลาถึงตอนเริ่มส่งข้อมูลเท่านั้น
+
+# เก็บ SQL ไว้สูงสุดกี่คำสั่งต่อ request (สำหรับ slow-request log)
+QUERY_CAPTURE_LIMIT = 200
+
+metrics = Registry()
+request_latency = metrics.histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'method', 'status'))
+request_queries = metrics.histogram(
+    'http_request_db_queries', 'SQL statements per request', ('endpoint',), buckets=COUNT_BUCKETS)
+request_sql_time = metrics.histogram(
+    'http_request_db_seconds', 'Total SQL time per request', ('endpoint',))
+template_render = metrics.histogram(
+    'template_render_seconds', 'render_template time by template', ('template',))
+slow_requests = metrics.counter(
+    'http_slow_requests_total', 'Requests slower than SLOW_REQUEST_MS', ('endpoint',))
+metrics.gauge('cache_hits_total', 'Cache hits (this worker)', lambda: cache.hits)
+metrics.gauge('cache_misses_total', 'Cache misses (this worker)', lambda: cache.misses)
+metrics.gauge('cache_hit_ratio', 'Cache hits / lookups (this worker)',
+              lambda: cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0)
+metrics.gauge('db_pool_checkout_wait_seconds_max', 'Longest wait for a DB connection',
+              lambda: pool_stats.max_wait)
+metrics.gauge('db_pool_checkouts_total', 'DB connection checkouts', lambda: pool_stats.checkouts)
+metrics.gauge('db_pool_checked_out', 'DB connections in use', lambda: pool_stats.checked_out)
+metrics.gauge('db_pool_timeouts_total', 'Timed-out waits for a DB connection', lambda: pool_stats.timeouts)
+metrics.gauge('audit_pending_records', 'Audit records not yet written (this worker)',
+              lambda: audit_writer().pending if audit_writer() is not None else 0)
+metrics.gauge('audit_write_failures_total', 'Failed audit_log batch writes (this worker)',
+              lambda: audit_writer().failures if audit_writer() is not None else 0)
+
+
+def _endpoint_label():
+    return request.endpoint or 'unmatched'
+
+
+def _start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+    g.sql_statements = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or not conn.info.get('query_started'):
+        return
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if 'sql_count' not in g:
+        return
+    g.sql_count += 1
+    g.sql_time += elapsed
+    if len(g.sql_statements) < QUERY_CAPTURE_LIMIT:
+        g.sql_statements.append((elapsed, statement))
+
+
+def _discard_failed_query(exception_context):
+    # Query ที่ error จะไม่มี after_cursor_execute -> เอาเวลาเริ่มออกจาก stack
+    started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_request_metrics(engine):
+    # นับเวลา/จำนวน Query ต่อ request (เรียกจาก create_app() ทั้งตัวหลักและ replica)
+    db.event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    db.event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    db.event.listen(engine, 'handle_error', _discard_failed_query)
+
+
+def _start_template_timer(sender, template, context, **extra):
+    g.setdefault('template_started', []).append(time.perf_counter())
+
+
+def _record_template_time(sender, template, context, **extra):
+    started = g.get('template_started')
+    if started:
+        template_render.observe(time.perf_counter() - started.pop(), template.name or 'string')
+
+
+def _record_request_metrics(response):
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = _endpoint_label()
+    request_latency.observe(elapsed, endpoint, request.method, str(response.status_code))
+    request_queries.observe(g.sql_count, endpoint)
+    request_sql_time.observe(g.sql_time, endpoint)
+
+    if elapsed * 1000 >= current_app.config['SLOW_REQUEST_MS']:
+        slow_requests.inc(endpoint)
+        slowest = sorted(g.sql_statements, key=lambda item: -item[0])[:5]
+        current_app.logger.warning(
+            'Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms in SQL%s',
+            request.method, request.path, endpoint, elapsed * 1000, g.sql_count, g.sql_time * 1000,
+            ''.join(f'\n  {duration * 1000:.1f} ms: {" ".join(statement.split())[:500]}'
+                    for duration, statement in slowest))
+    return response
 
-#####################################wallet_detail##########################################
 
-@app.route("/wallet/<int:wallet_id>")
-@login_required
-def wallet_detail(wallet_id):
-    # 1. ตรวจสอบความปลอดภัย: ดึงกระเป๋าที่ ID ตรงกัน "และ" เป็นของ user ที่ล็อกอินอยู่
-    wallet = Wallet.query.filter_by(wallet_id=wallet_id, user_id=current_user.user_id).first_or_404()
+########################################################################################
+####################################migrations##############################################
+
+db_cli = AppGroup('db', help='จัดการโครงสร้างฐานข้อมูล (ดู migrations.py)')
+
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='อัปเกรดถึงเวอร์ชันนี้ (ค่าเริ่มต้น = ล่าสุด)')
+@click.option('--sql', 'offline', is_flag=True, help='พิมพ์ SQL ออกมาแทนการรันจริง')
+@click.option('--dialect', type=click.Choice(migrations.SUPPORTED_DIALECTS), default=None,
+              help='ใช้กับ --sql (ค่าเริ่มต้น = ตามฐานข้อมูลที่ตั้งค่าไว้)')
+@click.option('--from', 'from_version', type=int, default=0, help='ใช้กับ --sql: เวอร์ชันปัจจุบันของฐานข้อมูล')
+def db_upgrade_command(target, offline, dialect, from_version):
+    """อัปเกรดโครงสร้างฐานข้อมูลเป็นเวอร์ชันล่าสุด"""
+    if offline:
+        dialect = dialect or make_url(current_app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+        click.echo(migrations.render_sql(dialect, from_version, target))
+        return
+
+    applied = migrations.upgrade(db.engine, target, echo=click.echo)
+    if not applied:
+        click.echo('Database is already up to date.')
+
+
+@db_cli.command('current')
+def db_current_command():
+    """แสดงเวอร์ชันปัจจุบันของฐานข้อมูล"""
+    with db.engine.begin() as connection:
+        version = migrations.current_version(connection)
+    click.echo(f'Current version: {version} (latest: {migrations.latest_version()})')
+
+
+# (ใหม่!) แบ่งตาราง transactions เป็น Partition (ดู partitioning.py) ไม่บังคับ ใช้ได้กับ PostgreSQL เท่านั้น
+partitions_cli = AppGroup('partitions', help='แบ่งตาราง transactions เป็น Partition (PostgreSQL)')
+
+
+def _require_postgresql():
+    if db.engine.dialect.name != 'postgresql':
+        raise click.ClickException('Partitioning is only supported on PostgreSQL')
+
+
+@partitions_cli.command('create')
+@click.option('--by', 'scheme', type=click.Choice(PARTITION_SCHEMES), required=True,
+              help='year = แบ่งตามปีของวันที่, hash = แบ่งตาม wallet_id')
+@click.option('--partitions', type=int, default=DEFAULT_HASH_PARTITIONS, help='จำนวน Partition (ใช้กับ --by hash)')
+@click.option('--sql', 'dry_run', is_flag=True, help='พิมพ์ SQL ออกมาแทนการรันจริง')
+def create_partitions_command(scheme, partitions, dry_run):
+    """ย้ายข้อมูลใน transactions ไปตารางแบบ Partition (ตารางเดิมเปลี่ยนชื่อเป็น transactions_unpartitioned)"""
+    _require_postgresql()
+    with db.engine.begin() as connection:
+        if migrations.current_version(connection) < migrations.latest_version():
+            raise click.ClickException('Run "flask db upgrade" first')
+        kind = connection.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('transactions')")).scalar()
+        if kind == 'p':
+            raise click.ClickException('transactions is already partitioned')
+        first, last = connection.execute(text('SELECT MIN(date), MAX(date) FROM transactions')).one()
+
+    # สร้าง Partition รายปีถึงปีหน้าไว้ก่อน
+    this_year = datetime.now().year
+    first_year = first.year if first else this_year
+    last_year = max(last.year if last else this_year, this_year + 1)
+    try:
+        statements = partition_statements(scheme, first_year, last_year, partitions)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    if dry_run:
+        click.echo('BEGIN;')
+        for statement in statements:
+            click.echo(textwrap.dedent(statement).strip() + ';')
+        click.echo('COMMIT;')
+        return
+
+    started = time.perf_counter()
+    with db.engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    click.echo(f'Partitioned transactions by {scheme} in {time.perf_counter() - started:.1f}s. '
+               f'Old table kept as transactions_unpartitioned (DROP it once verified).')
+
+
+@partitions_cli.command('add-year')
+@click.argument('year', type=int)
+def add_year_partition_command(year):
+    """เพิ่ม Partition ของปีที่ระบุ (ใช้กับ --by year ควรรันก่อนขึ้นปีใหม่)"""
+    _require_postgresql()
+    with db.engine.begin() as connection:
+        connection.execute(text(year_partition_sql('transactions', year)))
+    click.echo(f'Partition transactions_y{year} is ready.')
 
-    # 2. ดึงธุรกรรมเฉพาะของกระเป๋านี้
-    transactions = Transaction.query.filter_by(wallet_id=wallet_id).order_by(Transaction.date.desc()).all()
+########################################################################################
+####################################password################################################
 
-    # 3. คำนวณยอดคงเหลือเฉพาะของกระเป๋านี้
-    total_income = sum(float(t.amount) for t in transactions if t.type == 'income')
-    total_expense = sum(float(t.amount) for t in transactions if t.type == 'expense')
-    balance = total_income - total_expense
+# bcrypt ใช้ CPU หนักมาก (ตั้งใจให้ช้า) จึง:
+#   1. ส่งไปคำนวณใน password_pool -> จำนวนที่คำนวณพร้อมกันมีจำกัด ที่เหลือรอคิว
+#   2. ถ้าคิวเต็ม -> ปฏิเสธทันที (PasswordPoolBusy) ดีกว่าปล่อยให้ทุก request ค้าง
+#   3. ถ้าค่า BCRYPT_LOG_ROUNDS เปลี่ยน -> hash ใหม่เบื้องหลังหลังล็อกอินสำเร็จ
+#
+# หมายเหตุ: hash_password / check_password ยังรอผลใน Thread ของ request (ยกเว้น schedule_rehash)
 
-    # 4. ส่งข้อมูลไปแสดงผลที่ template ใหม่
-    return render_template('wallet_detail.html',
-                           wallet=wallet,
-                           transactions=transactions,
-                           balance=balance)
+class PasswordPoolBusy(Exception):
+    pass
 
-###############################category################################################
 
-@app.route("/add_category", methods=['POST'])
-@login_required
-def add_category():
-    category_name = request.form.get('category_name')
-    category_type = request.form.get('category_type')  # 'income' หรือ 'expense'
+def submit_password_job(fn, *args):
+    # ที่ว่างในคิว = BCRYPT_MAX_WORKERS + BCRYPT_MAX_PENDING (สร้างใน create_app())
+    slots = current_app.extensions['password_slots']
+    if not slots.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    future = password_pool.submit(fn, *args)
+    future.add_done_callback(lambda _: slots.release())
+    return future
 
-    if category_name and category_type:
-        new_category = Category(
-            category_name=category_name,
-            type=category_type,
-            user_id=current_user.user_id
-        )
-        db.session.add(new_category)
-        db.session.commit()
-        flash('สร้างหมวดหมู่ใหม่สำเร็จ!', 'success')
-    else:
-        flash('ข้อมูลไม่ครบถ้วน', 'danger')
 
-    return redirect(url_for('dashboard'))
+def hash_password(password):
+    return submit_password_job(bcrypt.generate_password_hash, password).result().decode('utf-8')
 
 
-@app.route("/delete_category/<int:category_id>", methods=['POST'])
-@login_required
-def delete_category(category_id):
-    # 1. ค้นหาหมวดหมู่ และตรวจสอบว่าเป็นของ User ที่ล็อกอินอยู่
-    cat_to_delete = Category.query.filter_by(
-        category_id=category_id,
-        user_id=current_user.user_id
-    ).first_or_404()
+def check_password(password_hash, password):
+    return submit_password_job(bcrypt.check_password_hash, password_hash, password).result()
 
-    # 2. (สำคัญ!) ฐานข้อมูลของเราตั้งค่า ON DELETE SET NULL
-    #    หมายความว่า "ถ้าลบหมวดหมู่ ให้ตั้งค่า category_id ใน transactions เป็น NULL"
-    #    SQLAlchemy จะจัดการเรื่องนี้ให้เราอัตโนมัติ
 
-    db.session.delete(cat_to_delete)
-    db.session.commit()
+def password_needs_rehash(password_hash):
+    # รูปแบบ hash: $2b$<rounds>$<salt+hash>
+    try:
+        return int(password_hash.split('$')[2]) != current_app.config['BCRYPT_LOG_ROUNDS']
+    except (IndexError, ValueError):
+        return True
 
-    flash(f'ลบหมวดหมู่ "{cat_to_delete.category_name}" เรียบร้อยแล้ว (ธุรกรรมเก่าจะถูกตั้งเป็น "ไม่มีหมวดหมู่")',
-          'success')
-    return redirect(url_for('dashboard'))
-
-###############################edit_category################################################
-
-@app.route("/edit_category/<int:category_id>", methods=['GET', 'POST'])
-@login_required
-def edit_category(category_id):
-    # 1. ค้นหาหมวดหมู่ และตรวจสอบเจ้าของ
-    cat_to_edit = Category.query.filter_by(
-        category_id=category_id,
-        user_id=current_user.user_id
-    ).first_or_404()
-
-    # 2. ถ้าเป็นการ POST (กดบันทึก)
-    if request.method == 'POST':
-        new_name = request.form.get('category_name')
-        # (เราสามารถเพิ่มการแก้ไข type ได้ แต่ตอนนี้เอาแค่ชื่อก่อน)
-        if new_name:
-            cat_to_edit.category_name = new_name
-            db.session.commit()
-            flash('อัปเดตชื่อหมวดหมู่เรียบร้อยแล้ว', 'success')
-            return redirect(url_for('dashboard'))
-
-    # 3. ถ้าเป็นการ GET (เปิดหน้าครั้งแรก)
-    #    (อัจฉริยะ!) เราใช้ Template อเนกประสงค์เดิมได้เลย!
-    return render_template('edit_form_template.html',
-                           item=cat_to_edit,
-                           title="แก้ไขหมวดหมู่",
-                           form_url=url_for('edit_category', category_id=category_id),
-                           label="ชื่อหมวดหมู่ใหม่:",
-                           value=cat_to_edit.category_name,
-                           name_field="category_name")
-
-###############################delete_transaction################################################
-
-@app.route("/delete_transaction/<int:transaction_id>", methods=['POST'])
-@login_required
-def delete_transaction(transaction_id):
-    # 1. ค้นหาธุรกรรมที่ต้องการลบ
-    transaction_to_delete = Transaction.query.get(transaction_id)
-
-    if not transaction_to_delete:
-        flash('ไม่พบธุรกรรมที่ต้องการลบ', 'danger')
-        return redirect(url_for('dashboard'))
-
-    # 2. (สำคัญ!) ตรวจสอบความปลอดภัย
-    #    เช็กว่าธุรกรรมนี้ อยู่ในกระเป๋าที่เป็นของผู้ใช้ที่ล็อกอินอยู่หรือไม่
-    wallet_owner = Wallet.query.filter_by(
-        wallet_id=transaction_to_delete.wallet_id,
-        user_id=current_user.user_id
-    ).first()
-
-    if wallet_owner:
-        # 3. ถ้าเป็นเจ้าของจริง ให้ลบ
-        db.session.delete(transaction_to_delete)
-        db.session.commit()
-        flash('ลบธุรกรรมเรียบร้อยแล้ว', 'success')
-    else:
-        # 4. ถ้าพยายามลบของคนอื่น
-        flash('คุณไม่มีสิทธิ์ลบธุรกรรมนี้', 'danger')
-
-    # 5. กลับไปหน้า Dashboard
-    # (เราสามารถทำให้มันฉลาดขึ้นโดยการ redirect กลับไปหน้าที่มาได้ แต่ตอนนี้เอาแบบง่ายก่อน)
-    return redirect(url_for('dashboard'))
-
-##########################edit_transaction################################################
-
-@app.route("/edit_transaction/<int:transaction_id>", methods=['GET', 'POST'])
-@login_required
-def edit_transaction(transaction_id):
-    # 1. ค้นหาธุรกรรม
-    transaction_to_edit = Transaction.query.get(transaction_id)
-    if not transaction_to_edit:
-        flash('ไม่พบธุรกรรม', 'danger')
-        return redirect(url_for('dashboard'))
-
-    # 2. ตรวจสอบความปลอดภัย (เหมือนตอนลบ)
-    wallet_owner = Wallet.query.filter_by(
-        wallet_id=transaction_to_edit.wallet_id,
-        user_id=current_user.user_id
-    ).first()
-    if not wallet_owner:
-        flash('คุณไม่มีสิทธิ์แก้ไขธุรกรรมนี้', 'danger')
-        return redirect(url_for('dashboard'))
-
-    # 3. ดึงข้อมูลสำหรับ Dropdown (กระเป๋า, หมวดหมู่)
-    user_wallets = Wallet.query.filter_by(user_id=current_user.user_id).all()
-    categories = Category.query.filter_by(user_id=current_user.user_id).all()
-    income_categories = [c for c in categories if c.type == 'income']
-    expense_categories = [c for c in categories if c.type == 'expense']
-
-    # 4. ถ้าเป็นการ POST (กดบันทึกการแก้ไข)
-    if request.method == 'POST':
-        # 5. ดึงข้อมูลใหม่จากฟอร์ม
-        transaction_to_edit.wallet_id = request.form.get('wallet_id')
-        transaction_to_edit.description = request.form.get('description')
-        transaction_to_edit.amount = request.form.get('amount')
-        transaction_to_edit.date = datetime.strptime(request.form.get('date'), '%Y-%m-%d').date()
-        transaction_to_edit.type = request.form.get('type')
-        transaction_to_edit.category_id = request.form.get('category_id')
-
-        # 6. บันทึก (Commit) การเปลี่ยนแปลง
-        db.session.commit()
-        flash('อัปเดตธุรกรรมเรียบร้อยแล้ว', 'success')
-        return redirect(url_for('dashboard'))
-
-    # 7. ถ้าเป็นการ GET (เปิดหน้าแก้ไขครั้งแรก)
-    #    ให้แสดง HTML พร้อมข้อมูลเก่า
-    return render_template('edit_transaction.html',
-                           transaction=transaction_to_edit,
-                           user_wallets=user_wallets,
-                           income_categories=income_categories,
-                           expense_categories=expense_categories)
-
-###############################API#################################
-
-@app.route("/api/category_summary")
-@login_required
-def category_summary():
-    # --- 1. อ่านค่า Filter จาก URL (เหมือนกับใน dashboard) ---
-    selected_wallet_id = request.args.get('wallet_id', type=int)
-    date_from_str = request.args.get('date_from')
-    date_to_str = request.args.get('date_to')
 
-    # --- 2. ตั้งค่าวันที่เริ่มต้น (เหมือนกับใน dashboard) ---
-    today = datetime.now()
-    if date_from_str:
-        date_from_obj = datetime.strptime(date_from_str, '%Y-%m-%d').date()
-    else:
-        date_from_obj = today.replace(day=1).date()
+def _rehash_password(engine, user_id, old_hash, password):
+    new_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+    # อัปเดตเฉพาะถ้ายังเป็น hash เดิมอยู่ (ถ้ามีการเปลี่ยนรหัสผ่านระหว่างนี้ จะไม่ทับ)
+    with engine.begin() as connection:
+        connection.execute(
+            User.__table__.update()
+            .where(User.__table__.c.user_id == user_id)
+            .where(User.__table__.c.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
 
-    if date_to_str:
-        date_to_obj = datetime.strptime(date_to_str, '%Y-%m-%d').date()
-    else:
-        date_to_obj = today.date()
 
-    # --- 3. ดึง ID กระเป๋าเงินของผู้ใช้ (เหมือนกับใน dashboard) ---
-    user_wallets = Wallet.query.filter_by(user_id=current_user.user_id).all()
-    wallet_ids = [wallet.wallet_id for wallet in user_wallets]
+def schedule_rehash(user, password):
+    # ไม่ต้องรอ (ผู้ใช้ล็อกอินเสร็จไปก่อน) ถ้าคิวเต็มก็ข้ามไป เดี๋ยวล็อกอินครั้งหน้าค่อยทำ
+    try:
+        submit_password_job(_rehash_password, db.engine, user.user_id, user.password_hash, password)
+    except PasswordPoolBusy:
+        pass
+
+
+def client_ip():
+    return request.remote_addr or 'unknown'
 
-    # --- 4. (สำคัญ!) สร้าง Query สรุปยอดรายจ่ายตามหมวดหมู่ ---
-    # เราจะใช้ SQL (func.sum, group_by) เพื่อคำนวณอย่างมีประสิทธิภาพ
-    query = db.session.query(
-        Category.category_name,
-        func.sum(Transaction.amount).label('total_amount')
-    ).join(Category, Transaction.category_id == Category.category_id) \
-        .filter(Transaction.wallet_id.in_(wallet_ids)) \
-        .filter(Transaction.type == 'expense') \
-        .filter(Transaction.date.between(date_from_obj, date_to_obj))
-
-    # (เพิ่ม Filter กระเป๋า ถ้ามีการเลือก)
-    if selected_wallet_id:
-        query = query.filter(Transaction.wallet_id == selected_wallet_id)
 
-    # สรุปผลและจัดเรียง
-    summary_data = query.group_by(Category.category_name) \
-        .order_by(func.sum(Transaction.amount).desc()) \
-        .all()  # ผลลัพธ์จะเป็น [('อาหาร', 500.00), ('เดินทาง', 300.00)]
+def auth_rate_limited(username):
+    # ตรวจก่อนคำนวณ hash ใด ๆ: คืนค่าจำนวนวินาทีที่ต้องรอ (0 = ผ่าน)
+    checks = [(login_ip_limiter, f'ip:{client_ip()}')]
+    if username:
+        checks.append((login_user_limiter, f'user:{username.strip().lower()}'))
+    return check_limits(checks)
 
-    # --- 5. แปลงข้อมูลให้อยู่ในรูปแบบที่ Chart.js ต้องการ ---
-    labels = [row[0] for row in summary_data]
-    data = [float(row[1]) for row in summary_data]  # แปลง Decimal เป็น float
 
-    # --- 6. ส่งข้อมูลกลับไปเป็น JSON ---
-    return jsonify(labels=labels, data=data)
+def too_many_attempts(template, retry_after):
+    flash('พยายามบ่อยเกินไป กรุณารอสักครู่แล้วลองใหม่', 'danger')
+    response = make_response(render_template(template), 429)
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
 
-###############################logout################################################
 
-@app.route("/logout")
-@login_required
-def logout():
-    logout_user() # ล้าง Session ของผู้ใช้
-    flash('ออกจากระบบเรียบร้อยแล้ว', 'info')
-    return redirect(url_for('login'))
+def server_busy(template):
+    flash('ระบบกำลังยุ่ง กรุณาลองใหม่อีกครั้ง', 'danger')
+    response = make_response(render_template(template), 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
+########################################################################################
+####################################app factory#############################################
+
+# (ใหม่!) สร้างแอป: อ่าน config -> ผูก Extension -> สร้างของที่แยกต่อแอป -> ลงทะเบียน hook / CLI / Blueprint
+# ไม่มีการต่อฐานข้อมูลตอนสร้างแอป (Engine เปิด connection เมื่อมี Query แรก) -> ใช้กับ gunicorn --preload ได้
+# แต่ละ worker ต้องเรียก after_fork(app) หลัง fork (ดู gunicorn.conf.py)
+
+def create_app(config=None, instance_path=None):
+    # instance_path = โฟลเดอร์ของไฟล์ที่แอปสร้างเอง (เช่น audit spool) ไม่ระบุ = <โฟลเดอร์โปรเจกต์>/instance
+    app = Flask(__name__, instance_path=instance_path)
+    load_config(app, config)
+
+    db.init_app(app)
+    bcrypt.init_app(app)
+    login_manager.init_app(app)
+
+    app.extensions['cache'] = create_cache(app.config)
+    app.extensions['exchange_rates'] = ExchangeRates(app.config['REPORTING_CURRENCY'])
+    app.extensions['password_pool'] = ThreadPoolExecutor(max_workers=app.config['BCRYPT_MAX_WORKERS'],
+                                                         thread_name_prefix='bcrypt')
+    app.extensions['password_slots'] = threading.BoundedSemaphore(
+        app.config['BCRYPT_MAX_WORKERS'] + app.config['BCRYPT_MAX_PENDING'])
+    app.extensions['login_user_limiter'] = TokenBucketLimiter(app.config['LOGIN_LIMIT_USER_BURST'],
+                                                              app.config['LOGIN_LIMIT_USER_PER_MINUTE'])
+    app.extensions['login_ip_limiter'] = TokenBucketLimiter(app.config['LOGIN_LIMIT_IP_BURST'],
+                                                            app.config['LOGIN_LIMIT_IP_PER_MINUTE'])
+    app.extensions['analytics'] = None
+    if app.config['ANALYTICS_ENGINE'] == 'columnar':
+        # import ตอนเปิดใช้เท่านั้น (numpy ใช้เวลา import นาน และไม่ได้ติดตั้งในทุกเครื่อง)
+        from analytics import LedgerCache
+        app.extensions['analytics'] = LedgerCache(app.config['ANALYTICS_MAX_ROWS'], max_age=app.config['CACHE_TTL'])
+    elif app.config['ANALYTICS_ENGINE'] != 'sql':
+        raise RuntimeError(f"Unknown ANALYTICS_ENGINE: {app.config['ANALYTICS_ENGINE']}")
+    app.extensions['audit'] = None
+    if app.config['AUDIT_LOG']:
+        app.extensions['audit'] = AuditWriter(
+            lambda records: _write_audit_batch(app, records),
+            app.config['AUDIT_SPOOL_DIR'] or os.path.join(app.instance_path, 'audit-spool'),
+            batch_size=app.config['AUDIT_BATCH_SIZE'], flush_interval=app.config['AUDIT_FLUSH_SECONDS'],
+            fsync=app.config['AUDIT_FSYNC'], max_attempts=app.config['AUDIT_MAX_ATTEMPTS'],
+            on_error=lambda error, attempt: app.logger.warning('Audit log write failed (attempt %d): %s',
+                                                                attempt, error))
+
+    # เก็บสถิติการยืม connection และเตือนถ้าต้องรอ connection นาน
+    pool_stats.on_slow_wait = lambda seconds: app.logger.warning('Waited %.0f ms for a DB connection',
+                                                                 seconds * 1000)
+    check_connection_budget(app.config['SQLALCHEMY_ENGINE_OPTIONS'], app.logger.warning)
+    with app.app_context():
+        if app.config['SQLALCHEMY_DATABASE_URI']:
+            instrument_engine(db.engine)
+            instrument_request_metrics(db.engine)
+        if app.config['SQLALCHEMY_REPLICA_URI']:
+            instrument_engine(db.engines['replica'])
+            instrument_request_metrics(db.engines['replica'])
+
+    if app.config['PROXY_COUNT']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'])
+
+    app.before_request(_start_recurring_scheduler)
+    app.before_request(_start_request_metrics)
+    app.after_request(_stick_to_primary_after_write)
+    app.after_request(_record_request_metrics)
+    before_render_template.connect(_start_template_timer, app)
+    template_rendered.connect(_record_template_time, app)
+    app.add_template_filter(format_money, 'money')
+
+    for group in (rates_cli, balances_cli, rollups_cli, budgets_cli, recurring_cli, db_cli, partitions_cli,
+                  audit_cli):
+        app.cli.add_command(group)
+
+    from blueprints import register_blueprints
+    register_blueprints(app)
+    return app
+
+
+def after_fork(app):
+    # เรียกใน worker ทันทีหลัง fork (gunicorn post_fork) เมื่อสร้างแอปไว้ใน master (--preload)
+    # connection ที่ master อาจเปิดค้างไว้ใช้ร่วมกันข้าม process ไม่ได้ -> ทิ้ง pool ทั้งหมดแล้วให้ worker เปิดใหม่เอง
+    # close=False: ไม่ปิด socket ที่ยังเป็นของ master (ปิดแล้ว master จะใช้ connection นั้นไม่ได้)
+    global _recurring_thread
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    # Thread ไม่ติดมากับการ fork -> ให้ request แรกของ worker เริ่ม Thread ใหม่
+    _recurring_thread = None
+    if app.extensions.get('audit') is not None:
+        app.extensions['audit'].after_fork()
 
 ###############################################################################
 
 # --- 4. ส่วนสำหรับรันแอป ---
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # import ผ่านชื่อ app เพื่อให้ Blueprint ใช้ db / Model ชุดเดียวกัน (ไม่ใช่ของ __main__)
+    from app import create_app as _create_app
+    _create_app().run(debug=True)
@@ -0,0 +1,328 @@
+# --- บันทึกการเปลี่ยนแปลงข้อมูล (Audit Log) แบบ write-behind ---
+#
+# app.py จับการเพิ่ม/แก้ไข/ลบ (ค่าก่อน/หลัง) จาก event ของ Session แล้วส่งมาที่ AuditWriter.submit() หลัง commit
+# request ไม่ต้องรอเขียนฐานข้อมูล:
+#   1. submit() ต่อท้ายบรรทัด JSON ลงไฟล์ spool ของ process นี้ แล้วใส่คิวในหน่วยความจำ (ไม่กี่ไมโครวินาที)
+#   2. Thread เบื้องหลังดึงจากคิวทีละก้อน (batch_size รายการ หรือรอไม่เกิน flush_interval วินาที)
+#      แล้วเขียนลงตาราง audit_log ด้วยคำสั่งเดียว ถ้าฐานข้อมูลล่มจะลองใหม่ไม่เกิน max_attempts ครั้ง (รอนานขึ้นทีละเท่า)
+#   3. เขียนครบทุกรายการในไฟล์ spool แล้ว -> ล้างไฟล์ (ไฟล์ใหญ่เกิน segment_bytes จะเปิดไฟล์ใหม่ ไฟล์เก่าลบเมื่อเขียนครบ)
+#
+# ลองครบแล้วยังไม่ได้ -> ทิ้งก้อนนั้นจากหน่วยความจำ แต่ไฟล์ spool ที่มีรายการนั้นยังอยู่ (ไม่ล้าง/ไม่ลบ)
+# เมื่อรายการอื่นในไฟล์นั้นเสร็จหมด ไฟล์จะกลายเป็น "ไฟล์ค้าง" ที่ process นี้ (หลังเขียนก้อนถัดไปสำเร็จ)
+# หรือ process ถัดไปรับช่วงเขียนต่อ
+#
+# process ตาย (kill -9, OOM, เครื่องดับ) ก่อนเขียนเสร็จ -> รายการที่ค้างยังอยู่ในไฟล์ spool
+# process ถัดไปบนเครื่องเดียวกันจะ "รับช่วง" ไฟล์ของ process ที่ไม่มีอยู่แล้วมาเขียนต่อตอนเริ่ม Thread (หรือ "flask audit replay")
+# ทุกรายการมี event_id ไม่ซ้ำกัน -> เขียนซ้ำได้โดยไม่เกิดแถวซ้ำ (write_batch ต้องข้ามแถวที่ event_id มีอยู่แล้ว)
+#
+# ค่าเริ่มต้นไม่ fsync (รอด process ตาย แต่ไม่รอดไฟดับ) ตั้ง fsync=True ถ้าต้องการ แลกกับ latency ของการเขียนทุกครั้ง
+#
+# ไฟล์นี้ไม่ import app.py
+
+import atexit
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+SPOOL_PREFIX = 'audit-'
+SPOOL_SUFFIX = '.jsonl'
+
+
+def to_json_value(value):
+    # ค่าจากคอลัมน์ -> ค่าที่เก็บเป็น JSON ได้ (เงินเก็บเป็น string ไม่ให้ทศนิยมเพี้ยน)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def audit_record(entity, entity_id, action, before, after, actor_id=None, source=None):
+    # action = 'create' / 'update' / 'delete', before/after = {คอลัมน์: ค่า} (None = ไม่มี เช่น before ของ create)
+    return {
+        'event_id': uuid.uuid4().hex,
+        'occurred_at': datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+        'actor_id': actor_id,
+        'entity': entity,
+        'entity_id': entity_id,
+        'action': action,
+        'before': before,
+        'after': after,
+        'source': source,
+    }
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _Segment:
+    # ไฟล์ spool 1 ไฟล์ + จำนวนรายการในไฟล์ที่ยังไม่ได้เขียนลงฐานข้อมูล (stranded = ลองครบแล้วไม่สำเร็จ)
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+        self.pending = 0
+        self.stranded = 0
+
+
+class AuditWriter:
+    def __init__(self, write_batch, spool_dir, batch_size=500, flush_interval=1.0, segment_bytes=8 * 2 ** 20,
+                 fsync=False, on_error=None, max_attempts=5):
+        # write_batch(records) เขียนรายการลงฐานข้อมูลใน Transaction เดียว (error = ลองใหม่ทั้งก้อน)
+        self.write_batch = write_batch
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self.on_error = on_error or (lambda error, attempt: None)
+        self.host = socket.gethostname().replace('-', '_')
+        self._atexit_registered = False
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._segment = None
+        self._segment_count = 0
+        self._own_segments = set()
+        self.pid = os.getpid()
+        self.pending = 0
+        self.written = 0
+        self.replayed = 0
+        self.failures = 0
+        self.stranded = 0  # รายการที่ลองเขียนครบแล้วไม่สำเร็จ (ยังอยู่ในไฟล์ spool)
+        self._released = False  # มีไฟล์ของเราที่ปล่อยให้เป็นไฟล์ค้างแล้ว รอเขียนต่อ
+
+    def after_fork(self):
+        # เรียกใน worker หลัง fork: Thread / ไฟล์ / lock ของ master ใช้ต่อไม่ได้ -> เริ่มใหม่ทั้งหมด
+        self._reset()
+
+    # ---- ฝั่ง request ----
+
+    def submit(self, records):
+        if not records:
+            return
+        self._ensure_started()
+        lines = ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n' for record in records)
+        with self._lock:
+            segment = self._current_segment()
+            segment.file.write(lines)
+            segment.file.flush()
+            if self.fsync:
+                os.fsync(segment.file.fileno())
+            segment.pending += len(records)
+            self.pending += len(records)
+            if segment.file.tell() >= self.segment_bytes:
+                self._segment = None  # รายการถัดไปลงไฟล์ใหม่ ไฟล์นี้ลบเมื่อเขียนครบ
+        for record in records:
+            self._queue.put((segment, record))
+
+    def flush(self, timeout=None):
+        # รอจนทุกรายการที่ submit แล้วถูกเขียนลงฐานข้อมูล (คืนค่า False ถ้าหมดเวลาก่อน)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._drained:
+            while self.pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        # ตอนปิด process: เขียนที่ค้างให้หมดภายใน timeout ที่เหลือยังอยู่ในไฟล์ spool (process ถัดไปเขียนต่อ)
+        if self._thread is not None and self._thread.is_alive() and self.pid == os.getpid():
+            self.flush(timeout)
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {'pending': self.pending, 'written': self.written, 'replayed': self.replayed,
+                'failures': self.failures, 'stranded': self.stranded, 'spool_dir': self.spool_dir}
+
+    def _current_segment(self):
+        if self._segment is None:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._segment_count += 1
+            name = f'{SPOOL_PREFIX}{self.host}-{self.pid}-{self._segment_count:06d}{SPOOL_SUFFIX}'
+            self._segment = _Segment(os.path.join(self.spool_dir, name))
+            self._own_segments.add(name)
+        return self._segment
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+
+    # ---- Thread เบื้องหลัง ----
+
+    def _run(self):
+        self.replay_orphans()
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not self._write([record for _, record in batch]):
+                self._mark_stranded(batch)
+                continue
+            self._mark_written(batch)
+            if self._released:
+                # ฐานข้อมูลกลับมาแล้ว -> เขียนไฟล์ที่ค้างจากก้อนที่ล้มเหลวก่อนหน้า
+                self._released = False
+                self.replay_orphans()
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # เขียนก้อนนี้ให้เสร็จก่อนแล้วค่อยหยุด
+                break
+            batch.append(item)
+        return batch
+
+    def _write(self, records):
+        # คืนค่า False ถ้าลองครบ max_attempts ครั้งแล้วยังเขียนไม่ได้
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.write_batch(records)
+                return True
+            except Exception as error:
+                self.failures += 1
+                self.on_error(error, attempt)
+                if attempt < self.max_attempts:
+                    time.sleep(min(2 ** attempt, 30))
+        return False
+
+    def _mark_stranded(self, batch):
+        # รายการยังอยู่ในไฟล์ -> ห้ามล้าง/ลบไฟล์นั้น และรายการถัดไปลงไฟล์ใหม่
+        with self._lock:
+            for segment, _ in batch:
+                segment.pending -= 1
+                segment.stranded += 1
+            self.pending -= len(batch)
+            self.stranded += len(batch)
+            if self._segment is not None and self._segment.stranded:
+                self._segment = None
+            self._settle({segment for segment, _ in batch})
+            self._drained.notify_all()
+
+    def _mark_written(self, batch):
+        with self._lock:
+            for segment, _ in batch:
+                segment.pending -= 1
+            self.pending -= len(batch)
+            self.written += len(batch)
+            self._settle({segment for segment, _ in batch})
+            self._drained.notify_all()
+
+    def _settle(self, segments):
+        # ไฟล์ที่ไม่มีรายการรอในคิวแล้ว: เขียนครบ -> ล้าง/ลบไฟล์, มีรายการที่ล้มเหลว -> ปล่อยเป็นไฟล์ค้าง
+        for segment in segments:
+            if segment.pending:
+                continue
+            name = os.path.basename(segment.path)
+            if segment.stranded:
+                segment.file.close()
+                self._own_segments.discard(name)
+                self._released = True
+            elif segment is self._segment:
+                # ทุกรายการในไฟล์อยู่ในฐานข้อมูลแล้ว -> ล้างไฟล์ (เขียนต่อจากต้นไฟล์)
+                segment.file.seek(0)
+                segment.file.truncate()
+            else:
+                segment.file.close()
+                os.remove(segment.path)
+                self._own_segments.discard(name)
+
+    # ---- รับช่วงไฟล์ spool ที่ค้าง ----
+
+    def _orphaned(self, name):
+        # ไฟล์ของ process อื่นบนเครื่องนี้ที่ไม่มีอยู่แล้ว (หรือ pid เดียวกับเราแต่ไม่ใช่ไฟล์ที่เราสร้าง = process เก่าก่อน restart)
+        stem = name[len(SPOOL_PREFIX):-len(SPOOL_SUFFIX)]
+        try:
+            host, pid, _ = stem.rsplit('-', 2)
+            pid = int(pid)
+        except ValueError:
+            return False
+        if host != self.host:
+            return False
+        if pid == self.pid:
+            return name not in self._own_segments
+        return not _process_alive(pid)
+
+    def replay_orphans(self):
+        # คืนค่าจำนวนรายการที่เขียนจากไฟล์ที่ค้าง
+        # เขียนไฟล์ไหนไม่สำเร็จ (ลองครบ max_attempts) -> เก็บไฟล์ไว้ตามเดิมแล้วหยุด (ฐานข้อมูลน่าจะล่มอยู่ ไม่รอไฟล์ที่เหลือ)
+        try:
+            names = sorted(os.listdir(self.spool_dir))
+        except FileNotFoundError:
+            return 0
+        count = 0
+        for name in names:
+            if not (name.startswith(SPOOL_PREFIX) and name.endswith(SPOOL_SUFFIX)):
+                continue
+            with self._lock:
+                if not self._orphaned(name):
+                    continue
+                # เปลี่ยนชื่อเป็นไฟล์ของเราก่อน (atomic) -> worker อื่นไม่หยิบไฟล์เดียวกันไปเขียนซ้ำ
+                # ถ้าเราตายระหว่างนี้ ไฟล์ก็กลายเป็นไฟล์ค้างของเราให้ process ถัดไปรับช่วงต่อ
+                self._segment_count += 1
+                claimed = f'{SPOOL_PREFIX}{self.host}-{self.pid}-replay{self._segment_count:06d}{SPOOL_SUFFIX}'
+                try:
+                    os.rename(os.path.join(self.spool_dir, name), os.path.join(self.spool_dir, claimed))
+                except FileNotFoundError:
+                    continue
+                self._own_segments.add(claimed)
+            written = self._replay_file(os.path.join(self.spool_dir, claimed))
+            with self._lock:
+                self._own_segments.discard(claimed)  # เขียนไม่ครบ = ไฟล์ค้างของเรา (รอบหน้า/process ถัดไปเขียนต่อ)
+            if written is None:
+                self._released = True
+                break
+            os.remove(os.path.join(self.spool_dir, claimed))
+            count += written
+        self.replayed += count
+        return count
+
+    def _replay_file(self, path):
+        # คืนค่าจำนวนรายการ (None = มีก้อนที่เขียนไม่สำเร็จ)
+        records = []
+        with open(path, encoding='utf-8') as stream:
+            for line in stream:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # บรรทัดสุดท้ายที่เขียนไม่จบตอน process ตาย
+        for start in range(0, len(records), self.batch_size):
+            if not self._write(records[start:start + self.batch_size]):
+                return None
+        return len(records)
@@ -0,0 +1,2 @@
+# สคริปต์วัดประสิทธิภาพ (Benchmark) ของแอป
+# รันจากโฟลเดอร์หลักของโปรเจกต์ เช่น: python -m benchmarks.query_plans --rows 1000000
@@ -0,0 +1,126 @@
+# --- Benchmark: รายงานรวมยอดทั้งประวัติ SQL เทียบกับโหมดคอลัมน์ในหน่วยความจำ (ANALYTICS_ENGINE=columnar) ---
+#
+# 1. สร้างฐานข้อมูล SQLite ชั่วคราว ผู้ใช้ 1 คน ธุรกรรม 1,000,000 แถว (benchmarks.seed) หรือใช้ไฟล์ที่ seed ไว้แล้ว (--db)
+# 2. วัดเวลาโหลดสำเนาแบบคอลัมน์ครั้งแรก + ขนาดใน RAM
+# 3. รันรายงานแต่ละแบบซ้ำ ๆ ทั้งแบบ SQL (GROUP BY) และแบบคอลัมน์ ตรวจว่าผลตรงกัน แล้วรายงาน p50
+#
+# ต้องติดตั้ง numpy (pip install numpy)
+#
+# วิธีใช้:
+#   python -m benchmarks.analytics
+#   python -m benchmarks.analytics --transactions-per-user 200000 --repeat 10
+#   python -m benchmarks.analytics --db /tmp/ledger.db --user-id 1
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.run import percentile
+from benchmarks.seed import prepare_app
+
+
+def sql_reports(wallet_ids, recent_from):
+    # Query แบบเดียวกับที่แอปใช้เมื่อ ANALYTICS_ENGINE=sql (ผลเป็นหน่วยสตางค์ เทียบกับแบบคอลัมน์ได้ตรง ๆ)
+    from sqlalchemy import func
+    from app import db, Transaction
+
+    minor = func.sum(func.round(Transaction.amount * 100))
+    year = func.extract('year', Transaction.date)
+
+    def category_breakdown(date_from=None):
+        query = db.session.query(Transaction.category_id, Transaction.wallet_id, minor) \
+            .filter(Transaction.wallet_id.in_(wallet_ids), Transaction.type == 'expense')
+        if date_from is not None:
+            query = query.filter(Transaction.date >= date_from)
+        rows = query.group_by(Transaction.category_id, Transaction.wallet_id).all()
+        return {(category_id, wallet_id): int(total) for category_id, wallet_id, total in rows}
+
+    return {
+        'wallet_balances': lambda: {
+            (wallet_id, tx_type): int(total)
+            for wallet_id, tx_type, total in db.session.query(Transaction.wallet_id, Transaction.type, minor)
+            .filter(Transaction.wallet_id.in_(wallet_ids))
+            .group_by(Transaction.wallet_id, Transaction.type).all()},
+        'category_breakdown': category_breakdown,
+        'category_last_90_days': lambda: category_breakdown(recent_from),
+        'year_comparison': lambda: {
+            (int(y), tx_type): int(total) for y, tx_type, total in db.session.query(year, Transaction.type, minor)
+            .filter(Transaction.wallet_id.in_(wallet_ids))
+            .group_by(year, Transaction.type).all()},
+    }
+
+
+def columnar_reports(ledger, recent_from):
+    def sums(*args, **kwargs):
+        return {key: total for key, (total, _) in ledger.group_sum(*args, **kwargs).items()}
+
+    return {
+        'wallet_balances': lambda: sums(('wallet', 'type')),
+        'category_breakdown': lambda: sums(('category', 'wallet'), tx_type='expense'),
+        'category_last_90_days': lambda: sums(('category', 'wallet'), date_from=recent_from, tx_type='expense'),
+        'year_comparison': lambda: sums(('year', 'type')),
+    }
+
+
+def timed(report, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = report()
+        timings.append(time.perf_counter() - started)
+    return result, percentile(timings, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='เทียบรายงานรวมยอดแบบ SQL กับแบบคอลัมน์ในหน่วยความจำ')
+    parser.add_argument('--db', help='ไฟล์ SQLite ที่ seed ไว้แล้ว (ไม่ระบุ = สร้างใหม่ชั่วคราว)')
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--wallets-per-user', type=int, default=5)
+    parser.add_argument('--categories-per-user', type=int, default=10)
+    parser.add_argument('--transactions-per-user', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'analytics.db')
+    app = prepare_app(db_path, ANALYTICS_ENGINE='columnar')
+
+    import migrations
+    from app import db, ledger_cache, user_ledger, owned_wallet_ids
+    from benchmarks.seed import seed_ledger
+
+    with app.app_context():
+        if not args.db:
+            migrations.upgrade(db.engine, echo=lambda message: None)
+            seed_ledger(1, args.wallets_per_user, args.categories_per_user, args.transactions_per_user)
+
+        started = time.perf_counter()
+        ledger = user_ledger(args.user_id)
+        load_seconds = time.perf_counter() - started
+        print(f'Loaded {ledger.size:,} rows in {load_seconds:.2f}s '
+              f'({ledger.nbytes / 2 ** 20:.1f} MiB, {ledger.nbytes / max(ledger.size, 1):.0f} bytes/row)')
+
+        recent_from = date.today() - timedelta(days=90)
+        sql = sql_reports(sorted(owned_wallet_ids(args.user_id)), recent_from)
+        columnar = columnar_reports(ledger, recent_from)
+
+        mismatched = []
+        print(f'{"report":<24}{"sql p50":>12}{"columnar p50":>16}{"speedup":>10}')
+        for name in sql:
+            expected, sql_p50 = timed(sql[name], args.repeat)
+            actual, columnar_p50 = timed(columnar[name], args.repeat)
+            if actual != expected:
+                mismatched.append(name)
+            print(f'{name:<24}{sql_p50 * 1000:>10.1f}ms{columnar_p50 * 1000:>14.1f}ms'
+                  f'{sql_p50 / columnar_p50 if columnar_p50 else 0:>9.0f}x')
+        print(f'cache: {ledger_cache().stats()}')
+
+    if mismatched:
+        print(f'MISMATCH: {", ".join(mismatched)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
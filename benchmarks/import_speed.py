@@ -0,0 +1,78 @@
+# --- Benchmark: ความเร็วในการนำเข้าไฟล์ CSV ---
+#
+# สร้างไฟล์ CSV สังเคราะห์ แล้วนำเข้าด้วย import_transactions() ลงฐานข้อมูล SQLite ชั่วคราว
+# เป้าหมาย: 100,000 แถว ภายใน 10 วินาที
+#
+# วิธีใช้:
+#   python -m benchmarks.import_speed
+#   python -m benchmarks.import_speed --rows 500000 --batch-size 10000
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def write_csv(path, rows, categories):
+    rng = random.Random(7)
+    start = date.today() - timedelta(days=3 * 365)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'description', 'amount', 'category'])
+        for i in range(rows):
+            expense = rng.random() < 0.8
+            writer.writerow([
+                (start + timedelta(days=rng.randint(0, 3 * 365))).isoformat(),
+                f'row {i}',
+                f'{"-" if expense else ""}{rng.randint(1, 500000) / 100:.2f}',
+                rng.choice(categories),
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='วัดความเร็วการนำเข้า CSV')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--target-seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+
+    import migrations
+    from app import create_app, db, User, Wallet
+    from blueprints.transactions import import_transactions, IMPORT_BATCH_SIZE
+    from importers import iter_csv_rows
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir, 'import.db'),
+                      'SECRET_KEY': os.environ.get('SECRET_KEY', 'benchmark')})
+
+    csv_path = os.path.join(workdir, 'import.csv')
+    write_csv(csv_path, args.rows, ['อาหาร', 'เดินทาง', 'ช้อปปิ้ง', 'บิล', 'เงินเดือน'])
+
+    with app.app_context():
+        migrations.upgrade(db.engine, echo=lambda message: None)
+        user = User(username='bench', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        wallet = Wallet(wallet_name='bench', user_id=user.user_id)
+        db.session.add(wallet)
+        db.session.commit()
+
+        started = time.perf_counter()
+        with open(csv_path, encoding='utf-8', newline='') as stream:
+            result = import_transactions(user.user_id, iter_csv_rows(stream), wallet.wallet_id,
+                                         batch_size=args.batch_size or IMPORT_BATCH_SIZE)
+        elapsed = time.perf_counter() - started
+
+    print(f'Imported {result["imported"]:,} rows ({result["error_count"]} skipped) in {elapsed:.2f}s '
+          f'= {result["imported"] / elapsed:,.0f} rows/s (target: {args.rows:,} rows < {args.target_seconds}s)')
+    if elapsed > args.target_seconds:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# --- Load generator แบบหลาย Process (ยิง HTTP จริงไปที่เซิร์ฟเวอร์ที่รันอยู่) ---
+#
+# ใช้ทดสอบทั้งระบบ (gunicorn + ฐานข้อมูล) ต่างจาก benchmarks.run ที่เรียกแอปตรง ๆ
+#
+# 1. seed ฐานข้อมูล:  python -m benchmarks.seed --db /tmp/ledger.db --users 1000
+# 2. รันเซิร์ฟเวอร์ด้วยฐานข้อมูลนั้น (ปิดตัวจำกัดความถี่การล็อกอิน เพราะยิงจาก IP เดียว):
+#      SQLALCHEMY_DATABASE_URI=sqlite:////tmp/ledger.db SECRET_KEY=x \
+#      LOGIN_LIMIT_USER_BURST=1000000 LOGIN_LIMIT_IP_BURST=1000000 gunicorn -w 4 wsgi:app
+# 3. ยิง:  python -m benchmarks.loadgen --url http://127.0.0.1:8000 --users 1000 --processes 8 --duration 30
+#
+# แต่ละ process ล็อกอินเป็นผู้ใช้แบบสุ่ม แล้วยิง request ตามสัดส่วน (--mix) จนหมดเวลา
+
+import argparse
+import http.cookiejar
+import multiprocessing
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+
+from benchmarks.run import percentile
+from benchmarks.seed import PASSWORD
+
+DEFAULT_MIX = 'dashboard=5,wallet_detail=2,category_summary=3,add_transaction=1,login=1'
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # ไม่ตาม redirect (วัดเวลาเฉพาะ request ที่ยิงจริง)
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def make_opener():
+    cookies = http.cookiejar.CookieJar()
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies), NoRedirect())
+
+
+def timed_request(opener, url, data=None):
+    body = urllib.parse.urlencode(data).encode() if data is not None else None
+    started = time.perf_counter()
+    try:
+        with opener.open(url, body, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return time.perf_counter() - started, status
+
+
+def worker(base_url, users, wallets_per_user, categories_per_user, mix, duration, seed, output):
+    rng = random.Random(seed)
+    names, weights = zip(*mix)
+    user_id = rng.randint(1, users)
+    opener = make_opener()
+    timed_request(opener, f'{base_url}/login', {'username': f'user{user_id}', 'password': PASSWORD})
+
+    results = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    today = date.today()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        if scenario == 'login':
+            user_id = rng.randint(1, users)
+            opener = make_opener()
+            elapsed, status = timed_request(opener, f'{base_url}/login',
+                                            {'username': f'user{user_id}', 'password': PASSWORD})
+        elif scenario == 'dashboard':
+            elapsed, status = timed_request(opener, f'{base_url}/dashboard')
+        elif scenario == 'wallet_detail':
+            # wallet_id ตามรูปแบบของ benchmarks.seed
+            wallet_id = (user_id - 1) * wallets_per_user + rng.randint(1, wallets_per_user)
+            elapsed, status = timed_request(opener, f'{base_url}/wallet/{wallet_id}')
+        elif scenario == 'category_summary':
+            date_from = (today - timedelta(days=rng.randint(0, 365))).isoformat()
+            elapsed, status = timed_request(opener, f'{base_url}/api/category_summary?date_from={date_from}')
+        else:
+            elapsed, status = timed_request(opener, f'{base_url}/add_transaction', {
+                'wallet_id': (user_id - 1) * wallets_per_user + 1,
+                # หมวดหมู่ลำดับที่ 2 ของผู้ใช้เป็นรายจ่ายเสมอ (ดู benchmarks.seed)
+                'category_id': (user_id - 1) * categories_per_user + 2,
+                'amount': f'{rng.randint(1, 100000) / 100:.2f}',
+                'date': today.isoformat(),
+                'type': 'expense',
+                'description': 'loadgen',
+            })
+        results[scenario].append(elapsed)
+        if status >= 400:
+            errors[scenario] += 1
+    output.put((results, errors))
+
+
+def parse_mix(text):
+    mix = []
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ยิง HTTP load หลาย process แล้วรายงาน p50/p95/p99')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=100, help='จำนวนผู้ใช้ที่ seed ไว้ (user1..userN)')
+    parser.add_argument('--wallets-per-user', type=int, default=5)
+    parser.add_argument('--categories-per-user', type=int, default=10)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30.0, help='วินาที')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'สัดส่วน request (ค่าเริ่มต้น {DEFAULT_MIX})')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    output = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(args.url.rstrip('/'), args.users, args.wallets_per_user,
+                                                     args.categories_per_user, mix, args.duration, args.seed + i, output))
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    timings = {name: [] for name, _ in mix}
+    errors = {name: 0 for name, _ in mix}
+    for _ in processes:
+        results, failed = output.get()
+        for name in results:
+            timings[name] += results[name]
+            errors[name] += failed[name]
+    for process in processes:
+        process.join()
+
+    total = sum(len(values) for values in timings.values())
+    print(f'{total:,} requests in {args.duration:.0f}s = {total / args.duration:,.1f} req/s '
+          f'({args.processes} processes)')
+    print(f'{"scenario":<18}{"requests":>9}{"errors":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+    for name, values in timings.items():
+        print(f'{name:<18}{len(values):>9}{errors[name]:>8}{percentile(values, 50) * 1000:>10.2f}'
+              f'{percentile(values, 95) * 1000:>10.2f}{percentile(values, 99) * 1000:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+# --- Benchmark: เวลาตอบ + จำนวน Query ของหน้าหลัก ๆ (ผ่าน Flask test client) ---
+#
+# 1. สร้างฐานข้อมูล SQLite ชั่วคราวพร้อมข้อมูลสังเคราะห์ (benchmarks.seed) หรือใช้ไฟล์ที่ seed ไว้แล้ว (--db)
+# 2. ยิง request แต่ละแบบซ้ำ ๆ โดยสุ่มผู้ใช้
+# 3. รายงาน p50 / p95 / p99 และจำนวน Query ต่อ request
+#
+# ใช้จับ "ช้าลง" ก่อน deploy:
+#   python -m benchmarks.run --save baseline.json            (บน main)
+#   python -m benchmarks.run --compare baseline.json         (บน branch) -> exit 1 ถ้า p95 หรือจำนวน Query แย่ลง
+#
+# วิธีใช้อื่น ๆ:
+#   python -m benchmarks.run --users 50 --transactions-per-user 2000 --requests 300
+#   python -m benchmarks.run --db /tmp/ledger.db --scenario dashboard --scenario login
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.seed import HISTORY_DAYS, PASSWORD, add_seed_arguments, prepare_app
+
+SCENARIOS = ('login', 'dashboard', 'wallet_detail', 'category_summary', 'search', 'add_transaction')
+
+# คำค้นของ scenario search (ส่วนหนึ่งของ DESCRIPTIONS ใน benchmarks.seed)
+SEARCH_TERMS = ('กาแฟ', 'ไฟฟ้า', 'น้ำมัน', 'coffee', 'netflix', 'refund', 'ค่า อาหาร')
+
+
+def percentile(values, p):
+    # แบบ nearest-rank (ค่าจริงที่วัดได้ ไม่ใช่ค่าประมาณ)
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(p / 100.0 * len(ordered) + 0.5 - 1e-9)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(timings, queries):
+    return {
+        'requests': len(timings),
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'queries_per_request': sum(queries) / len(queries) if queries else 0.0,
+    }
+
+
+def run_scenarios(app, scenarios, requests, users, logged_in_users, rng):
+    from sqlalchemy import event
+    from app import db, Category, Wallet
+
+    with app.app_context():
+        wallets = {}
+        for wallet_id, user_id in db.session.query(Wallet.wallet_id, Wallet.user_id):
+            wallets.setdefault(user_id, []).append(wallet_id)
+        expense_categories = {}
+        for category_id, user_id in db.session.query(Category.category_id, Category.user_id) \
+                .filter(Category.type == 'expense'):
+            expense_categories.setdefault(user_id, []).append(category_id)
+        engine = db.engine
+
+    query_count = [0]
+
+    def count_query(*args):
+        query_count[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', count_query)
+
+    # ล็อกอินล่วงหน้าไว้กลุ่มหนึ่ง (แต่ละ client = 1 ผู้ใช้)
+    sample = rng.sample(range(1, users + 1), min(logged_in_users, users))
+    clients = {}
+    for user_id in sample:
+        client = app.test_client()
+        response = client.post('/login', data={'username': f'user{user_id}', 'password': PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f'login failed for user{user_id}: {response.status_code}')
+        clients[user_id] = client
+
+    today = date.today()
+    results = {}
+    try:
+        for scenario in scenarios:
+            timings, queries = [], []
+            for _ in range(requests):
+                user_id = rng.choice(sample)
+                client = clients[user_id]
+
+                if scenario == 'login':
+                    client = app.test_client()
+                    call = lambda: client.post('/login', data={'username': f'user{user_id}', 'password': PASSWORD})
+                elif scenario == 'dashboard':
+                    call = lambda: client.get('/dashboard')
+                elif scenario == 'wallet_detail':
+                    wallet_id = rng.choice(wallets[user_id])
+                    call = lambda: client.get(f'/wallet/{wallet_id}')
+                elif scenario == 'category_summary':
+                    # ช่วงวันที่สุ่ม -> วัดทั้งกรณี cache hit และ miss
+                    date_from = (today - timedelta(days=rng.randint(0, 365))).isoformat()
+                    call = lambda: client.get(f'/api/category_summary?date_from={date_from}')
+                elif scenario == 'search':
+                    # ค้นหาทั้งประวัติ (ไม่มี cache)
+                    params = {'q': rng.choice(SEARCH_TERMS),
+                              'date_from': (today - timedelta(days=HISTORY_DAYS)).isoformat()}
+                    call = lambda: client.get('/api/transactions', query_string=params)
+                else:
+                    data = {
+                        'wallet_id': rng.choice(wallets[user_id]),
+                        'category_id': rng.choice(expense_categories[user_id]),
+                        'amount': f'{rng.randint(1, 100000) / 100:.2f}',
+                        'date': (today - timedelta(days=rng.randint(0, 60))).isoformat(),
+                        'type': 'expense',
+                        'description': 'benchmark',
+                    }
+                    call = lambda: client.post('/add_transaction', data=data)
+
+                query_count[0] = 0
+                started = time.perf_counter()
+                response = call()
+                timings.append(time.perf_counter() - started)
+                queries.append(query_count[0])
+                if response.status_code >= 400:
+                    raise RuntimeError(f'{scenario}: HTTP {response.status_code}')
+            results[scenario] = summarize(timings, queries)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_query)
+    return results
+
+
+def print_results(results, baseline=None):
+    print()
+    print(f'{"scenario":<18}{"requests":>9}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}')
+    for scenario, r in results.items():
+        line = (f'{scenario:<18}{r["requests"]:>9}{r["p50_ms"]:>10.2f}{r["p95_ms"]:>10.2f}'
+                f'{r["p99_ms"]:>10.2f}{r["queries_per_request"]:>9.1f}')
+        if baseline and scenario in baseline:
+            line += f'   (baseline p95 {baseline[scenario]["p95_ms"]:.2f} ms, ' \
+                    f'{baseline[scenario]["queries_per_request"]:.1f} queries)'
+        print(line)
+
+
+def find_regressions(results, baseline, tolerance):
+    # p95 ช้าลงเกิน tolerance (เช่น 0.2 = 20%) หรือจำนวน Query ต่อ request เพิ่มขึ้น
+    regressions = []
+    for scenario, r in results.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        if r['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{scenario}: p95 {before["p95_ms"]:.2f} -> {r["p95_ms"]:.2f} ms')
+        if r['queries_per_request'] > before['queries_per_request'] + 0.5:
+            regressions.append(f'{scenario}: queries/request {before["queries_per_request"]:.1f} '
+                               f'-> {r["queries_per_request"]:.1f}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='วัดเวลาตอบ (p50/p95/p99) และจำนวน Query ต่อ request')
+    parser.add_argument('--db', help='ไฟล์ SQLite ที่ seed ไว้แล้ว (ค่าเริ่มต้น = สร้างใหม่ชั่วคราว)')
+    add_seed_arguments(parser)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='เลือกเฉพาะบาง scenario (ใส่ซ้ำได้) ค่าเริ่มต้น = ทั้งหมด')
+    parser.add_argument('--requests', type=int, default=200, help='จำนวน request ต่อ scenario')
+    parser.add_argument('--logged-in-users', type=int, default=20)
+    parser.add_argument('--save', help='บันทึกผลเป็น JSON (ใช้เป็น baseline)')
+    parser.add_argument('--compare', help='เทียบกับ baseline JSON แล้ว exit 1 ถ้าแย่ลง')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='p95 แย่ลงได้ไม่เกินกี่เท่า (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'bench.db')
+    fresh = not os.path.exists(db_path)
+    app = prepare_app(db_path)
+
+    import migrations
+    from app import db, User
+    from benchmarks.seed import seed_ledger
+
+    with app.app_context():
+        if fresh:
+            migrations.upgrade(db.engine, echo=lambda message: None)
+            seed_ledger(args.users, args.wallets_per_user, args.categories_per_user,
+                        args.transactions_per_user, seed=args.seed)
+        users = db.session.query(db.func.count(User.user_id)).scalar()
+
+    rng = random.Random(args.seed)
+    results = run_scenarios(app, args.scenario or SCENARIOS, args.requests, users, args.logged_in_users, rng)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}, f, indent=2)
+        print(f'\nSaved results to {args.save}')
+
+    if baseline:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print('\nREGRESSIONS:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print('\nNo regressions.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# --- สร้างข้อมูลสังเคราะห์ (Synthetic Ledger) สำหรับ Benchmark / Load test ---
+#
+# ใส่ผู้ใช้ / กระเป๋า / หมวดหมู่ / ธุรกรรม ลงตารางของโมเดลในแอป (User, Wallet, Category, Transaction)
+# แล้วคำนวณตารางสรุป (wallet_balances, monthly_rollups) ด้วยคำสั่งเดียวกับที่ใช้จริง
+# ผลลัพธ์เหมือนเดิมทุกครั้งที่ใช้ --seed เดิม (เทียบผลระหว่างเวอร์ชันได้)
+#
+# ผู้ใช้ทุกคนชื่อ user1, user2, ... รหัสผ่าน = PASSWORD
+#
+# วิธีใช้ (สร้างไฟล์ SQLite ไว้ให้ benchmarks.run / benchmarks.loadgen ใช้):
+#   python -m benchmarks.seed --db /tmp/ledger.db --users 1000 --wallets-per-user 5 --transactions-per-user 10000
+
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+PASSWORD = 'benchmark'
+
+# ช่วงวันที่ของธุรกรรม (ย้อนหลังจากวันนี้)
+HISTORY_DAYS = 3 * 365
+
+# รายละเอียดธุรกรรม (ไทย + อังกฤษ ให้การค้นหามีข้อมูลจริงให้ทดสอบ)
+DESCRIPTIONS = ['ค่ากาแฟ', 'ค่าอาหารกลางวัน', 'ค่าไฟฟ้า', 'ค่าน้ำประปา', 'เติมน้ำมัน', 'ค่าโทรศัพท์มือถือ',
+                'ซื้อของเข้าบ้าน', 'เงินเดือน', 'Starbucks coffee', 'Grab ride', 'Netflix subscription',
+                'Shopee order', '7-Eleven', 'Lazada refund']
+
+
+def seed_ledger(users=100, wallets_per_user=5, categories_per_user=10, transactions_per_user=1000,
+                seed=42, batch_size=50000, echo=print):
+    # ต้องเรียกภายใน app.app_context() และฐานข้อมูลต้องมีตารางครบแล้ว (migrations.upgrade)
+    from flask import current_app
+    from app import bcrypt, db, User, Wallet, Category, Transaction
+
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=HISTORY_DAYS)
+    started = time.perf_counter()
+
+    # bcrypt ช้า (ตั้งใจ) -> hash ครั้งเดียวแล้วใช้กับทุกคน
+    password_hash = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+    # ข้อมูลทดสอบไม่ต้องลง audit_log (execution_options audit=False)
+    db.session.execute(User.__table__.insert(), [
+        {'user_id': u, 'username': f'user{u}', 'password_hash': password_hash} for u in range(1, users + 1)
+    ], execution_options={'audit': False})
+
+    wallet_ids, category_ids = {}, {}
+    wallets, categories = [], []
+    for u in range(1, users + 1):
+        wallet_ids[u] = [(u - 1) * wallets_per_user + i + 1 for i in range(wallets_per_user)]
+        category_ids[u] = [(u - 1) * categories_per_user + i + 1 for i in range(categories_per_user)]
+        wallets += [{'wallet_id': w, 'wallet_name': f'wallet {w}', 'user_id': u} for w in wallet_ids[u]]
+        # ประมาณ 1 ใน 3 เป็นหมวดหมู่รายรับ
+        categories += [{'category_id': c, 'category_name': f'category {c}',
+                        'type': 'income' if i % 3 == 0 else 'expense', 'user_id': u}
+                       for i, c in enumerate(category_ids[u])]
+    db.session.execute(Wallet.__table__.insert(), wallets, execution_options={'audit': False})
+    db.session.execute(Category.__table__.insert(), categories, execution_options={'audit': False})
+    db.session.commit()
+
+    total = users * transactions_per_user
+    batch = []
+    done = 0
+    for u in range(1, users + 1):
+        income_categories = category_ids[u][0::3]
+        expense_categories = [c for i, c in enumerate(category_ids[u]) if i % 3]
+        for _ in range(transactions_per_user):
+            tx_type = 'income' if rng.random() < 0.2 or not expense_categories else 'expense'
+            batch.append({
+                'description': f'{rng.choice(DESCRIPTIONS)} #{rng.randint(1, 999)}',
+                'amount': rng.randint(1, 500000) / 100,
+                'date': start + timedelta(days=rng.randint(0, HISTORY_DAYS)),
+                'type': tx_type,
+                'wallet_id': rng.choice(wallet_ids[u]),
+                'category_id': rng.choice(income_categories if tx_type == 'income' else expense_categories),
+            })
+            if len(batch) >= batch_size:
+                db.session.execute(Transaction.__table__.insert(), batch, execution_options={'audit': False})
+                db.session.commit()
+                done += len(batch)
+                batch = []
+                echo(f'  {done:,}/{total:,} transactions')
+    if batch:
+        db.session.execute(Transaction.__table__.insert(), batch, execution_options={'audit': False})
+        db.session.commit()
+
+    # ตารางสรุปคำนวณจากข้อมูลจริง ด้วยคำสั่งเดียวกับ "flask balances rebuild" / "flask rollups rebuild"
+    runner = current_app.test_cli_runner()
+    for args in (['balances', 'rebuild'], ['rollups', 'rebuild']):
+        result = runner.invoke(args=args)
+        if result.exit_code != 0:
+            raise RuntimeError(result.output)
+
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    echo(f'Seeded {users:,} users, {users * wallets_per_user:,} wallets, {total:,} transactions '
+         f'in {time.perf_counter() - started:.1f}s')
+    return {'users': users, 'wallet_ids': wallet_ids, 'category_ids': category_ids}
+
+
+def add_seed_arguments(parser):
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--wallets-per-user', type=int, default=5)
+    parser.add_argument('--categories-per-user', type=int, default=10)
+    parser.add_argument('--transactions-per-user', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def prepare_app(db_path, **config):
+    # สร้างแอปที่ใช้ไฟล์ SQLite ที่ระบุ (config เพิ่มเติม เช่น ANALYTICS_ENGINE='columnar')
+    from app import create_app
+
+    config.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///' + os.path.abspath(db_path))
+    config.setdefault('SECRET_KEY', os.environ.get('SECRET_KEY', 'benchmark'))
+    # benchmark ล็อกอินถี่ ๆ จาก IP เดียว -> ปิดตัวจำกัดความถี่
+    for name in ('LOGIN_LIMIT_USER_BURST', 'LOGIN_LIMIT_IP_BURST'):
+        config.setdefault(name, 1000000)
+    return create_app(config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='สร้างฐานข้อมูล SQLite พร้อมข้อมูลสังเคราะห์')
+    parser.add_argument('--db', required=True, help='ไฟล์ SQLite ที่จะสร้าง (ต้องยังไม่มี)')
+    add_seed_arguments(parser)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f'{args.db} already exists')
+    app = prepare_app(args.db)
+
+    import migrations
+    from app import db
+
+    with app.app_context():
+        migrations.upgrade(db.engine, echo=lambda message: None)
+        seed_ledger(args.users, args.wallets_per_user, args.categories_per_user, args.transactions_per_user,
+                    seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# --- Benchmark: เวลาเริ่มต้นของ worker (import app.py / create_app() / request แรก) ---
+#
+# รันแต่ละรอบใน Python process ใหม่ (เหมือน worker ที่เพิ่งเกิด ไม่มีโมดูลค้างใน sys.modules) แล้ววัด:
+#   import      import app (โมดูล + dependency ทั้งหมด)
+#   create_app  อ่าน config, ผูก Extension, ลงทะเบียน Blueprint (ยังไม่ต่อฐานข้อมูล)
+#   first       GET /login ครั้งแรก (compile template, เปิด connection แรก)
+# ใช้ค่า median ของทุกรอบ ถ้าเกินงบที่ตั้งไว้ -> exit 1 (ใช้ใน CI กันไม่ให้ worker เริ่มช้าลงโดยไม่รู้ตัว)
+#
+# --importtime N แสดงโมดูลที่ import ช้าที่สุด N อันดับ (จาก python -X importtime) ไว้หาว่าอะไรทำให้ช้า
+#
+# process ลูกใช้ฐานข้อมูลและ instance path ชั่วคราว (ไม่สร้างไฟล์ใด ๆ ในโฟลเดอร์โปรเจกต์)
+# tests/test_startup.py เรียก measure_startup() ด้วยงบเดียวกันนี้
+#
+# วิธีใช้:
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --runs 10 --import-budget 0.5 --importtime 15
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# โค้ดที่รันใน process ลูก พิมพ์ผลเป็น JSON บรรทัดเดียว
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app(instance_path=sys.argv[1])
+created = time.perf_counter()
+status = flask_app.test_client().get('/login').status_code
+served = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'first': served - created, 'status': status}))
+'''
+
+STAGES = ('import', 'create_app', 'first')
+
+# งบเวลา (วินาที, median)
+IMPORT_BUDGET = 1.0
+CREATE_BUDGET = 0.3
+FIRST_REQUEST_BUDGET = 0.5
+
+
+def child_env(db_path):
+    env = dict(os.environ)
+    env.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///' + db_path)
+    env.setdefault('SECRET_KEY', 'benchmark')
+    return env
+
+
+def measure_once(env, instance_path):
+    output = subprocess.run([sys.executable, '-c', PROBE, instance_path], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    if result['status'] != 200:
+        raise RuntimeError(f'GET /login returned {result["status"]}')
+    return result
+
+
+def measure_startup(workdir, runs):
+    # คืนค่า (env, [ผลแต่ละรอบ]) ทุกอย่างที่ process ลูกสร้างอยู่ใน workdir
+    env = child_env(os.path.join(workdir, 'startup.db'))
+    instance_path = os.path.join(workdir, 'instance')
+    # รอบแรกสร้างไฟล์ .pyc (worker จริงใช้ .pyc ที่มีอยู่แล้ว) ไม่นับรวม
+    measure_once(env, instance_path)
+    return env, [measure_once(env, instance_path) for _ in range(runs)]
+
+
+def slowest_imports(env, count):
+    # -X importtime เขียนลง stderr: "import time: self [us] | cumulative | imported package"
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stderr
+    # แต่ละบรรทัดพิมพ์หลังโมดูลย่อยของมันเสมอ -> โมดูลที่ app.py import ตรง ๆ (เยื้อง 1 ระดับ) อยู่ก่อนบรรทัดของ app
+    children = []
+    for line in stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:].rstrip()
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        if depth == 0:
+            if name == 'app':
+                break
+            children = []
+        elif depth == 1:
+            children.append((int(parts[1]), int(parts[0].split(':')[1]), name.strip()))
+    return sorted(children, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='วัดเวลาเริ่มต้นของ worker เทียบกับงบเวลา')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET, help='วินาที (median)')
+    parser.add_argument('--create-budget', type=float, default=CREATE_BUDGET, help='วินาที (median)')
+    parser.add_argument('--first-request-budget', type=float, default=FIRST_REQUEST_BUDGET, help='วินาที (median)')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N', help='แสดงโมดูลที่ import ช้าที่สุด N อันดับ')
+    args = parser.parse_args()
+
+    env, runs = measure_startup(tempfile.mkdtemp(), args.runs)
+
+    budgets = {'import': args.import_budget, 'create_app': args.create_budget, 'first': args.first_request_budget}
+    over = []
+    print(f'{"stage":<12}{"median":>10}{"max":>10}{"budget":>10}')
+    for stage in STAGES:
+        timings = [run[stage] for run in runs]
+        median = statistics.median(timings)
+        if median > budgets[stage]:
+            over.append(stage)
+        print(f'{stage:<12}{median * 1000:>8.0f}ms{max(timings) * 1000:>8.0f}ms{budgets[stage] * 1000:>8.0f}ms')
+    total = statistics.median(sum(run[stage] for stage in STAGES) for run in runs)
+    print(f'{"total":<12}{total * 1000:>8.0f}ms')
+
+    if args.importtime:
+        print('\nslowest imports from app.py (cumulative):')
+        for cumulative, own, name in slowest_imports(env, args.importtime):
+            print(f'{cumulative / 1000:>8.1f}ms  (self {own / 1000:.1f}ms)  {name}')
+
+    if over:
+        print(f'OVER BUDGET: {", ".join(over)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+# --- Blueprint ของแต่ละส่วนของเว็บ (ลงทะเบียนใน create_app() ของ app.py) ---
+#
+# auth          หน้าแรก / สมัครสมาชิก / ล็อกอิน
+# wallets       กระเป๋าเงิน
+# transactions  Dashboard, ธุรกรรม, นำเข้า/ส่งออก, ธุรกรรมที่เกิดซ้ำ (+ คำสั่ง flask import-transactions)
+# categories    หมวดหมู่, งบประมาณ, การแจ้งเตือน
+# reports       รายงานรายเดือน
+# api           JSON API ทั้งหมด
+# internal      /metrics และ /internal/*
+#
+# URL ไม่เปลี่ยน แต่ชื่อ endpoint มีชื่อ Blueprint นำหน้า เช่น url_for('transactions.dashboard')
+# โมดูลเหล่านี้ import จาก app.py จึง import ตอนลงทะเบียน (ไม่ใช่ตอน import app)
+
+
+def register_blueprints(app):
+    from blueprints import api, auth, categories, internal, reports, transactions, wallets
+
+    for module in (auth, wallets, transactions, categories, reports, api, internal):
+        app.register_blueprint(module.bp)
@@ -0,0 +1,318 @@
+# --- Blueprint 'api': JSON API (หน้าเว็บโหลดเพิ่ม, สรุปหมวดหมู่, /api/v1/*, /api/sync) ---
+# (ใหม่!) ย้ายออกมาจาก app.py ลงทะเบียนใน blueprints/__init__.py (ชื่อ endpoint = 'api.<ชื่อฟังก์ชัน>')
+
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from flask import Blueprint, abort, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy import func
+
+from app import Category, Transaction, WalletBalance, _minor_to_decimal, apply_bulk_transaction_effects, \
+    build_sync_delta, bump_cache_version, cache, cache_version, cached_json_response, \
+    convert_wallet_amounts, db, filtered_transaction_query, ledger_cache, owned_category_types, owned_wallet_ids, \
+    rates_version, read_date_filters, read_replica, snapshot_transaction, transaction_listing_query, \
+    transaction_page_response, user_ledger, user_refdata, wallet_currencies
+from dbconfig import statement_timeout
+
+bp = Blueprint('api', __name__)
+
+###############################API#################################
+
+@bp.route("/api/transactions")
+@login_required
+@read_replica
+def transactions_page():
+    # หน้าถัดไปของตารางธุรกรรมใน Dashboard (ใช้ Filter เดียวกับ dashboard)
+    date_from_obj, date_to_obj, selected_wallet_id = read_date_filters()
+
+    wallet_ids = owned_wallet_ids(current_user.user_id)
+    query = filtered_transaction_query(wallet_ids, date_from_obj, date_to_obj, selected_wallet_id,
+                                       request.args.get('q'))
+    return transaction_page_response(query)
+
+
+@bp.route("/api/wallet/<int:wallet_id>/transactions")
+@login_required
+@read_replica
+def wallet_transactions_page(wallet_id):
+    # หน้าถัดไปของประวัติธุรกรรมในหน้า wallet_detail
+    if wallet_id not in owned_wallet_ids(current_user.user_id):
+        abort(404)
+    return transaction_page_response(transaction_listing_query().filter(Transaction.wallet_id == wallet_id))
+
+@bp.route("/api/category_summary")
+@login_required
+@read_replica
+def category_summary():
+    # --- 1. อ่านค่า Filter จาก URL (เหมือนกับใน dashboard) ---
+    date_from_obj, date_to_obj, selected_wallet_id = read_date_filters()
+
+    # --- 2. (ใหม่!) ลองหาใน Cache ก่อน (ข้อมูลเปลี่ยนเฉพาะตอนแก้ไขธุรกรรม/หมวดหมู่) ---
+    cache_key = 'category_summary:{}:v{}:r{}:{}:{}:{}'.format(
+        current_user.user_id, cache_version(current_user.user_id, 'summary'), rates_version(),
+        selected_wallet_id or 'all', date_from_obj.isoformat(), date_to_obj.isoformat())
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached['payload'], cached['etag'])
+
+    # --- 3. ดึง ID กระเป๋าเงินของผู้ใช้ (เหมือนกับใน dashboard) ---
+    wallet_ids = owned_wallet_ids(current_user.user_id)
+
+    # --- 4. (สำคัญ!) สร้าง Query สรุปยอดรายจ่ายตามหมวดหมู่ ---
+    # เราจะใช้ SQL (func.sum, group_by) เพื่อคำนวณอย่างมีประสิทธิภาพ
+    # (อัปเกรด!) แยกตามกระเป๋าด้วย เพื่อแปลงสกุลเงินของแต่ละกระเป๋าก่อนรวม
+    if ledger_cache() is not None:
+        # (ใหม่!) รวมยอดจากสำเนาแบบคอลัมน์ (ไม่ Query) แล้วแปลงรหัสหมวดหมู่เป็นชื่อ
+        # ธุรกรรมที่ไม่มีหมวดหมู่ไม่ถูกนับ (เหมือน JOIN ของ SQL ด้านล่าง)
+        names = {c['category_id']: c['category_name'] for c in user_refdata(current_user.user_id)['categories']}
+        groups = user_ledger(current_user.user_id).group_sum(
+            ('category', 'wallet'), date_from_obj, date_to_obj,
+            wallet_ids=[selected_wallet_id] if selected_wallet_id else wallet_ids, tx_type='expense')
+        rows = [(names[category_id], wallet_id, _minor_to_decimal(total))
+                for (category_id, wallet_id), (total, _) in groups.items() if category_id in names]
+    else:
+        query = db.session.query(
+            Category.category_name,
+            Transaction.wallet_id,
+            func.sum(Transaction.amount).label('total_amount')
+        ).join(Category, Transaction.category_id == Category.category_id) \
+            .filter(Transaction.wallet_id.in_(wallet_ids)) \
+            .filter(Transaction.type == 'expense') \
+            .filter(Transaction.date.between(date_from_obj, date_to_obj))
+
+        # (เพิ่ม Filter กระเป๋า ถ้ามีการเลือก)
+        if selected_wallet_id:
+            query = query.filter(Transaction.wallet_id == selected_wallet_id)
+
+        # สรุปผล (จำกัดเวลาเหมือน Query รายงานอื่น ๆ)
+        with statement_timeout(db.session):
+            rows = query.group_by(Category.category_name, Transaction.wallet_id).all()
+
+    # แปลงเป็นสกุลเงินหลัก (อัตรา ณ วันสุดท้ายของช่วง) แล้วจัดเรียงจากมากไปน้อย
+    by_category = {}
+    for category_name, wallet_id, total in rows:
+        amounts = by_category.setdefault(category_name, {})
+        amounts[wallet_id] = amounts.get(wallet_id, Decimal('0')) + Decimal(str(total))
+    currencies = wallet_currencies(current_user.user_id)
+    summary_data = sorted(
+        ((name, convert_wallet_amounts(amounts, currencies, date_to_obj)[0]) for name, amounts in by_category.items()),
+        key=lambda row: -row[1])  # ผลลัพธ์จะเป็น [('อาหาร', 500.00), ('เดินทาง', 300.00)]
+
+    # --- 5. แปลงข้อมูลให้อยู่ในรูปแบบที่ Chart.js ต้องการ ---
+    labels = [row[0] for row in summary_data]
+    data = [float(row[1]) for row in summary_data]  # แปลง Decimal เป็น float
+
+    # --- 6. เก็บลง Cache แล้วส่งข้อมูลกลับไปเป็น JSON ---
+    payload = {'labels': labels, 'data': data}
+    etag = hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    cache.set(cache_key, {'payload': payload, 'etag': etag})
+    return cached_json_response(payload, etag)
+
+###############################API v1#################################
+# (ใหม่!) JSON API สำหรับแอปมือถือ (ใช้ Session เดียวกับหน้าเว็บ)
+#   GET    /api/v1/wallets, /api/v1/categories
+#   GET    /api/v1/transactions?date_from=&date_to=&wallet_id=&cursor=
+#   POST   /api/v1/transactions            สร้าง 1 รายการ
+#   PUT    /api/v1/transactions/<id>       แก้ไข (ส่งเฉพาะช่องที่ต้องการเปลี่ยนได้)
+#   DELETE /api/v1/transactions/<id>
+#   POST   /api/v1/batch                   {"operations": [{"op": "create"|"update"|"delete", ...}, ...]}
+# batch: ตรวจสอบทุกรายการก่อน ถ้ามีรายการไหนผิด -> ไม่บันทึกเลยสักรายการ (commit ครั้งเดียว)
+
+# จำนวนรายการสูงสุดต่อหนึ่ง batch
+API_BATCH_LIMIT = 500
+
+TRANSACTION_FIELDS = ('wallet_id', 'category_id', 'description', 'amount', 'date', 'type')
+
+
+def parse_transaction_fields(data, wallet_ids, category_types, partial=False, current=None):
+    # แปลง/ตรวจสอบข้อมูลธุรกรรมจาก JSON -> dict ที่ใส่ลง Transaction ได้เลย (raise ValueError ถ้าผิด)
+    # category_types = {category_id: 'income'/'expense'} ของผู้ใช้, current = ธุรกรรมเดิม (ตอน update)
+    if not isinstance(data, dict):
+        raise ValueError('data must be an object')
+    if not partial:
+        missing = [f for f in ('wallet_id', 'amount', 'date', 'type') if data.get(f) in (None, '')]
+        if missing:
+            raise ValueError('missing ' + ', '.join(missing))
+
+    fields = {}
+    if 'wallet_id' in data:
+        if type(data['wallet_id']) is not int or data['wallet_id'] not in wallet_ids:
+            raise ValueError('unknown wallet_id')
+        fields['wallet_id'] = data['wallet_id']
+    if 'category_id' in data:
+        if data['category_id'] is not None and (type(data['category_id']) is not int
+                                                or data['category_id'] not in category_types):
+            raise ValueError('unknown category_id')
+        fields['category_id'] = data['category_id']
+    if 'description' in data:
+        fields['description'] = str(data['description']) if data['description'] is not None else None
+    if 'amount' in data:
+        try:
+            amount = Decimal(str(data['amount'])).quantize(Decimal('0.01'))
+        except ArithmeticError:
+            raise ValueError('invalid amount')
+        if not amount.is_finite():
+            raise ValueError('invalid amount')
+        if amount <= 0:
+            raise ValueError('amount must be positive')
+        fields['amount'] = amount
+    if 'date' in data:
+        try:
+            fields['date'] = datetime.strptime(str(data['date']), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('invalid date (YYYY-MM-DD)')
+    if 'type' in data:
+        if data['type'] not in ('income', 'expense'):
+            raise ValueError('type must be income or expense')
+        fields['type'] = data['type']
+
+    # หมวดหมู่ต้องเป็นประเภทเดียวกับธุรกรรม (เหมือน owned_category_id ของหน้าเว็บ) รวมค่าเดิมที่ไม่ได้ส่งมาด้วย
+    category_id = fields.get('category_id', current.category_id if current is not None else None)
+    tx_type = fields.get('type', current.type if current is not None else None)
+    if category_id is not None and category_types.get(category_id) != tx_type:
+        raise ValueError('category type does not match transaction type')
+    return fields
+
+
+def apply_transaction_batch(user_id, operations):
+    # รัน create/update/delete หลายรายการใน Transaction เดียว
+    # คืนค่า (results, errors) -> ถ้า errors ไม่ว่าง จะไม่มีอะไรถูกบันทึก
+    # ตรวจสิทธิ์จากฐานข้อมูล (ไม่ใช้ user_refdata ที่อาจค้างใน Cache ของ worker นี้)
+    wallet_ids = owned_wallet_ids(user_id)
+    category_types = owned_category_types(user_id)
+
+    # 1. ดึงธุรกรรมเดิมที่ถูกอ้างถึงทั้งหมดใน Query เดียว (และต้องอยู่ในกระเป๋าของผู้ใช้)
+    ids = {op.get('id') for op in operations
+           if isinstance(op, dict) and op.get('op') in ('update', 'delete') and isinstance(op.get('id'), int)}
+    existing = {}
+    if ids:
+        existing = {t.transaction_id: t for t in
+                    Transaction.query.filter(Transaction.transaction_id.in_(ids))
+                    .filter(Transaction.wallet_id.in_(wallet_ids))}
+
+    # 2. ตรวจสอบทุกรายการก่อนแตะฐานข้อมูล
+    errors = []
+    planned = []
+    touched = set()
+    for index, op in enumerate(operations):
+        try:
+            if not isinstance(op, dict) or op.get('op') not in ('create', 'update', 'delete'):
+                raise ValueError('op must be create, update or delete')
+            if op['op'] == 'create':
+                planned.append((op, None, parse_transaction_fields(op.get('data'), wallet_ids, category_types)))
+                continue
+            target = existing.get(op.get('id'))
+            if target is None:
+                raise ValueError('transaction not found')
+            if target.transaction_id in touched:
+                raise ValueError('transaction appears more than once in this batch')
+            touched.add(target.transaction_id)
+            fields = None
+            if op['op'] == 'update':
+                fields = parse_transaction_fields(op.get('data'), wallet_ids, category_types, partial=True,
+                                                  current=target)
+            planned.append((op, target, fields))
+        except ValueError as e:
+            errors.append({'index': index, 'client_id': op.get('client_id') if isinstance(op, dict) else None,
+                           'error': str(e)})
+    if errors:
+        return [], errors
+
+    # 3. เขียนทั้งหมด แล้วอัปเดตตารางสรุปครั้งเดียว
+    removed, added, results = [], [], []
+    for op, target, fields in planned:
+        if op['op'] == 'create':
+            target = Transaction(**fields)
+            db.session.add(target)
+        elif op['op'] == 'update':
+            removed.append(snapshot_transaction(target))
+            for name, value in fields.items():
+                setattr(target, name, value)
+        else:
+            removed.append(snapshot_transaction(target))
+            db.session.delete(target)
+        results.append((op, target))
+
+    db.session.flush()
+    for op, target in results:
+        if op['op'] != 'delete':
+            added.append(snapshot_transaction(target))
+    apply_bulk_transaction_effects(removed=removed, added=added)
+    db.session.commit()
+    bump_cache_version(user_id, 'summary')
+
+    return [{'op': op['op'], 'client_id': op.get('client_id'), 'transaction_id': target.transaction_id}
+            for op, target in results], []
+
+
+def transaction_batch_response(operations, status=200):
+    results, errors = apply_transaction_batch(current_user.user_id, operations)
+    if errors:
+        return jsonify(errors=errors), 400
+    return jsonify(results=results), status
+
+
+@bp.route("/api/v1/wallets")
+@login_required
+def api_wallets():
+    refdata = user_refdata(current_user.user_id)
+    balances = dict(db.session.query(WalletBalance.wallet_id, WalletBalance.balance)
+                    .filter(WalletBalance.user_id == current_user.user_id))
+    return jsonify(wallets=[dict(w, balance=str(balances.get(w['wallet_id']) or Decimal('0')))
+                            for w in refdata['wallets']])
+
+
+@bp.route("/api/v1/categories")
+@login_required
+def api_categories():
+    return jsonify(categories=user_refdata(current_user.user_id)['categories'])
+
+
+@bp.route("/api/v1/transactions", methods=['GET', 'POST'])
+@login_required
+def api_transactions():
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        return transaction_batch_response([{'op': 'create', 'data': data}], status=201)
+
+    # GET ใช้ Filter และ Cursor เดียวกับ /api/transactions
+    date_from_obj, date_to_obj, selected_wallet_id = read_date_filters()
+    query = filtered_transaction_query(owned_wallet_ids(current_user.user_id),
+                                       date_from_obj, date_to_obj, selected_wallet_id, request.args.get('q'))
+    return transaction_page_response(query)
+
+
+@bp.route("/api/v1/transactions/<int:transaction_id>", methods=['PUT', 'PATCH', 'DELETE'])
+@login_required
+def api_transaction(transaction_id):
+    if request.method == 'DELETE':
+        return transaction_batch_response([{'op': 'delete', 'id': transaction_id}])
+    data = request.get_json(silent=True)
+    return transaction_batch_response([{'op': 'update', 'id': transaction_id, 'data': data}])
+
+
+@bp.route("/api/v1/batch", methods=['POST'])
+@login_required
+def api_batch():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify(error='body must be a JSON object'), 400
+    operations = body.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify(error='operations must be a non-empty list'), 400
+    if len(operations) > API_BATCH_LIMIT:
+        return jsonify(error=f'at most {API_BATCH_LIMIT} operations per batch'), 400
+    return transaction_batch_response(operations)
+
+@bp.route("/api/sync")
+@login_required
+def api_sync():
+    # ส่งเฉพาะสิ่งที่เปลี่ยนหลังจาก since (ครั้งแรกใช้ since=0)
+    # client เก็บค่า seq ที่ได้ไว้ใช้ครั้งถัดไป ถ้า has_more = true ให้เรียกต่อทันทีด้วย seq ใหม่
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify(error='since must be >= 0'), 400
+    return jsonify(build_sync_delta(current_user.user_id, since))
@@ -0,0 +1,116 @@
+# --- Blueprint 'auth': หน้าแรก / สมัครสมาชิก / ล็อกอิน / ล็อกเอาต์ ---
+# (ใหม่!) ย้ายออกมาจาก app.py ลงทะเบียนใน blueprints/__init__.py (ชื่อ endpoint = 'auth.<ชื่อฟังก์ชัน>')
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+
+from app import PasswordPoolBusy, User, auth_rate_limited, check_password, db, hash_password, \
+    login_user_limiter, password_needs_rehash, schedule_rehash, server_busy, too_many_attempts
+
+bp = Blueprint('auth', __name__)
+
+########################################################################################
+####################################home####################################################
+
+# --- 4. สร้าง Routes (หน้าเว็บ) ---
+
+# แก้ไขฟังก์ชัน @bp.route("/") เดิม
+@bp.route("/")
+def home():
+    # ตรวจสอบว่าผู้ใช้ล็อกอินอยู่หรือไม่
+    if current_user.is_authenticated:
+        # ถ้าล็อกอินแล้ว ให้ส่งไปหน้า Dashboard เลย
+        return redirect(url_for('transactions.dashboard'))
+
+    # ถ้ายังไม่ล็อกอิน ให้แสดงหน้าต้อนรับ
+    return render_template('landing.html')
+
+####################################register#######################################################
+
+# (เพิ่ม Route ใหม่นี้เข้ามา)
+@bp.route("/register", methods=['GET', 'POST'])
+def register():
+    # ตรวจสอบว่าเป็นการ "ส่งข้อมูล" (POST) หรือแค่ "เปิดหน้าเว็บ" (GET)
+    if request.method == 'POST':
+        # 1. ดึงข้อมูลจากฟอร์ม
+        username = request.form.get('username')
+        password = request.form.get('password')
+
+        # (ใหม่!) จำกัดความถี่ต่อ IP ก่อนคำนวณ hash
+        retry_after = auth_rate_limited(None)
+        if retry_after:
+            return too_many_attempts('register.html', retry_after)
+
+        # 2. ตรวจสอบว่ามี username นี้ในระบบหรือยัง
+        existing_user = User.query.filter_by(username=username).first()
+        if existing_user:
+            flash('ชื่อผู้ใช้นี้มีคนใช้แล้ว กรุณาเลือกชื่ออื่น', 'danger')
+            return redirect(url_for('auth.register'))
+
+        # 3. เข้ารหัสรหัสผ่าน (Hashing) ใน password_pool (รอจนเสร็จ pool แค่จำกัดจำนวนที่คำนวณพร้อมกัน)
+        try:
+            hashed_password = hash_password(password)
+        except PasswordPoolBusy:
+            return server_busy('register.html')
+
+        # 4. สร้างผู้ใช้ใหม่ (ด้วย Model) และบันทึกลงฐานข้อมูล
+        new_user = User(username=username, password_hash=hashed_password)
+        db.session.add(new_user)
+        db.session.commit()
+
+        flash('ลงทะเบียนสำเร็จ! กรุณาล็อกอิน', 'success')
+        return redirect(url_for('auth.login')) # (เดี๋ยวเราจะสร้างหน้า login ต่อไป)
+
+    # 5. ถ้าเป็นการเปิดหน้าเว็บ (GET) ให้แสดงไฟล์ HTML
+    return render_template('register.html')
+
+#######################################login#################################################
+
+@bp.route("/login", methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        # 1. ดึงข้อมูลจากฟอร์ม
+        username = request.form.get('username')
+        password = request.form.get('password')
+
+        # (ใหม่!) จำกัดความถี่ต่อ username และต่อ IP ก่อนคำนวณ hash
+        retry_after = auth_rate_limited(username)
+        if retry_after:
+            return too_many_attempts('login.html', retry_after)
+
+        # 2. ค้นหาผู้ใช้ในฐานข้อมูล
+        user = User.query.filter_by(username=username).first()
+
+        # 3. ตรวจสอบผู้ใช้และรหัสผ่าน
+        # (ตรวจสอบว่า user มีอยู่จริง และ รหัสผ่านที่เข้ารหัสไว้ ตรงกับ รหัสผ่านที่กรอกมา)
+        try:
+            valid = user is not None and check_password(user.password_hash, password)
+        except PasswordPoolBusy:
+            return server_busy('login.html')
+
+        if valid:
+            # (ใหม่!) ถ้า hash เก่าใช้ความยากไม่ตรงกับค่าปัจจุบัน -> hash ใหม่เบื้องหลัง
+            if password_needs_rehash(user.password_hash):
+                schedule_rehash(user, password)
+
+            # 4. ล็อกอินผู้ใช้สำเร็จ (Flask-Login จะสร้าง Session)
+            login_user(user)
+            login_user_limiter.reset(f'user:{username.strip().lower()}')
+            flash('ล็อกอินสำเร็จ!', 'success')
+            return redirect(url_for('transactions.dashboard')) # (เดี๋ยวเราจะสร้างหน้า dashboard ต่อไป)
+        else:
+            flash('ชื่อผู้ใช้หรือรหัสผ่านไม่ถูกต้อง', 'danger')
+            return redirect(url_for('auth.login'))
+
+    # 5. ถ้าเป็น GET (เปิดหน้าเว็บ) ให้แสดงไฟล์ HTML
+    return render_template('login.html')
+
+
+###############################logout################################################
+
+@bp.route("/logout")
+@login_required
+def logout():
+    logout_user() # ล้าง Session ของผู้ใช้
+    flash('ออกจากระบบเรียบร้อยแล้ว', 'info')
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,149 @@
+# --- Blueprint 'categories': หมวดหมู่, งบประมาณ และการแจ้งเตือน ---
+# (ใหม่!) ย้ายออกมาจาก app.py ลงทะเบียนใน blueprints/__init__.py (ชื่อ endpoint = 'categories.<ชื่อฟังก์ชัน>')
+
+from decimal import Decimal
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from app import Budget, BudgetUsage, Category, MonthlyRollup, Notification, RecurringRule, \
+    bump_cache_version, db, owned_category_types, rebuild_budget_usage, upsert_monthly_rollup
+
+bp = Blueprint('categories', __name__)
+
+###############################category################################################
+
+@bp.route("/add_category", methods=['POST'])
+@login_required
+def add_category():
+    category_name = request.form.get('category_name')
+    category_type = request.form.get('category_type')  # 'income' หรือ 'expense'
+
+    if category_name and category_type:
+        new_category = Category(
+            category_name=category_name,
+            type=category_type,
+            user_id=current_user.user_id
+        )
+        db.session.add(new_category)
+        db.session.commit()
+        bump_cache_version(current_user.user_id, 'refdata')
+        flash('สร้างหมวดหมู่ใหม่สำเร็จ!', 'success')
+    else:
+        flash('ข้อมูลไม่ครบถ้วน', 'danger')
+
+    return redirect(url_for('transactions.dashboard'))
+
+
+@bp.route("/delete_category/<int:category_id>", methods=['POST'])
+@login_required
+def delete_category(category_id):
+    # 1. ค้นหาหมวดหมู่ และตรวจสอบว่าเป็นของ User ที่ล็อกอินอยู่
+    cat_to_delete = Category.query.filter_by(
+        category_id=category_id,
+        user_id=current_user.user_id
+    ).first_or_404()
+
+    # 2. (สำคัญ!) ฐานข้อมูลของเราตั้งค่า ON DELETE SET NULL
+    #    หมายความว่า "ถ้าลบหมวดหมู่ ให้ตั้งค่า category_id ใน transactions เป็น NULL"
+    #    SQLAlchemy จะจัดการเรื่องนี้ให้เราอัตโนมัติ
+
+    # (ใหม่!) ย้ายยอดรายเดือนของหมวดหมู่นี้ไปไว้ที่ "ไม่มีหมวดหมู่" ให้ตรงกับธุรกรรม
+    for rollup in MonthlyRollup.query.filter_by(category_id=category_id).all():
+        key = (rollup.wallet_id, None, rollup.type, rollup.year, rollup.month)
+        total, tx_count = rollup.total, rollup.tx_count
+        db.session.delete(rollup)
+        db.session.flush()
+        upsert_monthly_rollup(key, total, tx_count)
+
+    # กฎธุรกรรมที่เกิดซ้ำยังทำงานต่อ แต่ไม่มีหมวดหมู่
+    RecurringRule.query.filter_by(category_id=category_id).update({'category_id': None})
+    # งบของหมวดหมู่นี้ถูกลบไปด้วย
+    budget_ids = [budget_id for (budget_id,) in db.session.query(Budget.budget_id).filter_by(category_id=category_id)]
+    if budget_ids:
+        BudgetUsage.query.filter(BudgetUsage.budget_id.in_(budget_ids)).delete(synchronize_session=False)
+        Budget.query.filter(Budget.budget_id.in_(budget_ids)).delete(synchronize_session=False)
+    db.session.delete(cat_to_delete)
+    db.session.commit()
+    bump_cache_version(current_user.user_id, 'summary', 'refdata', 'analytics')
+
+    flash(f'ลบหมวดหมู่ "{cat_to_delete.category_name}" เรียบร้อยแล้ว (ธุรกรรมเก่าจะถูกตั้งเป็น "ไม่มีหมวดหมู่")',
+          'success')
+    return redirect(url_for('transactions.dashboard'))
+
+###############################budget################################################
+
+@bp.route("/set_budget", methods=['POST'])
+@login_required
+def set_budget():
+    # ตั้ง/แก้วงเงินต่อเดือนของหมวดหมู่รายจ่าย (ใส่ 0 หรือเว้นว่าง = ยกเลิกงบ)
+    category_id = request.form.get('category_id', type=int)
+    if owned_category_types(current_user.user_id).get(category_id) != 'expense':
+        flash('กรุณาเลือกหมวดหมู่รายจ่าย', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+    try:
+        amount = Decimal(request.form.get('amount') or '0')
+        if not amount.is_finite() or amount < 0:
+            raise ValueError
+    except (ArithmeticError, ValueError):
+        flash('จำนวนเงินไม่ถูกต้อง', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    budget = Budget.query.filter_by(category_id=category_id).first()
+    if not amount:
+        if budget is not None:
+            BudgetUsage.query.filter_by(budget_id=budget.budget_id).delete()
+            db.session.delete(budget)
+        flash('ยกเลิกงบประมาณแล้ว', 'success')
+    else:
+        if budget is None:
+            budget = Budget(user_id=current_user.user_id, category_id=category_id, amount=amount)
+            db.session.add(budget)
+        budget.amount = amount
+        db.session.flush()
+        # ยอดใช้ไปของทุกเดือนคำนวณจากยอดรายเดือนที่มีอยู่ (งบใหม่ไม่แจ้งเตือนย้อนหลัง)
+        rebuild_budget_usage([budget.budget_id])
+        flash('บันทึกงบประมาณเรียบร้อยแล้ว', 'success')
+    db.session.commit()
+    bump_cache_version(current_user.user_id, 'summary')
+    return redirect(url_for('transactions.dashboard'))
+
+
+@bp.route("/notifications/read", methods=['POST'])
+@login_required
+def read_notifications():
+    Notification.query.filter_by(user_id=current_user.user_id, is_read=False).update({'is_read': True})
+    db.session.commit()
+    return redirect(url_for('transactions.dashboard'))
+
+###############################edit_category################################################
+
+@bp.route("/edit_category/<int:category_id>", methods=['GET', 'POST'])
+@login_required
+def edit_category(category_id):
+    # 1. ค้นหาหมวดหมู่ และตรวจสอบเจ้าของ
+    cat_to_edit = Category.query.filter_by(
+        category_id=category_id,
+        user_id=current_user.user_id
+    ).first_or_404()
+
+    # 2. ถ้าเป็นการ POST (กดบันทึก)
+    if request.method == 'POST':
+        new_name = request.form.get('category_name')
+        # (เราสามารถเพิ่มการแก้ไข type ได้ แต่ตอนนี้เอาแค่ชื่อก่อน)
+        if new_name:
+            cat_to_edit.category_name = new_name
+            db.session.commit()
+            bump_cache_version(current_user.user_id, 'summary', 'refdata')
+            flash('อัปเดตชื่อหมวดหมู่เรียบร้อยแล้ว', 'success')
+            return redirect(url_for('transactions.dashboard'))
+
+    # 3. ถ้าเป็นการ GET (เปิดหน้าครั้งแรก)
+    #    (อัจฉริยะ!) เราใช้ Template อเนกประสงค์เดิมได้เลย!
+    return render_template('edit_form_template.html',
+                           item=cat_to_edit,
+                           title="แก้ไขหมวดหมู่",
+                           form_url=url_for('categories.edit_category', category_id=category_id),
+                           label="ชื่อหมวดหมู่ใหม่:",
+                           value=cat_to_edit.category_name,
+                           name_field="category_name")
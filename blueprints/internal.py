@@ -0,0 +1,40 @@
+# --- Blueprint 'internal': /metrics และ /internal/* (เปิดเมื่อตั้ง METRICS_TOKEN) ---
+# (ใหม่!) ย้ายออกมาจาก app.py ลงทะเบียนใน blueprints/__init__.py (ชื่อ endpoint = 'internal.<ชื่อฟังก์ชัน>')
+
+import os
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+
+from app import audit_writer, db, ledger_cache, metrics
+from dbconfig import pool_stats
+
+bp = Blueprint('internal', __name__)
+
+###############################metrics################################################
+
+def metrics_authorized():
+    # /metrics และ /internal/* เปิดเฉพาะเมื่อตั้ง METRICS_TOKEN
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        abort(404)
+    if request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+
+
+@bp.route("/metrics")
+def metrics_endpoint():
+    metrics_authorized()
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+###############################internal################################################
+
+@bp.route("/internal/pool")
+def pool_status():
+    # สถิติ Connection Pool ของ worker นี้ (เปิดใช้เมื่อตั้ง METRICS_TOKEN เท่านั้น)
+    metrics_authorized()
+    replica = db.engines.get('replica')
+    return jsonify(pid=os.getpid(), pool=pool_stats.snapshot(db.engine.pool), status=db.engine.pool.status(),
+                   replica_status=replica.pool.status() if replica is not None else None,
+                   analytics=ledger_cache().stats() if ledger_cache() is not None else None,
+                   audit=audit_writer().stats() if audit_writer() is not None else None)
@@ -0,0 +1,99 @@
+# --- Blueprint 'reports': รายงานรายเดือน ---
+# (ใหม่!) ย้ายออกมาจาก app.py ลงทะเบียนใน blueprints/__init__.py (ชื่อ endpoint = 'reports.<ชื่อฟังก์ชัน>')
+
+from datetime import datetime
+from decimal import Decimal
+
+from flask import Blueprint, jsonify, render_template, request
+from flask_login import current_user, login_required
+from sqlalchemy import and_, func, or_
+
+from app import Category, MONTH_NAMES, MonthlyRollup, convert_wallet_amounts, db, read_replica, \
+    wallet_currencies
+from dbconfig import statement_timeout
+from rates import month_end
+
+bp = Blueprint('reports', __name__)
+
+###############################reports################################################
+
+def recent_months(count):
+    # คืนค่า [(ปี, เดือน), ...] ย้อนหลัง count เดือน (เรียงจากเก่าไปใหม่ จบที่เดือนปัจจุบัน)
+    today = datetime.now()
+    index = today.year * 12 + (today.month - 1)
+    return [(i // 12, i % 12 + 1) for i in range(index - count + 1, index + 1)]
+
+
+def build_monthly_report(user_id, months=24, tx_type='expense'):
+    # สรุปยอดรายเดือนแยกตามหมวดหมู่ จากตาราง monthly_rollups (ไม่แตะตาราง transactions)
+    periods = recent_months(months)
+    start_year, start_month = periods[0]
+
+    # Query รายงานถูกจำกัดเวลา (DB_REPORT_TIMEOUT_MS) ไม่ให้ยึด connection นานเกินไป
+    with statement_timeout(db.session):
+        rows = db.session.query(
+            MonthlyRollup.year,
+            MonthlyRollup.month,
+            Category.category_name,
+            MonthlyRollup.wallet_id,
+            func.sum(MonthlyRollup.total)
+        ).outerjoin(Category, MonthlyRollup.category_id == Category.category_id) \
+            .filter(MonthlyRollup.user_id == user_id) \
+            .filter(MonthlyRollup.type == tx_type) \
+            .filter(or_(MonthlyRollup.year > start_year,
+                        and_(MonthlyRollup.year == start_year, MonthlyRollup.month >= start_month))) \
+            .group_by(MonthlyRollup.year, MonthlyRollup.month, Category.category_name, MonthlyRollup.wallet_id) \
+            .all()
+
+    # (ใหม่!) รวมยอดของแต่ละกระเป๋าก่อน แล้วแปลงเป็นสกุลเงินหลักด้วยอัตรา ณ สิ้นเดือนนั้น
+    position = {period: i for i, period in enumerate(periods)}
+    cells = {}
+    for year, month, category_name, wallet_id, total in rows:
+        i = position.get((year, month))
+        if i is None or not total:
+            continue
+        cells.setdefault((category_name or 'ไม่มีหมวดหมู่', year, month), {})[wallet_id] = Decimal(str(total))
+
+    currencies = wallet_currencies(user_id)
+    series = {}
+    totals = [Decimal('0.00')] * len(periods)
+    for (name, year, month), amounts in cells.items():
+        i = position[(year, month)]
+        total, _ = convert_wallet_amounts(amounts, currencies, month_end(year, month))
+        series.setdefault(name, [Decimal('0.00')] * len(periods))[i] += total
+        totals[i] += total
+
+    month_names = dict(MONTH_NAMES)
+    return {
+        'periods': [f'{year}-{month:02d}' for year, month in periods],
+        'labels': [f'{month_names[month]} {year}' for year, month in periods],
+        'series': [{'category': name, 'data': data}
+                   for name, data in sorted(series.items(), key=lambda item: -sum(item[1]))],
+        'totals': totals,
+    }
+
+
+@bp.route("/reports/monthly")
+@login_required
+@read_replica
+def monthly_report():
+    months = min(max(request.args.get('months', 24, type=int), 1), 120)
+    tx_type = 'income' if request.args.get('type') == 'income' else 'expense'
+    report = build_monthly_report(current_user.user_id, months, tx_type)
+    return render_template('monthly_report.html', report=report, months=months, tx_type=tx_type)
+
+
+@bp.route("/api/reports/monthly")
+@login_required
+@read_replica
+def monthly_report_data():
+    months = min(max(request.args.get('months', 24, type=int), 1), 120)
+    tx_type = 'income' if request.args.get('type') == 'income' else 'expense'
+    report = build_monthly_report(current_user.user_id, months, tx_type)
+
+    # แปลง Decimal เป็น float ให้ Chart.js ใช้ได้ (เหมือน category_summary)
+    return jsonify(periods=report['periods'],
+                   labels=report['labels'],
+                   series=[{'category': s['category'], 'data': [float(v) for v in s['data']]}
+                           for s in report['series']],
+                   totals=[float(v) for v in report['totals']])
@@ -0,0 +1,578 @@
+# --- Blueprint 'transactions': Dashboard, ธุรกรรม, ส่งออก/นำเข้าไฟล์ และธุรกรรมที่เกิดซ้ำ ---
+# (ใหม่!) ย้ายออกมาจาก app.py ลงทะเบียนใน blueprints/__init__.py (ชื่อ endpoint = 'transactions.<ชื่อฟังก์ชัน>')
+
+import io
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import click
+from flask import Blueprint, Response, current_app, flash, jsonify, redirect, render_template, request, \
+    stream_with_context, url_for
+from flask_login import current_user, login_required
+
+from app import Category, NOTIFICATION_LIMIT, Notification, RecurringRule, Transaction, User, Wallet, \
+    WalletBalance, aggregate_totals, apply_bulk_transaction_effects, apply_transaction_effects, \
+    budget_progress, bump_cache_version, cache_version, cached_fragment, convert_wallet_amounts, db, \
+    fetch_transaction_page, filtered_transaction_query, materialize_recurring_rules, owned_category_types, \
+    owned_wallet_ids, rates_version, read_date_filters, read_replica, record_sync_changes, snapshot_transaction, \
+    user_refdata, wallet_currencies
+from exporters import iter_csv, iter_xlsx
+from importers import ImportRowError, chunked, iter_csv_rows, iter_ofx_rows, parse_amount
+from recurrence import FREQUENCIES, first_occurrence, validate_rule
+
+bp = Blueprint('transactions', __name__, cli_group=None)
+
+####################################dashboard########################################################
+
+# (ใหม่!) ส่วนของหน้า dashboard ที่เปลี่ยนไม่บ่อย render แล้วเก็บเป็น HTML ใน Cache (ดู cached_fragment)
+# key มีเวอร์ชันของข้อมูลที่ใช้ -> เพิ่ม/แก้ธุรกรรม (summary) หรือกระเป๋า/หมวดหมู่ (refdata) แล้ว render ใหม่เอง
+# เปลี่ยน Filter อย่างเดียว = ใช้ HTML เดิม ไม่ต้อง Query ยอดคงเหลือ/งบ และไม่ต้อง render ซ้ำ
+
+def dashboard_panels(user_id, refdata):
+    versions = (user_id, cache_version(user_id, 'refdata'), cache_version(user_id, 'summary'))
+    reporting_currency = current_app.config['REPORTING_CURRENCY']
+    income_categories = [c for c in refdata['categories'] if c['type'] == 'income']
+    expense_categories = [c for c in refdata['categories'] if c['type'] == 'expense']
+
+    def render_wallets():
+        # ยอดสะสมดึงจาก wallet_balances ใน Query เดียว
+        balances = dict(db.session.query(WalletBalance.wallet_id, WalletBalance.balance)
+                        .filter(WalletBalance.user_id == user_id))
+        wallet_data = [{
+            'id': wallet['wallet_id'],
+            'name': wallet['wallet_name'],
+            'currency': wallet['currency'],
+            'balance': balances.get(wallet['wallet_id']) or Decimal('0'),
+        } for wallet in refdata['wallets']]
+        return render_template('_dashboard_wallets.html', wallet_data=wallet_data,
+                               reporting_currency=reporting_currency)
+
+    def render_categories():
+        # งบประมาณเดือนนี้ (ยอดใช้ไปถูกอัปเดตตอนเขียนธุรกรรม ไม่ต้อง SUM)
+        today = datetime.now()
+        return render_template('_dashboard_categories.html',
+                               budgets=budget_progress(user_id, today.year, today.month),
+                               reporting_currency=reporting_currency,
+                               income_categories=income_categories,
+                               expense_categories=expense_categories)
+
+    today_date = datetime.now().strftime('%Y-%m-%d')
+    return {
+        'wallets': cached_fragment('wallets', versions, render_wallets),
+        'categories': cached_fragment('categories', versions + (rates_version(), datetime.now().strftime('%Y-%m')),
+                                      render_categories),
+        'add_transaction': cached_fragment('add_transaction', versions[:2] + (today_date,), lambda: render_template(
+            '_dashboard_add_transaction.html', wallets=refdata['wallets'], today_date=today_date,
+            income_categories=income_categories, expense_categories=expense_categories)),
+    }
+
+
+@bp.route("/dashboard")
+@login_required
+@read_replica
+def dashboard():
+    # --- 1. (อัปเกรด!) อ่านค่า Filter จาก URL (วันที่เริ่มต้น = ต้นเดือนถึงวันนี้) ---
+    date_from_obj, date_to_obj, selected_wallet_id = read_date_filters()
+
+    # --- 3. ดึงข้อมูลพื้นฐาน ---
+    # (อัปเกรด!) กระเป๋า/หมวดหมู่มาจาก Cache
+    refdata = user_refdata(current_user.user_id)
+    # กระเป๋าที่ใช้กรองธุรกรรมมาจากฐานข้อมูล (Cache ของ worker นี้อาจยังมีกระเป๋าที่ถูกลบไปแล้ว)
+    wallet_ids = owned_wallet_ids(current_user.user_id)
+
+    # --- 4. (อัปเกรด!) สร้าง Query ธุรกรรม ---
+    # (ใหม่!) กรองตามกระเป๋าและช่วงวันที่
+    search_query = request.args.get('q', '').strip()
+    query = filtered_transaction_query(wallet_ids, date_from_obj, date_to_obj, selected_wallet_id, search_query)
+
+    # (อัปเกรด!) แสดงแค่หน้าแรก ที่เหลือให้หน้าเว็บโหลดเพิ่มผ่าน /api/transactions
+    first_page, next_cursor = fetch_transaction_page(query)
+
+    # --- 5. (อัปเกรด!) คำนวณยอดด้วย SQL แทนการบวกใน Python ---
+    filtered_wallet_ids = [selected_wallet_id] if selected_wallet_id else wallet_ids
+    # ยอดรวมใช้ Filter เดียวกับรายการด้านล่าง (รวมคำค้นหา q) ยอดจึงตรงกับแถวที่เห็น
+    totals = aggregate_totals([w for w in filtered_wallet_ids if w in wallet_ids],
+                              date_from_obj, date_to_obj, user_id=current_user.user_id, search=search_query)
+    # (ใหม่!) ยอดของแต่ละกระเป๋าเป็นสกุลเงินของกระเป๋านั้น -> แปลงเป็นสกุลเงินหลักด้วยอัตรา ณ วันสุดท้ายของช่วง
+    total_balance, missing_currencies = convert_wallet_amounts(
+        {wallet_id: t['balance'] for wallet_id, t in totals['wallets'].items()},
+        wallet_currencies(current_user.user_id), date_to_obj)
+
+    results = dict(transactions=first_page,
+                   next_cursor=next_cursor,
+                   total_balance=total_balance,
+                   reporting_currency=current_app.config['REPORTING_CURRENCY'],
+                   missing_currencies=sorted(missing_currencies),
+                   # (ใหม่!) ส่งค่าวันที่ที่เลือกกลับไปให้ฟอร์ม
+                   date_from=date_from_obj.strftime('%Y-%m-%d'),
+                   date_to=date_to_obj.strftime('%Y-%m-%d'),
+                   selected_wallet_id=selected_wallet_id,
+                   search_query=search_query)
+
+    # (ใหม่!) หน้าเว็บกด "กรอง" -> ส่งเฉพาะยอดรวม + ตารางธุรกรรม
+    if request.args.get('fragment') == 'results':
+        return render_template('_dashboard_results.html', results_only=True, **results)
+
+    # การแจ้งเตือนที่ยังไม่อ่าน (ไม่เก็บใน Cache เพราะกด "รับทราบ" แล้วต้องหายทันที)
+    notifications = Notification.query.filter_by(user_id=current_user.user_id, is_read=False) \
+        .order_by(Notification.notification_id.desc()) \
+        .limit(NOTIFICATION_LIMIT) \
+        .all()
+
+    # --- 6. ส่งข้อมูลไป HTML (อัปเกรด!) ---
+    return render_template('dashboard.html',
+                           panels=dashboard_panels(current_user.user_id, refdata),
+                           wallets=refdata['wallets'],
+                           notifications=notifications,
+                           **results)
+
+
+###################################transaction######################################################
+
+def owned_category_id(category_types, category_id, tx_type):
+    # หมวดหมู่ที่ส่งมาจากฟอร์มต้องเป็นของผู้ใช้เอง และประเภทตรงกับธุรกรรม (ไม่อย่างนั้นคืน None)
+    # ป้องกันการปลอม category_id ของคนอื่นเพื่อไปกินงบ/ส่งการแจ้งเตือนให้เขา
+    # category_types มาจาก owned_category_types() (ฐานข้อมูล ไม่ใช่ Cache)
+    if not category_id or not str(category_id).isdigit():
+        return None
+    category_id = int(category_id)
+    return category_id if category_types.get(category_id) == tx_type else None
+
+
+@bp.route("/add_transaction", methods=['POST'])
+@login_required
+def add_transaction():
+    # 1. ดึงข้อมูลทั้งหมดจากฟอร์ม
+    wallet_id = request.form.get('wallet_id')
+    description = request.form.get('description')
+    amount = request.form.get('amount')
+    date_str = request.form.get('date') # ได้มาเป็น string
+    type = request.form.get('type')
+    category_id = request.form.get('category_id')  # <-- (เพิ่ม!) บรรทัดที่ 1/2
+    # (ใหม่!) หมวดหมู่ต้องเป็นของผู้ใช้เองและประเภทตรงกัน (เหมือน parse_transaction_fields ใน api.py)
+    if type not in ('income', 'expense'):
+        type = None
+    category_id = owned_category_id(owned_category_types(current_user.user_id), category_id, type)
+
+    # 2. (สำคัญ) ตรวจสอบว่ากระเป๋านี้เป็นของผู้ใช้จริงหรือไม่ (ป้องกันการปลอมแปลง)
+    wallet = wallet_id and wallet_id.isdigit() and int(wallet_id) in owned_wallet_ids(current_user.user_id)
+
+    # 3. แปลง string วันที่เป็น object date และยอดเงินเป็น Decimal 2 ตำแหน่ง (อัปเกรด!)
+    #    ต้องแปลงก่อนสร้างธุรกรรม ไม่อย่างนั้นยอดสะสม (WalletBalance) คิดจาก string ดิบและไม่ตรงกับยอดที่บันทึกจริง
+    try:
+        date_obj = datetime.strptime(date_str or '', '%Y-%m-%d').date()
+        amount = parse_amount(amount)
+        if amount <= 0:
+            raise ValueError('amount must be positive')
+    except ValueError:
+        flash('วันที่หรือจำนวนเงินไม่ถูกต้อง', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    # (อัปเกรด!) ตรวจสอบ category_id ด้วย
+    if wallet and type and category_id:
+        # 4. สร้าง Object ธุรกรรมใหม่
+        new_trans = Transaction(
+            description=description,
+            amount=amount,
+            date=date_obj,
+            type=type,
+            wallet_id=wallet_id,
+            category_id=category_id  # <-- (เพิ่ม!) บรรทัดที่ 2/2
+        )
+        db.session.add(new_trans)
+        # (ใหม่!) อัปเดตยอดสะสมของกระเป๋าใน Transaction เดียวกัน
+        apply_transaction_effects(new=snapshot_transaction(new_trans))
+        db.session.commit()
+        bump_cache_version(current_user.user_id, 'summary')
+        flash('บันทึกธุรกรรมสำเร็จ!', 'success')
+    else:
+        flash('ข้อมูลไม่ถูกต้อง หรือคุณไม่ได้เลือกหมวดหมู่', 'danger')
+
+    return redirect(url_for('transactions.dashboard'))
+
+
+###############################delete_transaction################################################
+
+@bp.route("/delete_transaction/<int:transaction_id>", methods=['POST'])
+@login_required
+def delete_transaction(transaction_id):
+    # 1. ค้นหาธุรกรรมที่ต้องการลบ
+    transaction_to_delete = db.session.get(Transaction, transaction_id)
+
+    if not transaction_to_delete:
+        flash('ไม่พบธุรกรรมที่ต้องการลบ', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    # 2. (สำคัญ!) ตรวจสอบความปลอดภัย
+    #    เช็กว่าธุรกรรมนี้ อยู่ในกระเป๋าที่เป็นของผู้ใช้ที่ล็อกอินอยู่หรือไม่
+    if transaction_to_delete.wallet_id in owned_wallet_ids(current_user.user_id):
+        # 3. ถ้าเป็นเจ้าของจริง ให้ลบ (และหักยอดสะสมออก)
+        old_snapshot = snapshot_transaction(transaction_to_delete)
+        db.session.delete(transaction_to_delete)
+        apply_transaction_effects(old=old_snapshot)
+        db.session.commit()
+        bump_cache_version(current_user.user_id, 'summary')
+        flash('ลบธุรกรรมเรียบร้อยแล้ว', 'success')
+    else:
+        # 4. ถ้าพยายามลบของคนอื่น
+        flash('คุณไม่มีสิทธิ์ลบธุรกรรมนี้', 'danger')
+
+    # 5. กลับไปหน้า Dashboard
+    # (เราสามารถทำให้มันฉลาดขึ้นโดยการ redirect กลับไปหน้าที่มาได้ แต่ตอนนี้เอาแบบง่ายก่อน)
+    return redirect(url_for('transactions.dashboard'))
+
+##########################edit_transaction################################################
+
+@bp.route("/edit_transaction/<int:transaction_id>", methods=['GET', 'POST'])
+@login_required
+def edit_transaction(transaction_id):
+    # 1. ค้นหาธุรกรรม
+    transaction_to_edit = db.session.get(Transaction, transaction_id)
+    if not transaction_to_edit:
+        flash('ไม่พบธุรกรรม', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    # 2. ตรวจสอบความปลอดภัย (เหมือนตอนลบ)
+    wallet_ids = owned_wallet_ids(current_user.user_id)
+    if transaction_to_edit.wallet_id not in wallet_ids:
+        flash('คุณไม่มีสิทธิ์แก้ไขธุรกรรมนี้', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    # 3. ดึงข้อมูลสำหรับ Dropdown (กระเป๋า, หมวดหมู่) จาก Cache
+    refdata = user_refdata(current_user.user_id)
+    user_wallets = refdata['wallets']
+    income_categories = [c for c in refdata['categories'] if c['type'] == 'income']
+    expense_categories = [c for c in refdata['categories'] if c['type'] == 'expense']
+
+    # 4. ถ้าเป็นการ POST (กดบันทึกการแก้ไข)
+    if request.method == 'POST':
+        # (ใหม่!) จำค่าเดิมไว้ก่อน เพื่อถอนยอดเก่าออกจากยอดสะสม
+        old_snapshot = snapshot_transaction(transaction_to_edit)
+
+        # 5. ดึงข้อมูลใหม่จากฟอร์ม (กระเป๋าใหม่ต้องเป็นของผู้ใช้เองด้วย)
+        new_wallet_id = request.form.get('wallet_id', type=int)
+        if new_wallet_id not in wallet_ids:
+            flash('คุณไม่มีสิทธิ์ย้ายธุรกรรมไปกระเป๋านี้', 'danger')
+            return redirect(url_for('transactions.dashboard'))
+        # หมวดหมู่ต้องเป็นของผู้ใช้เองและประเภทตรงกัน (เว้นว่าง = ไม่มีหมวดหมู่)
+        new_type = request.form.get('type')
+        new_category_id = owned_category_id(owned_category_types(current_user.user_id),
+                                            request.form.get('category_id'), new_type)
+        if new_type not in ('income', 'expense') or (request.form.get('category_id') and new_category_id is None):
+            flash('หมวดหมู่หรือประเภทธุรกรรมไม่ถูกต้อง', 'danger')
+            return redirect(url_for('transactions.dashboard'))
+        # ยอดเงินแปลงเป็น Decimal 2 ตำแหน่งก่อนคำนวณยอดสะสม (เหมือน add_transaction)
+        try:
+            new_amount = parse_amount(request.form.get('amount'))
+            if new_amount <= 0:
+                raise ValueError('amount must be positive')
+            new_date = datetime.strptime(request.form.get('date') or '', '%Y-%m-%d').date()
+        except ValueError:
+            flash('วันที่หรือจำนวนเงินไม่ถูกต้อง', 'danger')
+            return redirect(url_for('transactions.dashboard'))
+        transaction_to_edit.wallet_id = new_wallet_id
+        transaction_to_edit.description = request.form.get('description')
+        transaction_to_edit.amount = new_amount
+        transaction_to_edit.date = new_date
+        transaction_to_edit.type = new_type
+        transaction_to_edit.category_id = new_category_id
+
+        # 6. ปรับยอดสะสม (ถอนค่าเก่า + ใส่ค่าใหม่) แล้วบันทึก (Commit) การเปลี่ยนแปลง
+        apply_transaction_effects(old=old_snapshot, new=snapshot_transaction(transaction_to_edit))
+        db.session.commit()
+        bump_cache_version(current_user.user_id, 'summary')
+        flash('อัปเดตธุรกรรมเรียบร้อยแล้ว', 'success')
+        return redirect(url_for('transactions.dashboard'))
+
+    # 7. ถ้าเป็นการ GET (เปิดหน้าแก้ไขครั้งแรก)
+    #    ให้แสดง HTML พร้อมข้อมูลเก่า
+    return render_template('edit_transaction.html',
+                           transaction=transaction_to_edit,
+                           user_wallets=user_wallets,
+                           income_categories=income_categories,
+                           expense_categories=expense_categories)
+
+
+###############################export################################################
+
+# จำนวนแถวที่ดึงจากฐานข้อมูลต่อรอบตอนส่งออกไฟล์
+EXPORT_FETCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (iter_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+EXPORT_HEADER = ['date', 'wallet', 'category', 'description', 'amount', 'type']
+
+
+def iter_export_rows(query):
+    # yield_per + stream_results -> ฐานข้อมูลส่งแถวมาทีละก้อน (server-side cursor บน PostgreSQL)
+    # RAM ที่ใช้จึงคงที่ ไม่ว่าจะมีธุรกรรมกี่ล้านแถว
+    rows = query.order_by(Transaction.date.desc(), Transaction.transaction_id.desc()) \
+        .execution_options(stream_results=True) \
+        .yield_per(EXPORT_FETCH_SIZE)
+    for t in rows:
+        yield (t.date.strftime('%Y-%m-%d'), t.wallet_name, t.category_name or '',
+               t.description or '', t.amount, t.type)
+
+
+@bp.route("/export")
+@login_required
+@read_replica
+def export_transactions():
+    # ส่งออกธุรกรรมตาม Filter ของ dashboard (date_from, date_to, wallet_id, q) เป็น CSV หรือ XLSX
+    file_format = request.args.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        return jsonify(error='format must be csv or xlsx'), 400
+
+    date_from_obj, date_to_obj, selected_wallet_id = read_date_filters()
+    wallet_ids = owned_wallet_ids(current_user.user_id)
+    query = filtered_transaction_query(wallet_ids, date_from_obj, date_to_obj, selected_wallet_id,
+                                       request.args.get('q'))
+
+    writer, mimetype = EXPORT_FORMATS[file_format]
+    filename = f"transactions_{date_from_obj:%Y%m%d}_{date_to_obj:%Y%m%d}.{file_format}"
+    # stream_with_context -> ยังใช้ db.session / current_user ได้ระหว่างที่ทยอยส่งข้อมูล
+    return Response(
+        stream_with_context(writer(EXPORT_HEADER, iter_export_rows(query))),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+###############################import################################################
+
+# จำนวนแถวต่อหนึ่ง Transaction ของฐานข้อมูลตอนนำเข้าไฟล์
+IMPORT_BATCH_SIZE = 5000
+
+
+def import_transactions(user_id, rows, default_wallet_id=None, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    # นำเข้าธุรกรรมจำนวนมาก (rows มาจาก importers.iter_csv_rows / iter_ofx_rows)
+    # - โหลดกระเป๋า/หมวดหมู่ของผู้ใช้ครั้งเดียว แล้วตรวจความเป็นเจ้าของจาก dict ในหน่วยความจำ
+    # - INSERT ทีละก้อน (executemany) และ commit ทีละก้อน
+    # - หมวดหมู่ที่ยังไม่มีจะถูกสร้างให้ทีเดียวต่อก้อน
+    wallets = {name: wallet_id for wallet_id, name in
+               db.session.query(Wallet.wallet_id, Wallet.wallet_name).filter(Wallet.user_id == user_id)}
+    owned_wallet_ids = set(wallets.values())
+    if default_wallet_id is not None and default_wallet_id not in owned_wallet_ids:
+        raise ValueError('wallet does not belong to this user')
+
+    categories = {(name, tx_type): category_id for category_id, name, tx_type in
+                  db.session.query(Category.category_id, Category.category_name, Category.type)
+                  .filter(Category.user_id == user_id)}
+
+    result = {'imported': 0, 'error_count': 0, 'errors': []}
+
+    def reject(error):
+        result['error_count'] += 1
+        if len(result['errors']) < 100:
+            result['errors'].append(str(error))
+
+    for batch in chunked(rows, batch_size):
+        # 1. ตรวจกระเป๋า และรวบรวมหมวดหมู่ที่ยังไม่มี
+        accepted = []
+        missing_categories = set()
+        for row in batch:
+            if isinstance(row, ImportRowError):
+                reject(row)
+                continue
+            wallet_id = wallets.get(row['wallet']) if row['wallet'] else default_wallet_id
+            if wallet_id is None:
+                reject(ImportRowError(row['line'], f'unknown wallet "{row["wallet"] or ""}"'))
+                continue
+            if row['category'] and (row['category'], row['type']) not in categories:
+                missing_categories.add((row['category'], row['type']))
+            accepted.append((row, wallet_id))
+
+        # 2. สร้างหมวดหมู่ใหม่ทั้งหมดของก้อนนี้ในคำสั่งเดียว
+        if missing_categories:
+            db.session.execute(Category.__table__.insert(), [
+                {'category_name': name, 'type': tx_type, 'user_id': user_id}
+                for name, tx_type in missing_categories
+            ])
+            new_category_ids = []
+            for category_id, name, tx_type in db.session.query(
+                    Category.category_id, Category.category_name, Category.type) \
+                    .filter(Category.user_id == user_id) \
+                    .filter(Category.category_name.in_({name for name, _ in missing_categories})):
+                if (name, tx_type) in missing_categories:
+                    new_category_ids.append(category_id)
+                categories[(name, tx_type)] = category_id
+            record_sync_changes(db.session.connection(), user_id,
+                                [('category', category_id, False) for category_id in new_category_ids])
+
+        # 3. INSERT ทั้งก้อน + อัปเดตตารางสรุปครั้งเดียวต่อก้อน
+        values = [{
+            'description': row['description'],
+            'amount': row['amount'],
+            'date': row['date'],
+            'type': row['type'],
+            'wallet_id': wallet_id,
+            'category_id': categories.get((row['category'], row['type'])) if row['category'] else None,
+        } for row, wallet_id in accepted]
+
+        if values:
+            # INSERT แบบ bulk ไม่ผ่าน event ของ Session -> บันทึก sync_changes เอง
+            # sort_by_parameter_order -> transaction_id เรียงตาม values (audit_log จับคู่ id กับแถวได้ถูก)
+            new_ids = db.session.execute(
+                Transaction.__table__.insert().returning(Transaction.__table__.c.transaction_id,
+                                                         sort_by_parameter_order=True), values
+            ).scalars().all()
+            record_sync_changes(db.session.connection(), user_id,
+                                [('transaction', transaction_id, False) for transaction_id in new_ids])
+            apply_bulk_transaction_effects(added=values)
+        db.session.commit()
+
+        result['imported'] += len(values)
+        if progress:
+            progress(result['imported'], result['error_count'])
+
+    # หมวดหมู่ใหม่อาจถูกสร้างระหว่างนำเข้า
+    bump_cache_version(user_id, 'summary', 'refdata')
+    return result
+
+
+def open_import_rows(stream, file_format):
+    # stream ต้องเป็นไฟล์แบบ text
+    if file_format == 'ofx':
+        return iter_ofx_rows(stream)
+    return iter_csv_rows(stream)
+
+
+@bp.route("/import", methods=['GET', 'POST'])
+@login_required
+def import_file():
+    user_wallets = user_refdata(current_user.user_id)['wallets']
+
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        wallet_id = request.form.get('wallet_id', type=int)
+        if not upload or not upload.filename:
+            flash('กรุณาเลือกไฟล์', 'danger')
+            return redirect(url_for('transactions.import_file'))
+
+        file_format = 'ofx' if upload.filename.lower().endswith(('.ofx', '.qfx')) else 'csv'
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            result = import_transactions(current_user.user_id, open_import_rows(stream, file_format), wallet_id)
+        except ImportRowError as e:
+            flash(f'อ่านไฟล์ไม่ได้: {e}', 'danger')
+            return redirect(url_for('transactions.import_file'))
+        except ValueError:
+            flash('คุณไม่มีสิทธิ์นำเข้าข้อมูลในกระเป๋านี้', 'danger')
+            return redirect(url_for('transactions.import_file'))
+
+        flash(f'นำเข้าสำเร็จ {result["imported"]} รายการ', 'success')
+        if result['error_count']:
+            flash(f'ข้ามไป {result["error_count"]} รายการที่ข้อมูลไม่ถูกต้อง เช่น: ' +
+                  '; '.join(result['errors'][:5]), 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    return render_template('import.html', user_wallets=user_wallets)
+
+
+@bp.cli.command('import-transactions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--username', required=True, help='ผู้ใช้เจ้าของข้อมูล')
+@click.option('--wallet', 'wallet_name', default=None, help='กระเป๋าสำหรับแถวที่ไม่ได้ระบุคอลัมน์ wallet')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ofx']), default=None)
+@click.option('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+def import_transactions_command(path, username, wallet_name, file_format, batch_size):
+    """นำเข้าธุรกรรมจากไฟล์ CSV/OFX (ไฟล์ใหญ่ ๆ ใช้คำสั่งนี้แทนหน้าเว็บ)"""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'User "{username}" not found')
+
+    wallet_id = None
+    if wallet_name:
+        wallet = Wallet.query.filter_by(user_id=user.user_id, wallet_name=wallet_name).first()
+        if wallet is None:
+            raise click.ClickException(f'Wallet "{wallet_name}" not found')
+        wallet_id = wallet.wallet_id
+
+    file_format = file_format or ('ofx' if path.lower().endswith(('.ofx', '.qfx')) else 'csv')
+    started = time.perf_counter()
+
+    def progress(imported, errors):
+        click.echo(f'  {imported:,} imported, {errors:,} skipped '
+                   f'({imported / max(time.perf_counter() - started, 1e-9):,.0f} rows/s)')
+
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as stream:
+        try:
+            result = import_transactions(user.user_id, open_import_rows(stream, file_format), wallet_id,
+                                         batch_size=batch_size, progress=progress)
+        except ImportRowError as e:
+            raise click.ClickException(str(e))
+
+    for error in result['errors'][:20]:
+        click.echo(f'  skipped {error}')
+    click.echo(f'Imported {result["imported"]:,} transactions in {time.perf_counter() - started:.1f}s '
+               f'({result["error_count"]:,} skipped).')
+
+###############################recurring################################################
+
+@bp.route("/recurring", methods=['GET', 'POST'])
+@login_required
+def recurring_rules():
+    refdata = user_refdata(current_user.user_id)
+
+    if request.method == 'POST':
+        form = request.form
+        wallet_id = form.get('wallet_id', type=int)
+        category_id = form.get('category_id', type=int)
+        category_types = owned_category_types(current_user.user_id)
+        try:
+            if wallet_id not in owned_wallet_ids(current_user.user_id):
+                raise ValueError('unknown wallet')
+            if category_id is not None and category_types.get(category_id) != form.get('type'):
+                raise ValueError('unknown category')
+            if form.get('type') not in ('income', 'expense'):
+                raise ValueError('type must be income or expense')
+            amount = Decimal(form.get('amount', ''))
+            if not amount.is_finite() or amount <= 0:
+                raise ValueError('amount must be positive')
+            start_date = datetime.strptime(form.get('start_date', ''), '%Y-%m-%d').date()
+            end_date = datetime.strptime(form['end_date'], '%Y-%m-%d').date() if form.get('end_date') else None
+            frequency = form.get('frequency')
+            interval = form.get('interval', 1, type=int)
+            rrule_text = form.get('rrule', '').strip() or None
+            validate_rule(frequency, interval, rrule_text, start_date, end_date)
+            next_run = first_occurrence(frequency, interval, rrule_text, start_date, end_date)
+            if next_run is None:
+                raise ValueError('rule never occurs')
+        except (ArithmeticError, RuntimeError, ValueError) as e:
+            flash(f'ข้อมูลไม่ถูกต้อง: {e}', 'danger')
+            return redirect(url_for('transactions.recurring_rules'))
+
+        rule = RecurringRule(user_id=current_user.user_id, wallet_id=wallet_id, category_id=category_id,
+                             description=form.get('description'), amount=amount, type=form.get('type'),
+                             frequency=frequency, interval=interval, rrule=rrule_text,
+                             start_date=start_date, end_date=end_date, next_run=next_run)
+        db.session.add(rule)
+        db.session.commit()
+
+        # ถ้าเริ่มในอดีต/วันนี้ สร้างธุรกรรมที่ถึงกำหนดแล้วให้เลย
+        result = materialize_recurring_rules(rule_ids=[rule.rule_id])
+        flash(f'สร้างรายการประจำสำเร็จ (สร้างธุรกรรมที่ถึงกำหนดแล้ว {result["transactions"]} รายการ)', 'success')
+        return redirect(url_for('transactions.recurring_rules'))
+
+    rules = RecurringRule.query.filter_by(user_id=current_user.user_id) \
+        .order_by(RecurringRule.active.desc(), RecurringRule.next_run).all()
+    return render_template('recurring.html',
+                           rules=rules,
+                           user_wallets=refdata['wallets'],
+                           categories=refdata['categories'],
+                           frequencies=FREQUENCIES,
+                           today_date=datetime.now().strftime('%Y-%m-%d'))
+
+
+@bp.route("/delete_recurring/<int:rule_id>", methods=['POST'])
+@login_required
+def delete_recurring_rule(rule_id):
+    # ลบแค่กฎ ธุรกรรมที่สร้างไปแล้วยังอยู่
+    rule = RecurringRule.query.filter_by(rule_id=rule_id, user_id=current_user.user_id).first_or_404()
+    db.session.delete(rule)
+    db.session.commit()
+    flash('ลบรายการประจำเรียบร้อยแล้ว (ธุรกรรมที่สร้างไปแล้วจะไม่ถูกลบ)', 'success')
+    return redirect(url_for('transactions.recurring_rules'))
@@ -0,0 +1,130 @@
+# --- Blueprint 'wallets': กระเป๋าเงิน (เพิ่ม / ลบ / แก้ไข / หน้ารายละเอียด) ---
+# (ใหม่!) ย้ายออกมาจาก app.py ลงทะเบียนใน blueprints/__init__.py (ชื่อ endpoint = 'wallets.<ชื่อฟังก์ชัน>')
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from app import MonthlyRollup, RecurringRule, Transaction, Wallet, WalletBalance, aggregate_totals, \
+    bump_cache_version, db, fetch_transaction_page, read_replica, rebuild_budget_usage, \
+    transaction_listing_query
+from rates import normalize_currency
+
+bp = Blueprint('wallets', __name__)
+
+###################################wallet#####################################################
+
+@bp.route("/add_wallet", methods=['POST'])
+@login_required # ต้องล็อกอินก่อนถึงจะสร้างได้
+def add_wallet():
+    # 1. ดึงชื่อกระเป๋าจากฟอร์ม
+    wallet_name = request.form.get('wallet_name')
+    # (ใหม่!) สกุลเงินของกระเป๋า (เปลี่ยนภายหลังไม่ได้ เพราะยอดเดิมทั้งหมดเป็นสกุลเงินนี้)
+    try:
+        currency = normalize_currency(request.form.get('currency') or current_app.config['REPORTING_CURRENCY'])
+    except ValueError:
+        flash('รหัสสกุลเงินไม่ถูกต้อง (ใช้ 3 ตัวอักษร เช่น THB, USD)', 'danger')
+        return redirect(url_for('transactions.dashboard'))
+
+    if wallet_name:
+        # 2. สร้าง Object ใหม่
+        new_wallet = Wallet(wallet_name=wallet_name, user_id=current_user.user_id, currency=currency)
+
+        # 3. บันทึกลงฐานข้อมูล (พร้อมแถวยอดสะสมเริ่มต้นที่ 0)
+        db.session.add(new_wallet)
+        db.session.flush()
+        db.session.add(WalletBalance(wallet_id=new_wallet.wallet_id, user_id=current_user.user_id,
+                                     income_total=0, expense_total=0, balance=0))
+        db.session.commit()
+        bump_cache_version(current_user.user_id, 'refdata')
+        flash('สร้างกระเป๋าเงินใหม่สำเร็จ!', 'success')
+
+    # 4. กลับไปหน้า Dashboard (ซึ่งจะโหลดข้อมูลใหม่)
+    return redirect(url_for('transactions.dashboard'))
+
+#################################delete_wallet###################################################
+
+@bp.route("/delete_wallet/<int:wallet_id>", methods=['POST'])
+@login_required
+def delete_wallet(wallet_id):
+    # 1. ค้นหากระเป๋า และตรวจสอบว่าเป็นของ User ที่ล็อกอินอยู่
+    wallet_to_delete = Wallet.query.filter_by(
+        wallet_id=wallet_id,
+        user_id=current_user.user_id
+    ).first_or_404()  # first_or_404 ปลอดภัยกว่า
+
+    # 2. (สำคัญ!) ฐานข้อมูลของเราตั้งค่า ON DELETE CASCADE
+    #    หมายความว่า "ถ้าลบกระเป๋า ให้ลบธุรกรรมทั้งหมดในกระเป๋านี้ด้วย"
+    #    แต่ SQLAlchemy จะพยายามตั้ง wallet_id ของธุรกรรมเป็น NULL ก่อน (ซึ่งทำไม่ได้)
+    #    และ SQLite ไม่เปิด Foreign Key เป็นค่าเริ่มต้น จึงลบธุรกรรมเองด้วยคำสั่งเดียว
+    #    audit_log เก็บค่าก่อนลบของทุกธุรกรรมที่ถูกลบไปด้วย (ดูส่วน audit ใน app.py)
+    Transaction.query.filter_by(wallet_id=wallet_id).delete()
+    RecurringRule.query.filter_by(wallet_id=wallet_id).delete()
+
+    # ลบแถวยอดสะสม/ยอดรายเดือนของกระเป๋านี้ไปพร้อมกัน
+    WalletBalance.query.filter_by(wallet_id=wallet_id).delete()
+    MonthlyRollup.query.filter_by(wallet_id=wallet_id).delete()
+    db.session.delete(wallet_to_delete)
+    # ธุรกรรมถูกลบแบบ bulk (ไม่ผ่าน apply_transaction_effects) -> คำนวณยอดใช้งบใหม่จากยอดรายเดือนที่เหลือ
+    db.session.flush()
+    rebuild_budget_usage(user_id=current_user.user_id)
+    db.session.commit()
+    bump_cache_version(current_user.user_id, 'summary', 'refdata', 'analytics')
+
+    flash(f'ลบกระเป๋าเงิน "{wallet_to_delete.wallet_name}" เรียบร้อยแล้ว (ธุรกรรมทั้งหมดในกระเป๋านี้ถูกลบด้วย)',
+          'success')
+    return redirect(url_for('transactions.dashboard'))
+
+#################################edit_wallet###################################################
+
+@bp.route("/edit_wallet/<int:wallet_id>", methods=['GET', 'POST'])
+@login_required
+def edit_wallet(wallet_id):
+    # 1. ค้นหากระเป๋า และตรวจสอบเจ้าของ
+    wallet_to_edit = Wallet.query.filter_by(
+        wallet_id=wallet_id,
+        user_id=current_user.user_id
+    ).first_or_404()
+
+    # 2. ถ้าเป็นการ POST (กดบันทึก)
+    if request.method == 'POST':
+        new_name = request.form.get('wallet_name')
+        if new_name:
+            wallet_to_edit.wallet_name = new_name
+            db.session.commit()
+            bump_cache_version(current_user.user_id, 'refdata')
+            flash('อัปเดตชื่อกระเป๋าเงินเรียบร้อยแล้ว', 'success')
+            return redirect(url_for('transactions.dashboard'))
+
+    # 3. ถ้าเป็นการ GET (เปิดหน้าครั้งแรก)
+    #    ให้แสดงหน้า HTML สำหรับแก้ไข
+    return render_template('edit_form_template.html',
+                           item=wallet_to_edit,
+                           title="แก้ไขกระเป๋าเงิน",
+                           form_url=url_for('wallets.edit_wallet', wallet_id=wallet_id),
+                           label="ชื่อกระเป๋าเงินใหม่:",
+                           value=wallet_to_edit.wallet_name,
+                           name_field="wallet_name")
+
+
+#####################################wallet_detail##########################################
+
+@bp.route("/wallet/<int:wallet_id>")
+@login_required
+@read_replica
+def wallet_detail(wallet_id):
+    # 1. ตรวจสอบความปลอดภัย: ดึงกระเป๋าที่ ID ตรงกัน "และ" เป็นของ user ที่ล็อกอินอยู่
+    wallet = Wallet.query.filter_by(wallet_id=wallet_id, user_id=current_user.user_id).first_or_404()
+
+    # 2. ดึงธุรกรรมเฉพาะของกระเป๋านี้ (หน้าแรก ที่เหลือโหลดเพิ่มตอนเลื่อนลง)
+    transactions, next_cursor = fetch_transaction_page(
+        transaction_listing_query().filter(Transaction.wallet_id == wallet_id))
+
+    # 3. คำนวณยอดคงเหลือเฉพาะของกระเป๋านี้ (รวมยอดด้วย SQL)
+    balance = aggregate_totals([wallet_id], user_id=current_user.user_id)['balance']
+
+    # 4. ส่งข้อมูลไปแสดงผลที่ template ใหม่
+    return render_template('wallet_detail.html',
+                           wallet=wallet,
+                           transactions=transactions,
+                           next_cursor=next_cursor,
+                           balance=balance)
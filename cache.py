@@ -0,0 +1,110 @@
+# --- ที่เก็บ Cache (ใช้ร่วมกันทั้งแอป) ---
+#
+# มี 2 แบบ (เลือกด้วย CACHE_BACKEND):
+#   - 'memory' : เก็บใน RAM ของ worker แต่ละตัว (LRU + TTL) ไม่ต้องติดตั้งอะไรเพิ่ม
+#   - 'redis'  : ใช้ Redis (หรือเซิร์ฟเวอร์อะไรก็ได้ที่คุยภาษา Redis ได้) ใช้ร่วมกันได้ทุก worker
+#
+# ทั้งสองแบบมีเมธอดเหมือนกัน: get / set / delete / incr
+# ค่าที่เก็บต้องแปลงเป็น JSON ได้ (dict, list, str, int, ...)
+#
+# หมายเหตุ: ค่าที่ได้จาก incr() (ใช้เป็น "เวอร์ชัน" ของข้อมูล) จะไม่หมดอายุและไม่ถูกไล่ออกจาก LRU
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisCache:
+    # client คืออะไรก็ได้ที่มีเมธอด get/set(ex=)/delete/incr แบบ redis-py
+    def __init__(self, client, prefix='expense-tracker:', ttl=300):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def get_counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+
+def create_cache(config):
+    # สร้าง Cache ตามค่าใน app.config
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = int(config.get('CACHE_TTL', 300))
+
+    if backend == 'memory':
+        return MemoryCache(maxsize=int(config.get('CACHE_MAXSIZE', 1024)), ttl=ttl)
+
+    if backend == 'redis':
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND=redis ต้องติดตั้งแพ็กเกจ redis ก่อน (pip install redis)')
+        client = redis.Redis.from_url(config['CACHE_REDIS_URL'])
+        return RedisCache(client, ttl=ttl)
+
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
@@ -0,0 +1,218 @@
+# --- ตั้งค่า Connection Pool / Engine ของฐานข้อมูล ---
+#
+# อ่านค่าจาก config.py (ถ้ามีตัวแปรชื่อเดียวกัน) หรือจาก Environment Variables:
+#   DB_POOL_SIZE              จำนวน connection ที่เปิดค้างไว้ต่อ worker (ค่าเริ่มต้น = จำนวน thread ของ gunicorn)
+#   DB_MAX_OVERFLOW           เปิดเพิ่มชั่วคราวได้อีกกี่ connection ตอนงานเยอะ
+#   DB_POOL_TIMEOUT           รอ connection ว่างได้นานสุดกี่วินาที (เกินนี้ = error)
+#   DB_POOL_RECYCLE           ปิดแล้วเปิดใหม่ถ้า connection อายุเกินกี่วินาที (กัน firewall/DB ตัดทิ้ง)
+#   DB_POOL_PRE_PING          ทดสอบ connection ก่อนใช้ (1/0)
+#   DB_STATEMENT_TIMEOUT_MS   เวลาสูงสุดของแต่ละคำสั่ง SQL (PostgreSQL) 0 = ไม่จำกัด
+#   DB_REPORT_TIMEOUT_MS      เวลาสูงสุดของ Query รายงาน (ใช้กับ statement_timeout() ด้านล่าง)
+#   DB_POOL_WAIT_WARN_MS      รอ connection นานเกินกี่ ms ให้เขียน log เตือน
+#   DB_MAX_CONNECTIONS        จำนวน connection สูงสุดที่ฐานข้อมูลรับได้ (ใช้เตือนถ้าตั้ง pool ใหญ่เกิน)
+#
+# จำนวน worker/thread ของ gunicorn อ่านจาก WEB_CONCURRENCY และ GUNICORN_THREADS
+#
+# ไฟล์นี้ไม่ import app.py
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+try:
+    import config as _local_config
+except ImportError:
+    _local_config = None
+
+
+def read_setting(name, default, cast=str):
+    # config.py มาก่อน แล้วค่อยดู Environment Variables
+    value = getattr(_local_config, name, None)
+    if value is None:
+        value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    if cast is bool:
+        return str(value).lower() in ('1', 'true', 'yes', 'on')
+    return cast(value)
+
+
+def server_concurrency():
+    # (จำนวน worker, จำนวน thread ต่อ worker) ตามที่ตั้งให้ gunicorn
+    return read_setting('WEB_CONCURRENCY', 1, int), read_setting('GUNICORN_THREADS', 1, int)
+
+
+########################################################################################
+
+class PoolStats:
+    # สถิติการยืม connection จาก pool (ต่อ worker)
+    def __init__(self, warn_after_ms=100):
+        self.warn_after = warn_after_ms / 1000.0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.slow_waits = 0
+        self.timeouts = 0
+        self.on_slow_wait = None  # callback(wait_seconds) เช่น เขียน log
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            slow = seconds >= self.warn_after
+            if slow:
+                self.slow_waits += 1
+        if slow and self.on_slow_wait:
+            self.on_slow_wait(seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_checkout(self, delta):
+        with self._lock:
+            self.checked_out += delta
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'slow_waits': self.slow_waits,
+                'timeouts': self.timeouts,
+            }
+        if isinstance(pool, QueuePool):
+            data.update(pool_size=pool.size(), overflow=pool.overflow(), idle=pool.checkedin())
+        return data
+
+
+pool_stats = PoolStats(read_setting('DB_POOL_WAIT_WARN_MS', 100, float))
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool ที่จับเวลาว่าแต่ละ request ต้อง "รอ" connection ว่างนานเท่าไร
+    # (ถ้าเวลารอเริ่มสูง = pool เล็กเกินไป / Query ช้า ก่อนที่ผู้ใช้จะเริ่มเห็นหน้าเว็บค้าง)
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record_timeout()
+            raise
+        pool_stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def _track_checkouts(engine):
+    event.listen(engine, 'checkout', lambda *args: pool_stats.record_checkout(1))
+    event.listen(engine, 'checkin', lambda *args: pool_stats.record_checkout(-1))
+
+
+########################################################################################
+
+def build_engine_options(database_uri):
+    # คืนค่า dict สำหรับ app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    if not database_uri:
+        return {}
+    url = make_url(database_uri)
+    backend = url.get_backend_name()
+
+    if backend == 'sqlite':
+        # SQLite ไม่มี server -> ไม่ต้องจัดขนาด pool แค่ตั้งเวลารอ lock ของไฟล์
+        options = {'connect_args': {'timeout': read_setting('DB_SQLITE_BUSY_TIMEOUT', 15, float)}}
+        if url.database and url.database != ':memory:':
+            options['poolclass'] = TimedQueuePool  # ไฟล์ SQLite ใช้ QueuePool อยู่แล้ว แค่เพิ่มการจับเวลา
+        return options
+
+    workers, threads = server_concurrency()
+    # 1 thread ใช้ 1 connection ต่อ request (+ งานเบื้องหลังเล็กน้อย)
+    pool_size = read_setting('DB_POOL_SIZE', max(threads, 2), int)
+    max_overflow = read_setting('DB_MAX_OVERFLOW', max(2, threads // 2), int)
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': read_setting('DB_POOL_TIMEOUT', 10, float),
+        'pool_recycle': read_setting('DB_POOL_RECYCLE', 1800, int),
+        'pool_pre_ping': read_setting('DB_POOL_PRE_PING', True, bool),
+    }
+
+    statement_timeout_ms = read_setting('DB_STATEMENT_TIMEOUT_MS', 30000, int)
+    if backend == 'postgresql' and statement_timeout_ms:
+        # ตั้งตั้งแต่ตอนเปิด connection (ไม่ต้องยิง SET ทุก request)
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout_ms}'}
+
+    return options
+
+
+def check_connection_budget(options, warn):
+    # เตือนถ้า (worker x connection ต่อ worker) เกินที่ฐานข้อมูลรับได้
+    limit = read_setting('DB_MAX_CONNECTIONS', 0, int)
+    if not limit or 'pool_size' not in options:
+        return
+    workers, _ = server_concurrency()
+    needed = workers * (options['pool_size'] + options['max_overflow'])
+    if needed > limit:
+        warn(f'DB pool may open up to {needed} connections ({workers} workers x '
+             f'{options["pool_size"]}+{options["max_overflow"]}) but DB_MAX_CONNECTIONS is {limit}')
+
+
+def instrument_engine(engine):
+    if isinstance(engine.pool, QueuePool):
+        _track_checkouts(engine)
+
+
+########################################################################################
+
+REPORT_TIMEOUT_MS = read_setting('DB_REPORT_TIMEOUT_MS', 5000, int)
+
+
+@contextmanager
+def statement_timeout(session, milliseconds=None):
+    # จำกัดเวลาของ Query ที่หนัก ๆ (เช่น รายงาน) ภายในบล็อก with นี้
+    #   PostgreSQL -> SET LOCAL statement_timeout (มีผลถึงจบ Transaction ปัจจุบัน)
+    #   SQLite     -> progress handler ยกเลิกคำสั่งที่เกินเวลา
+    milliseconds = REPORT_TIMEOUT_MS if milliseconds is None else milliseconds
+    if not milliseconds:
+        yield
+        return
+
+    connection = session.connection()
+    backend = connection.dialect.name
+    if backend == 'postgresql':
+        connection.execute(text(f'SET LOCAL statement_timeout = {int(milliseconds)}'))
+        yield
+        # กลับไปใช้ค่าของ connection (ถ้าบล็อกพังด้วย error ก็ไม่ต้องคืนค่า เพราะ Transaction จะถูก rollback)
+        connection.execute(text('SET LOCAL statement_timeout = DEFAULT'))
+        return
+
+    if backend == 'sqlite':
+        raw = connection.connection.driver_connection
+        deadline = time.monotonic() + milliseconds / 1000.0
+        # คืนค่า non-zero = ยกเลิกคำสั่ง (sqlite3 จะ raise OperationalError: interrupted)
+        raw.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        try:
+            yield
+        finally:
+            try:
+                raw.set_progress_handler(None, 0)
+            except sqlite3.ProgrammingError:
+                pass
+        return
+
+    yield
@@ -0,0 +1,140 @@
+# --- ตัวเขียนไฟล์ส่งออก (CSV / XLSX) แบบ Streaming ---
+#
+# ทั้งสองฟังก์ชันรับ rows (iterable ของ tuple) แล้วคืนค่าเป็น generator ของ bytes
+# เพื่อส่งให้ Flask ทยอยส่งออกไปทีละก้อน (ไม่ต้องสร้างไฟล์ทั้งไฟล์ใน RAM ก่อน)
+#
+# XLSX คือไฟล์ ZIP ที่มี XML อยู่ข้างใน -- zipfile ของ Python เขียนลง stream ที่ seek ไม่ได้ได้
+# เราจึงเขียน sheet ทีละแถวแล้วดึง bytes ที่บีบอัดแล้วออกมาส่งต่อได้ทันที
+#
+# ไฟล์นี้ไม่ import app.py
+
+import csv
+import io
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+# ส่งข้อมูลออกทุก ๆ กี่แถว
+FLUSH_EVERY = 500
+
+# ตัวอักษรที่ XML ไม่ยอมให้มี (เช่น \x00-\x08)
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def iter_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM ช่วยให้ Excel อ่านภาษาไทยใน CSV ได้ถูกต้อง
+    yield '\ufeff'.encode('utf-8')
+    writer.writerow(header)
+
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % FLUSH_EVERY == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+########################################################################################
+
+class _DrainableStream(io.RawIOBase):
+    # ที่พักข้อมูลให้ zipfile เขียนลงไป แล้วเราค่อยดึงออกมาทีละก้อน (seek ไม่ได้)
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _workbook(sheet_name):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _cell(value):
+    # ตัวเลขเขียนเป็น number, อย่างอื่นเขียนเป็นข้อความ (inline string ไม่ต้องมี sharedStrings)
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = _INVALID_XML_CHARS.sub('', str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _row(values):
+    return '<row>' + ''.join(_cell(v) for v in values) + '</row>'
+
+
+def iter_xlsx(header, rows, sheet_name='Sheet1'):
+    stream = _DrainableStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _workbook(sheet_name))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield stream.drain()
+
+        # force_zip64 เพราะยังไม่รู้ขนาดไฟล์ล่วงหน้า (อาจเกิน 4GB ได้ถ้าข้อมูลเยอะมาก)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetData>' + _row(header)).encode('utf-8'))
+            for i, row in enumerate(rows, 1):
+                sheet.write(_row(row).encode('utf-8'))
+                if i % FLUSH_EVERY == 0:
+                    data = stream.drain()
+                    if data:
+                        yield data
+            sheet.write(b'</sheetData></worksheet>')
+
+    yield stream.drain()
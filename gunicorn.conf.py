@@ -0,0 +1,31 @@
+# --- ตั้งค่า gunicorn ---
+#
+# วิธีรัน:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Environment Variables:
+#   WEB_CONCURRENCY    จำนวน worker (dbconfig.py ใช้ค่านี้คำนวณขนาด Connection Pool ด้วย)
+#   GUNICORN_THREADS   จำนวน thread ต่อ worker
+#   GUNICORN_PRELOAD   1 = สร้างแอปครั้งเดียวใน master แล้ว fork (ค่าเริ่มต้น) / 0 = ทุก worker import app เอง
+#   PORT               พอร์ตที่รับ request (Render ตั้งให้เอง)
+#
+# --preload: import + create_app() ทำใน master ครั้งเดียว worker ใหม่ (รวมถึงตอน scale หรือ worker ตายแล้วเกิดใหม่)
+# แค่ fork ไม่ต้อง import ใหม่ ข้อควรระวังคือ connection ฐานข้อมูลห้ามใช้ข้าม process
+# -> post_fork เรียก app.after_fork() ให้ worker ทิ้ง pool ที่ได้มาจาก master แล้วเปิด connection ของตัวเอง
+# ข้อเสีย: แก้โค้ดแล้วต้อง restart master (HUP ไม่โหลดโค้ดใหม่)
+
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() in ('1', 'true', 'yes', 'on')
+
+
+def post_fork(server, worker):
+    # แอปที่ preload ไว้อยู่ใน wsgi.app (ไม่ได้ preload = worker ยังไม่ได้ import -> ไม่มีอะไรต้องทิ้ง)
+    wsgi = sys.modules.get('wsgi')
+    if wsgi is not None:
+        from app import after_fork
+        after_fork(wsgi.app)
@@ -0,0 +1,158 @@
+# --- ตัวอ่านไฟล์นำเข้าธุรกรรม (CSV / OFX) ---
+#
+# อ่านไฟล์ทีละส่วน (ไม่โหลดทั้งไฟล์เข้า RAM) แล้วคืนค่าเป็น dict ทีละแถว:
+#   {'line': เลขบรรทัด, 'date': date, 'description': str, 'amount': Decimal (เป็นบวกเสมอ),
+#    'type': 'income'/'expense', 'category': ชื่อหมวดหมู่หรือ None, 'wallet': ชื่อกระเป๋าหรือ None}
+#
+# CSV ต้องมีหัวตาราง (header) อย่างน้อย: date, amount
+#   คอลัมน์อื่นที่รองรับ: description, type, category, wallet
+#   ถ้าไม่มีคอลัมน์ type -> ยอดติดลบคือรายจ่าย ยอดบวกคือรายรับ
+#
+# แถวที่อ่านไม่ได้จะถูกส่งออกมาเป็น ImportRowError (ไม่ raise) เพื่อให้นำเข้าแถวอื่นต่อได้
+#
+# ไฟล์นี้ไม่ import app.py (ทดสอบ/ใช้ซ้ำได้ง่าย)
+
+import csv
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d')
+# ยอดใหญ่สุดที่คอลัมน์ transactions.amount (Numeric(10, 2)) เก็บได้
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class ImportRowError(ValueError):
+    # แถวที่อ่านไม่ได้ (เก็บเลขบรรทัดไว้แจ้งผู้ใช้)
+    def __init__(self, line, message):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def parse_date(value):
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f'invalid date "{value}"')
+
+
+def parse_ofx_date(value):
+    # OFX ใช้รูปแบบ YYYYMMDD[HHMMSS[.XXX]][[TZ]] เราใช้แค่ส่วนวันที่
+    try:
+        return datetime.strptime((value or '')[:8], '%Y%m%d').date()
+    except ValueError:
+        raise ValueError(f'invalid date "{value}"')
+
+
+def parse_amount(value):
+    # คืนค่า Decimal ปัดเป็น 2 ตำแหน่ง (ยังมีเครื่องหมาย) ไม่รับ nan/inf และยอดที่ใหญ่เกินคอลัมน์ amount
+    try:
+        amount = Decimal((value or '').strip().replace(',', ''))
+        if not amount.is_finite():
+            raise ValueError()
+        amount = amount.quantize(Decimal('0.01'))
+    except (ArithmeticError, ValueError):
+        raise ValueError(f'invalid amount "{value}"')
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f'amount "{value}" is too large')
+    return amount
+
+
+def _normalise(line, date, amount, tx_type, description, category, wallet):
+    # รวมกติกาที่ใช้ร่วมกันระหว่าง CSV และ OFX
+    if tx_type:
+        tx_type = tx_type.strip().lower()
+        if tx_type not in ('income', 'expense'):
+            raise ImportRowError(line, f'invalid type "{tx_type}"')
+    else:
+        tx_type = 'expense' if amount < 0 else 'income'
+
+    amount = abs(amount).quantize(Decimal('0.01'))
+    if amount == 0:
+        raise ImportRowError(line, 'amount is zero')
+
+    return {
+        'line': line,
+        'date': date,
+        'description': (description or '').strip() or None,
+        'amount': amount,
+        'type': tx_type,
+        'category': (category or '').strip() or None,
+        'wallet': (wallet or '').strip() or None,
+    }
+
+
+def iter_csv_rows(stream):
+    # stream คือไฟล์แบบ text (เช่น io.TextIOWrapper ของไฟล์ที่อัปโหลด)
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames or not {'date', 'amount'} <= {f.strip().lower() for f in reader.fieldnames}:
+        raise ImportRowError(1, 'CSV header must contain at least "date" and "amount"')
+
+    for row in reader:
+        row = {(k or '').strip().lower(): v for k, v in row.items()}
+        line = reader.line_num
+        try:
+            date = parse_date(row.get('date'))
+            amount = parse_amount(row.get('amount'))
+        except ValueError as e:
+            yield ImportRowError(line, str(e))
+            continue
+        try:
+            yield _normalise(line, date, amount, row.get('type'), row.get('description'),
+                             row.get('category'), row.get('wallet'))
+        except ImportRowError as e:
+            yield e
+
+
+def _iter_ofx_tags(stream, chunk_size=65536):
+    # แยก OFX (แบบ SGML หรือ XML) เป็น (TAG, ค่า) ทีละคู่ โดยอ่านไฟล์ทีละก้อน
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        parts = buffer.split('<')
+        # ส่วนสุดท้ายอาจยังอ่านไม่จบ เก็บไว้รอรอบถัดไป (ยกเว้นอ่านจบไฟล์แล้ว)
+        buffer = parts.pop() if chunk else ''
+        for part in parts + ([buffer] if not chunk else []):
+            if '>' not in part:
+                continue
+            tag, _, value = part.partition('>')
+            yield tag.strip().upper(), value.strip()
+        if not chunk:
+            return
+
+
+def iter_ofx_rows(stream):
+    # อ่านรายการ <STMTTRN> จากไฟล์ OFX ที่ธนาคาร export ออกมา
+    current = None
+    count = 0
+    for tag, value in _iter_ofx_tags(stream):
+        if tag == 'STMTTRN':
+            current = {}
+        elif tag == '/STMTTRN' and current is not None:
+            count += 1
+            try:
+                date = parse_ofx_date(current.get('DTPOSTED'))
+                amount = parse_amount(current.get('TRNAMT'))
+                yield _normalise(count, date, amount, None,
+                                 current.get('NAME') or current.get('MEMO'), None, None)
+            except ImportRowError as e:
+                yield e
+            except ValueError as e:
+                yield ImportRowError(count, str(e))
+            current = None
+        elif current is not None and not tag.startswith('/'):
+            current[tag] = value
+
+
+def chunked(iterable, size):
+    # แบ่งเป็นก้อน ๆ ละ size รายการ
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,140 @@
+# --- ตัวเก็บสถิติ (Metrics) แบบ Prometheus ---
+#
+# มี 3 แบบ:
+#   - Counter   : นับเพิ่มอย่างเดียว (เช่น จำนวน request)
+#   - Histogram : เก็บการกระจายของค่า (เช่น เวลาตอบ) เป็นช่วง ๆ (bucket) + ผลรวม + จำนวน
+#   - Gauge     : ค่า ณ ตอนนี้ อ่านจากฟังก์ชันตอนถูกเรียกดู (เช่น cache hit ratio)
+#
+# render() แปลงทั้งหมดเป็น text format ที่ Prometheus อ่านได้
+# ค่าเก็บใน RAM ของแต่ละ worker (Prometheus ต้อง scrape ทุก worker หรือดูแยกตาม pid)
+#
+# ไฟล์นี้ไม่ import app.py
+
+import math
+import threading
+
+# ช่วงเวลา (วินาที) ของ Histogram เวลาตอบ
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# ช่วงของจำนวน Query ต่อ request
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_text(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}  # labels -> [counts ต่อ bucket, ผลรวม, จำนวน]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            item = self._values.get(labels)
+            if item is None:
+                item = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    item[0][i] += 1
+                    break
+            item[1] += value
+            item[2] += 1
+
+    def count(self, *labels):
+        item = self._values.get(labels)
+        return item[2] if item else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = _label_text(self.labelnames + ('le',), labels + (_number(bound),))
+                    lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+                label_text = _label_text(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{label_text} {_number(total)}')
+                lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class Gauge:
+    # fn คืนค่าเป็นตัวเลข หรือ dict {(label, ...): ตัวเลข}
+    def __init__(self, name, documentation, fn, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{_label_text(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,514 @@
+# --- ระบบ Migration ของฐานข้อมูล (Schema Migrations) ---
+#
+# เก็บ "เวอร์ชัน" ของโครงสร้างฐานข้อมูลไว้ในตาราง schema_migrations
+# แล้วรันเฉพาะ migration ที่ยังไม่เคยรัน (เรียงตามหมายเลข)
+#
+# วิธีใช้ (ผ่าน Flask CLI ใน app.py):
+#   flask db upgrade                          -> อัปเกรดฐานข้อมูลที่ตั้งค่าไว้
+#   flask db upgrade --sql --dialect sqlite   -> พิมพ์ SQL ออกมาเฉย ๆ (ไม่ต้องต่อฐานข้อมูล)
+#   flask db current                          -> ดูว่าฐานข้อมูลอยู่เวอร์ชันไหน
+#
+# ไฟล์นี้ไม่ import app.py เพื่อให้ใช้ได้ทั้งจาก CLI และจากสคริปต์ benchmark
+
+import textwrap
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+# statements คือ list ของ SQL
+#   - ถ้าเป็น string  -> ใช้ได้ทั้ง SQLite และ PostgreSQL
+#   - ถ้าเป็น dict    -> เลือกตาม dialect เช่น {'sqlite': '...', 'postgresql': '...'}
+#                        (ค่าเป็น None = dialect นั้นไม่ต้องรันคำสั่งนี้)
+Migration = namedtuple('Migration', ['version', 'name', 'statements'])
+
+SUPPORTED_DIALECTS = ('sqlite', 'postgresql')
+
+########################################################################################
+
+MIGRATIONS = [
+    # 1. ตารางหลักของแอป (IF NOT EXISTS -> ฐานข้อมูลเดิมที่สร้างไว้แล้วจะไม่ถูกแตะ)
+    Migration(1, 'baseline', [
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INTEGER PRIMARY KEY,
+                    username VARCHAR(50) NOT NULL UNIQUE,
+                    password_hash TEXT NOT NULL
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id SERIAL PRIMARY KEY,
+                    username VARCHAR(50) NOT NULL UNIQUE,
+                    password_hash TEXT NOT NULL
+                )""",
+        },
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS wallets (
+                    wallet_id INTEGER PRIMARY KEY,
+                    wallet_name VARCHAR(100) NOT NULL,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id)
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS wallets (
+                    wallet_id SERIAL PRIMARY KEY,
+                    wallet_name VARCHAR(100) NOT NULL,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id)
+                )""",
+        },
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS categories (
+                    category_id INTEGER PRIMARY KEY,
+                    category_name VARCHAR(100) NOT NULL,
+                    type VARCHAR(10) NOT NULL,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id)
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS categories (
+                    category_id SERIAL PRIMARY KEY,
+                    category_name VARCHAR(100) NOT NULL,
+                    type VARCHAR(10) NOT NULL,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id)
+                )""",
+        },
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS transactions (
+                    transaction_id INTEGER PRIMARY KEY,
+                    description TEXT,
+                    amount NUMERIC(10, 2) NOT NULL,
+                    date DATE NOT NULL,
+                    type VARCHAR(10) NOT NULL,
+                    wallet_id INTEGER NOT NULL REFERENCES wallets (wallet_id) ON DELETE CASCADE,
+                    category_id INTEGER REFERENCES categories (category_id) ON DELETE SET NULL
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS transactions (
+                    transaction_id SERIAL PRIMARY KEY,
+                    description TEXT,
+                    amount NUMERIC(10, 2) NOT NULL,
+                    date DATE NOT NULL,
+                    type VARCHAR(10) NOT NULL,
+                    wallet_id INTEGER NOT NULL REFERENCES wallets (wallet_id) ON DELETE CASCADE,
+                    category_id INTEGER REFERENCES categories (category_id) ON DELETE SET NULL
+                )""",
+        },
+    ]),
+
+    # 2. ยอดสะสมของแต่ละกระเป๋า (ดู WalletBalance ใน app.py)
+    #    กระเป๋าเดิมทุกใบได้ยอดจากธุรกรรมที่มีอยู่ทันที (คิดเป็นสตางค์แบบเดียวกับ "flask balances rebuild")
+    Migration(2, 'wallet_balances', [
+        """
+        CREATE TABLE IF NOT EXISTS wallet_balances (
+            wallet_id INTEGER PRIMARY KEY REFERENCES wallets (wallet_id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL REFERENCES users (user_id),
+            income_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            expense_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            balance NUMERIC(14, 2) NOT NULL DEFAULT 0
+        )""",
+        """
+        INSERT INTO wallet_balances (wallet_id, user_id, income_total, expense_total, balance)
+        SELECT wallet_id, user_id, income / 100.0, expense / 100.0, (income - expense) / 100.0
+        FROM (
+            SELECT w.wallet_id, w.user_id,
+                   COALESCE(SUM(CASE WHEN t.type = 'income' THEN ROUND(t.amount * 100) END), 0) AS income,
+                   COALESCE(SUM(CASE WHEN t.type = 'expense' THEN ROUND(t.amount * 100) END), 0) AS expense
+            FROM wallets w LEFT JOIN transactions t ON t.wallet_id = w.wallet_id
+            WHERE NOT EXISTS (SELECT 1 FROM wallet_balances b WHERE b.wallet_id = w.wallet_id)
+            GROUP BY w.wallet_id, w.user_id
+        ) AS existing_totals""",
+    ]),
+
+    # 3. Index สำหรับ Query ที่ใช้บ่อย (dashboard, wallet_detail, category_summary)
+    Migration(3, 'hot_path_indexes', [
+        # รายการธุรกรรม: WHERE wallet_id IN (...) AND date BETWEEN ... ORDER BY date DESC, transaction_id DESC
+        "CREATE INDEX IF NOT EXISTS ix_transactions_wallet_date "
+        "ON transactions (wallet_id, date, transaction_id)",
+        # รวมยอดตามประเภท / สรุปรายจ่ายตามหมวดหมู่: + AND type = ...
+        "CREATE INDEX IF NOT EXISTS ix_transactions_wallet_type_date "
+        "ON transactions (wallet_id, type, date)",
+        # ลบหมวดหมู่ (ON DELETE SET NULL) จะได้ไม่ต้องสแกนทั้งตาราง
+        "CREATE INDEX IF NOT EXISTS ix_transactions_category "
+        "ON transactions (category_id)",
+        "CREATE INDEX IF NOT EXISTS ix_wallets_user "
+        "ON wallets (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_categories_user_type "
+        "ON categories (user_id, type)",
+    ]),
+
+    # 4. ยอดรวมรายเดือน (ดู MonthlyRollup ใน app.py)
+    #    ธุรกรรมเดิมทั้งหมดถูกรวมเป็นยอดรายเดือนทันที (แบบเดียวกับ "flask rollups rebuild") รายงานย้อนหลังจึงครบตั้งแต่แรก
+    Migration(4, 'monthly_rollups', [
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS monthly_rollups (
+                    rollup_id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id),
+                    wallet_id INTEGER NOT NULL REFERENCES wallets (wallet_id) ON DELETE CASCADE,
+                    category_id INTEGER REFERENCES categories (category_id),
+                    type VARCHAR(10) NOT NULL,
+                    year INTEGER NOT NULL,
+                    month INTEGER NOT NULL,
+                    total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                    tx_count INTEGER NOT NULL DEFAULT 0
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS monthly_rollups (
+                    rollup_id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id),
+                    wallet_id INTEGER NOT NULL REFERENCES wallets (wallet_id) ON DELETE CASCADE,
+                    category_id INTEGER REFERENCES categories (category_id),
+                    type VARCHAR(10) NOT NULL,
+                    year INTEGER NOT NULL,
+                    month INTEGER NOT NULL,
+                    total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                    tx_count INTEGER NOT NULL DEFAULT 0
+                )""",
+        },
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_monthly_rollups_key "
+        "ON monthly_rollups (wallet_id, COALESCE(category_id, 0), type, year, month)",
+        "CREATE INDEX IF NOT EXISTS ix_monthly_rollups_user_period "
+        "ON monthly_rollups (user_id, year, month)",
+        {
+            'sqlite': """
+                INSERT INTO monthly_rollups (user_id, wallet_id, category_id, type, year, month, total, tx_count)
+                SELECT w.user_id, t.wallet_id, t.category_id, t.type,
+                       CAST(strftime('%Y', t.date) AS INTEGER), CAST(strftime('%m', t.date) AS INTEGER),
+                       SUM(ROUND(t.amount * 100)) / 100.0, COUNT(*)
+                FROM transactions t JOIN wallets w ON w.wallet_id = t.wallet_id
+                WHERE NOT EXISTS (SELECT 1 FROM monthly_rollups)
+                GROUP BY w.user_id, t.wallet_id, t.category_id, t.type,
+                         strftime('%Y', t.date), strftime('%m', t.date)""",
+            'postgresql': """
+                INSERT INTO monthly_rollups (user_id, wallet_id, category_id, type, year, month, total, tx_count)
+                SELECT w.user_id, t.wallet_id, t.category_id, t.type,
+                       EXTRACT(YEAR FROM t.date)::INTEGER, EXTRACT(MONTH FROM t.date)::INTEGER,
+                       SUM(ROUND(t.amount * 100)) / 100.0, COUNT(*)
+                FROM transactions t JOIN wallets w ON w.wallet_id = t.wallet_id
+                WHERE NOT EXISTS (SELECT 1 FROM monthly_rollups)
+                GROUP BY w.user_id, t.wallet_id, t.category_id, t.type,
+                         EXTRACT(YEAR FROM t.date), EXTRACT(MONTH FROM t.date)""",
+        },
+    ]),
+
+    # 5. ลำดับการเปลี่ยนแปลงสำหรับ /api/sync (ดู SyncCounter / SyncChange ใน app.py)
+    #    ข้อมูลเดิมทั้งหมดถูกนับเป็น "เปลี่ยนแปลง" ครั้งแรก -> client ที่ sync ด้วย since=0 ได้ข้อมูลครบ
+    Migration(5, 'sync_changes', [
+        """
+        CREATE TABLE IF NOT EXISTS sync_counters (
+            user_id INTEGER PRIMARY KEY REFERENCES users (user_id),
+            last_seq BIGINT NOT NULL DEFAULT 0
+        )""",
+        """
+        CREATE TABLE IF NOT EXISTS sync_changes (
+            user_id INTEGER NOT NULL REFERENCES users (user_id),
+            entity VARCHAR(20) NOT NULL,
+            entity_id INTEGER NOT NULL,
+            seq BIGINT NOT NULL,
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            PRIMARY KEY (user_id, entity, entity_id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_sync_changes_user_seq "
+        "ON sync_changes (user_id, seq)",
+        # กระเป๋า -> หมวดหมู่ -> ธุรกรรม (client จะได้รับกระเป๋าก่อนธุรกรรมที่อ้างถึง)
+        """
+        INSERT INTO sync_changes (user_id, entity, entity_id, seq, deleted)
+        SELECT user_id, entity, entity_id,
+               ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY priority, entity_id), FALSE
+        FROM (
+            SELECT user_id, 'wallet' AS entity, wallet_id AS entity_id, 1 AS priority FROM wallets
+            UNION ALL
+            SELECT user_id, 'category', category_id, 2 FROM categories
+            UNION ALL
+            SELECT w.user_id, 'transaction', t.transaction_id, 3
+            FROM transactions t JOIN wallets w ON w.wallet_id = t.wallet_id
+        ) AS existing_rows""",
+        """
+        INSERT INTO sync_counters (user_id, last_seq)
+        SELECT user_id, MAX(seq) FROM sync_changes GROUP BY user_id""",
+    ]),
+
+    # 6. ค้นหาธุรกรรมจาก description (ดู search.py)
+    #    SQLite ต้องเป็นเวอร์ชัน 3.34 ขึ้นไป (มี tokenizer แบบ trigram)
+    #    PostgreSQL ต้องมีสิทธิ์ CREATE EXTENSION (หรือให้ DBA ติดตั้ง pg_trgm ไว้ก่อน)
+    Migration(6, 'transaction_search', [
+        {
+            # external content -> ไม่เก็บข้อความซ้ำ อ่านจากตาราง transactions โดยตรง
+            'sqlite': """
+                CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5 (
+                    description,
+                    content='transactions',
+                    content_rowid='transaction_id',
+                    tokenize='trigram'
+                )""",
+            'postgresql': "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        },
+        {
+            # Trigger ให้ index ตรงกับข้อมูลเสมอ (ทั้งจากหน้าเว็บ, API, import และ seed)
+            'sqlite': """
+                CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+                    INSERT INTO transactions_fts (rowid, description) VALUES (new.transaction_id, new.description);
+                END""",
+            'postgresql': "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm "
+                          "ON transactions USING gin (description gin_trgm_ops)",
+        },
+        {
+            'sqlite': """
+                CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+                    INSERT INTO transactions_fts (transactions_fts, rowid, description)
+                    VALUES ('delete', old.transaction_id, old.description);
+                END""",
+            'postgresql': None,
+        },
+        {
+            'sqlite': """
+                CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description ON transactions BEGIN
+                    INSERT INTO transactions_fts (transactions_fts, rowid, description)
+                    VALUES ('delete', old.transaction_id, old.description);
+                    INSERT INTO transactions_fts (rowid, description) VALUES (new.transaction_id, new.description);
+                END""",
+            'postgresql': None,
+        },
+        # ธุรกรรมที่มีอยู่แล้ว
+        {
+            'sqlite': "INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')",
+            'postgresql': None,
+        },
+    ]),
+
+    # 7. ธุรกรรมที่เกิดซ้ำ (ดู RecurringRule / SchedulerLease ใน app.py และ recurrence.py)
+    Migration(7, 'recurring_rules', [
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS recurring_rules (
+                    rule_id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id),
+                    wallet_id INTEGER NOT NULL REFERENCES wallets (wallet_id) ON DELETE CASCADE,
+                    category_id INTEGER REFERENCES categories (category_id) ON DELETE SET NULL,
+                    description TEXT,
+                    amount NUMERIC(10, 2) NOT NULL,
+                    type VARCHAR(10) NOT NULL,
+                    frequency VARCHAR(10) NOT NULL,
+                    interval INTEGER NOT NULL DEFAULT 1,
+                    rrule VARCHAR(255),
+                    start_date DATE NOT NULL,
+                    end_date DATE,
+                    next_run DATE NOT NULL,
+                    active BOOLEAN NOT NULL DEFAULT TRUE
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS recurring_rules (
+                    rule_id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id),
+                    wallet_id INTEGER NOT NULL REFERENCES wallets (wallet_id) ON DELETE CASCADE,
+                    category_id INTEGER REFERENCES categories (category_id) ON DELETE SET NULL,
+                    description TEXT,
+                    amount NUMERIC(10, 2) NOT NULL,
+                    type VARCHAR(10) NOT NULL,
+                    frequency VARCHAR(10) NOT NULL,
+                    interval INTEGER NOT NULL DEFAULT 1,
+                    rrule VARCHAR(255),
+                    start_date DATE NOT NULL,
+                    end_date DATE,
+                    next_run DATE NOT NULL,
+                    active BOOLEAN NOT NULL DEFAULT TRUE
+                )""",
+        },
+        # งานเบื้องหลังหา "กฎที่ถึงกำหนด" ด้วย index นี้
+        "CREATE INDEX IF NOT EXISTS ix_recurring_rules_due "
+        "ON recurring_rules (active, next_run)",
+        "CREATE INDEX IF NOT EXISTS ix_recurring_rules_user "
+        "ON recurring_rules (user_id)",
+        # สิทธิ์ "คนรันงาน" (lease) -> หลาย worker / หลายเครื่องรันงานเดียวกันพร้อมกันไม่ได้
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_leases (
+            name VARCHAR(50) PRIMARY KEY,
+            owner VARCHAR(100) NOT NULL,
+            expires_at TIMESTAMP NOT NULL
+        )""",
+    ]),
+
+    # 8. งบประมาณรายเดือนต่อหมวดหมู่ + การแจ้งเตือน (ดู Budget / BudgetUsage / Notification ใน app.py)
+    Migration(8, 'budgets', [
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS budgets (
+                    budget_id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id),
+                    category_id INTEGER NOT NULL UNIQUE REFERENCES categories (category_id) ON DELETE CASCADE,
+                    amount NUMERIC(14, 2) NOT NULL
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS budgets (
+                    budget_id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id),
+                    category_id INTEGER NOT NULL UNIQUE REFERENCES categories (category_id) ON DELETE CASCADE,
+                    amount NUMERIC(14, 2) NOT NULL
+                )""",
+        },
+        "CREATE INDEX IF NOT EXISTS ix_budgets_user "
+        "ON budgets (user_id)",
+        """
+        CREATE TABLE IF NOT EXISTS budget_usage (
+            budget_id INTEGER NOT NULL REFERENCES budgets (budget_id) ON DELETE CASCADE,
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            spent NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            alert_level INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (budget_id, year, month)
+        )""",
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS notifications (
+                    notification_id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id),
+                    kind VARCHAR(30) NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL,
+                    is_read BOOLEAN NOT NULL DEFAULT FALSE
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS notifications (
+                    notification_id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users (user_id),
+                    kind VARCHAR(30) NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL,
+                    is_read BOOLEAN NOT NULL DEFAULT FALSE
+                )""",
+        },
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_unread "
+        "ON notifications (user_id, is_read, notification_id)",
+    ]),
+    # กระเป๋าหลายสกุลเงิน: กระเป๋าเดิมทั้งหมดเป็นเงินบาท
+    # exchange_rates.rate = มูลค่าของ 1 หน่วยสกุลเงินนั้น เป็นสกุลเงินหลัก (REPORTING_CURRENCY) ณ rate_date
+    Migration(9, 'wallet_currency', [
+        "ALTER TABLE wallets ADD COLUMN currency VARCHAR(3) NOT NULL DEFAULT 'THB'",
+        """
+        CREATE TABLE IF NOT EXISTS exchange_rates (
+            currency VARCHAR(3) NOT NULL,
+            rate_date DATE NOT NULL,
+            rate NUMERIC(18, 8) NOT NULL,
+            PRIMARY KEY (currency, rate_date)
+        )""",
+    ]),
+    # บันทึกการเปลี่ยนแปลงข้อมูล (เขียนโดย Thread เบื้องหลัง ดู audit.py)
+    # actor_id / entity_id ไม่มี Foreign Key -> ผู้ใช้/รายการถูกลบไปแล้วประวัติยังอยู่ครบ
+    # event_id ซ้ำไม่ได้ -> เขียนซ้ำจากไฟล์ spool ได้โดยไม่เกิดแถวซ้ำ
+    Migration(10, 'audit_log', [
+        {
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS audit_log (
+                    audit_id INTEGER PRIMARY KEY,
+                    event_id VARCHAR(32) NOT NULL UNIQUE,
+                    occurred_at TIMESTAMP NOT NULL,
+                    actor_id INTEGER,
+                    entity VARCHAR(20) NOT NULL,
+                    entity_id INTEGER,
+                    action VARCHAR(10) NOT NULL,
+                    old_values TEXT,
+                    new_values TEXT,
+                    source VARCHAR(200)
+                )""",
+            'postgresql': """
+                CREATE TABLE IF NOT EXISTS audit_log (
+                    audit_id BIGSERIAL PRIMARY KEY,
+                    event_id VARCHAR(32) NOT NULL UNIQUE,
+                    occurred_at TIMESTAMP NOT NULL,
+                    actor_id INTEGER,
+                    entity VARCHAR(20) NOT NULL,
+                    entity_id INTEGER,
+                    action VARCHAR(10) NOT NULL,
+                    old_values TEXT,
+                    new_values TEXT,
+                    source VARCHAR(200)
+                )""",
+        },
+        "CREATE INDEX IF NOT EXISTS ix_audit_log_entity ON audit_log (entity, entity_id, audit_id)",
+        "CREATE INDEX IF NOT EXISTS ix_audit_log_actor ON audit_log (actor_id, audit_id)",
+    ]),
+]
+
+########################################################################################
+
+VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        applied_at VARCHAR(32) NOT NULL
+    )"""
+
+
+def latest_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def statements_for(migration, dialect):
+    # เลือก SQL ให้ตรงกับฐานข้อมูลที่ใช้อยู่
+    if dialect not in SUPPORTED_DIALECTS:
+        raise ValueError(f'Unsupported dialect: {dialect}')
+
+    result = []
+    for statement in migration.statements:
+        if isinstance(statement, dict):
+            statement = statement[dialect]
+            if statement is None:
+                continue
+        result.append(textwrap.dedent(statement).strip())
+    return result
+
+
+def pending_migrations(current, target=None):
+    target = latest_version() if target is None else target
+    return [m for m in MIGRATIONS if current < m.version <= target]
+
+
+def _record_sql(migration):
+    # SQL สำหรับบันทึกว่า migration นี้รันแล้ว (ใช้ทั้งตอนรันจริงและตอนพิมพ์ SQL)
+    name = migration.name.replace("'", "''")
+    applied_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    return (f"INSERT INTO schema_migrations (version, name, applied_at) "
+            f"VALUES ({migration.version}, '{name}', '{applied_at}')")
+
+
+def current_version(connection):
+    # อ่านเวอร์ชันล่าสุดที่รันไปแล้ว (0 = ยังไม่เคยรันเลย)
+    connection.execute(text(VERSION_TABLE_SQL))
+    version = connection.execute(text('SELECT MAX(version) FROM schema_migrations')).scalar()
+    return version or 0
+
+
+def upgrade(engine, target=None, echo=print):
+    # รัน migration ที่ค้างอยู่ทีละตัว แต่ละตัวอยู่ใน Transaction ของตัวเอง
+    # (PostgreSQL ย้อนกลับได้ทั้งก้อนถ้าพังกลางทาง)
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        current = current_version(connection)
+
+    applied = []
+    for migration in pending_migrations(current, target):
+        with engine.begin() as connection:
+            for statement in statements_for(migration, dialect):
+                connection.execute(text(statement))
+            connection.execute(text(_record_sql(migration)))
+        echo(f'Applied migration {migration.version:04d}_{migration.name}')
+        applied.append(migration)
+    return applied
+
+
+def render_sql(dialect, current=0, target=None):
+    # สร้างสคริปต์ SQL แบบ "offline" (ไม่ต้องต่อฐานข้อมูล) เพื่อให้ DBA ตรวจ/รันเอง
+    lines = [textwrap.dedent(VERSION_TABLE_SQL).strip() + ';', '']
+    for migration in pending_migrations(current, target):
+        lines.append(f'-- {migration.version:04d}_{migration.name}')
+        if dialect == 'postgresql':
+            lines.append('BEGIN;')
+        for statement in statements_for(migration, dialect):
+            lines.append(statement + ';')
+        lines.append(_record_sql(migration) + ';')
+        if dialect == 'postgresql':
+            lines.append('COMMIT;')
+        lines.append('')
+    return '\n'.join(lines)
@@ -0,0 +1,85 @@
+# --- แบ่งตาราง transactions เป็น Partition (PostgreSQL เท่านั้น ไม่บังคับ) ---
+#
+# รูปแบบที่เลือกได้:
+#   - 'year' : PARTITION BY RANGE (date) ปีละ 1 ตาราง (transactions_y2024, ...) + transactions_default
+#              Query ที่กรองช่วงวันที่ (dashboard, รายงาน) อ่านแค่ Partition ของปีนั้น
+#              ต้องเพิ่ม Partition ของปีถัดไปล่วงหน้า ("flask partitions add-year 2027")
+#   - 'hash' : PARTITION BY HASH (wallet_id) N ตาราง (transactions_p0 ... transactions_pN-1)
+#              transactions ไม่มีคอลัมน์ user_id จึงแบ่งตามกระเป๋าแทน -> Query ของผู้ใช้ (wallet_id IN (...))
+#              อ่านแค่ Partition ของกระเป๋าตัวเอง ไม่ต้องสแกนข้อมูลของผู้ใช้คนอื่น
+#
+# ย้ายข้อมูลเดิม: สร้างตารางใหม่ -> คัดลอกข้อมูล -> สลับชื่อ (ใน Transaction เดียว ล็อกไม่ให้เขียนระหว่างย้าย แต่ยังอ่านได้)
+# ตารางเดิมถูกเปลี่ยนชื่อเป็น transactions_unpartitioned (ตรวจแล้วค่อย DROP เอง)
+#
+# Primary Key ของตาราง Partition ต้องมีคอลัมน์ที่ใช้แบ่งด้วย -> (transaction_id, date) หรือ (transaction_id, wallet_id)
+# transaction_id ยังไม่ซ้ำกันเพราะมาจาก Sequence เดิม
+#
+# ไฟล์นี้ไม่ import app.py
+
+PARTITION_SCHEMES = ('year', 'hash')
+DEFAULT_HASH_PARTITIONS = 8
+
+# Index ของ transactions (ต้องตรงกับ migrations.py) สร้างใหม่บนตารางแม่ -> PostgreSQL สร้างให้ทุก Partition
+TRANSACTION_INDEXES = [
+    ('ix_transactions_wallet_date', '(wallet_id, date, transaction_id)'),
+    ('ix_transactions_wallet_type_date', '(wallet_id, type, date)'),
+    ('ix_transactions_category', '(category_id)'),
+    ('ix_transactions_description_trgm', 'USING gin (description gin_trgm_ops)'),
+]
+
+COLUMNS = 'transaction_id, description, amount, date, type, wallet_id, category_id'
+
+
+def year_partition_sql(parent, year):
+    return (f"CREATE TABLE IF NOT EXISTS transactions_y{year} PARTITION OF {parent} "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')")
+
+
+def partition_statements(scheme, first_year=None, last_year=None, partitions=DEFAULT_HASH_PARTITIONS):
+    # คืนค่า [SQL, ...] สำหรับแปลงตาราง transactions เดิมเป็นแบบ Partition (รันต่อกันใน Transaction เดียว)
+    if scheme not in PARTITION_SCHEMES:
+        raise ValueError(f'scheme must be one of {", ".join(PARTITION_SCHEMES)}')
+    if scheme == 'year':
+        if first_year is None or last_year is None or first_year > last_year:
+            raise ValueError('year scheme needs first_year <= last_year')
+        key, partition_by = 'date', 'RANGE (date)'
+    else:
+        if partitions < 2:
+            raise ValueError('hash scheme needs at least 2 partitions')
+        key, partition_by = 'wallet_id', 'HASH (wallet_id)'
+
+    statements = [
+        # อ่านได้ตามปกติ แต่เขียนไม่ได้จนกว่าจะย้ายเสร็จ
+        'LOCK TABLE transactions IN EXCLUSIVE MODE',
+        f"""
+        CREATE TABLE transactions_partitioned (
+            transaction_id INTEGER NOT NULL DEFAULT nextval('transactions_transaction_id_seq'),
+            description TEXT,
+            amount NUMERIC(10, 2) NOT NULL,
+            date DATE NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            wallet_id INTEGER NOT NULL REFERENCES wallets (wallet_id) ON DELETE CASCADE,
+            category_id INTEGER REFERENCES categories (category_id) ON DELETE SET NULL,
+            PRIMARY KEY (transaction_id, {key})
+        ) PARTITION BY {partition_by}""",
+    ]
+    if scheme == 'year':
+        statements += [year_partition_sql('transactions_partitioned', year)
+                       for year in range(first_year, last_year + 1)]
+        # วันที่นอกช่วงที่สร้างไว้ (เช่น ปีหน้าที่ยังไม่ได้ add-year) ไม่ให้ INSERT พัง
+        statements.append('CREATE TABLE transactions_default PARTITION OF transactions_partitioned DEFAULT')
+    else:
+        statements += [f'CREATE TABLE transactions_p{i} PARTITION OF transactions_partitioned '
+                       f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})' for i in range(partitions)]
+
+    statements.append(f'INSERT INTO transactions_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM transactions')
+    statements.append('ALTER TABLE transactions RENAME TO transactions_unpartitioned')
+    # ชื่อ Index ใช้ซ้ำทั้ง schema ไม่ได้ -> เปลี่ยนชื่อของตารางเดิมก่อน
+    statements += [f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_unpartitioned'
+                   for name, _ in TRANSACTION_INDEXES]
+    statements.append('ALTER TABLE transactions_partitioned RENAME TO transactions')
+    statements += [f'CREATE INDEX {name} ON transactions {definition}' for name, definition in TRANSACTION_INDEXES]
+    # DROP ตารางเดิมภายหลังจะได้ไม่ลบ Sequence ไปด้วย
+    statements.append('ALTER SEQUENCE transactions_transaction_id_seq OWNED BY transactions.transaction_id')
+    statements.append('ANALYZE transactions')
+    return statements
@@ -0,0 +1,53 @@
+# --- ตัวจำกัดความถี่แบบ Token Bucket ---
+#
+# แต่ละ key (เช่น "user:somchai" หรือ "ip:1.2.3.4") มี "ถัง" ที่จุ token ได้ capacity อัน
+# token จะค่อย ๆ เติมกลับ rate อันต่อวินาที ทุกครั้งที่ทำงานต้องใช้ 1 token ถ้าถังว่าง = ปฏิเสธ
+# -> ยอมให้ทำถี่ ๆ ได้ช่วงสั้น ๆ (burst) แต่ระยะยาวเฉลี่ยได้ไม่เกิน rate
+#
+# เก็บใน RAM ของแต่ละ worker (ถ้ามี N worker ขีดจำกัดจริงจะประมาณ N เท่า)
+#
+# ไฟล์นี้ไม่ import app.py
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    def __init__(self, capacity, per_minute, maxsize=10000):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0   # token ต่อวินาที
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()   # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def _refill(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+    def hit(self, key, now=None):
+        # ใช้ 1 token คืนค่า 0 ถ้าผ่าน หรือจำนวนวินาทีที่ต้องรอ ถ้าถูกปฏิเสธ
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = self._refill(key, now)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / self.rate if self.rate else math.inf
+            self._buckets.move_to_end(key)
+            # key ที่ไม่ได้ใช้นานที่สุดจะถูกลบ (ถังที่เติมเต็มแล้วไม่ต้องจำ)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+def check_limits(checks):
+    # checks = [(limiter, key), ...] ตรวจทุกตัว (ทุกตัวใช้ token) แล้วคืนค่าเวลารอที่มากที่สุด
+    return max((limiter.hit(key) for limiter, key in checks), default=0)
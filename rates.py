@@ -0,0 +1,114 @@
+# --- อัตราแลกเปลี่ยน (Exchange Rates) ---
+#
+# อัตราเก็บในตาราง exchange_rates (1 แถว = มูลค่าของ 1 หน่วยสกุลเงินนั้น เป็นสกุลเงินหลัก ณ วันที่หนึ่ง)
+# โหลดจากไฟล์ด้วย "flask rates load rates.csv" (ไม่ต้องเรียกบริการภายนอกตอนใช้งาน)
+#
+# รูปแบบไฟล์ CSV (มีหัวคอลัมน์):
+#   date,currency,rate
+#   2025-01-02,USD,34.15
+#   2025-01-02,JPY,0.2175
+#
+# ExchangeRates เก็บอัตราทั้งหมดไว้ใน RAM ของ worker (ไม่กี่หมื่นแถว) แปลงค่าได้โดยไม่ต้อง Query
+# การแปลงใช้อัตราล่าสุดที่ "ไม่เกิน" วันที่ที่ต้องการ (วันหยุดที่ไม่มีอัตราจะใช้อัตราของวันทำการก่อนหน้า)
+#
+# ไฟล์นี้ไม่ import app.py
+
+import calendar
+import csv
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+CENT = Decimal('0.01')
+CURRENCY_SYMBOLS = {'THB': '฿', 'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥', 'CNY': '¥'}
+
+
+def format_money(amount, currency):
+    # '฿ 1234.50' / 'SGD 1234.50' (ใช้เป็น Template filter)
+    return f'{CURRENCY_SYMBOLS.get(currency, currency)} {Decimal(amount or 0):.2f}'
+
+
+def month_end(year, month):
+    # ยอดรายเดือนแปลงด้วยอัตราของวันสุดท้ายของเดือน (หรืออัตราล่าสุดก่อนหน้านั้น)
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def normalize_currency(code):
+    # 'usd ' -> 'USD' (รหัส ISO 4217 มี 3 ตัวอักษร)
+    code = (code or '').strip().upper()
+    if len(code) != 3 or not code.isalpha():
+        raise ValueError(f'invalid currency code "{code}"')
+    return code
+
+
+def iter_rate_rows(stream):
+    # อ่านไฟล์ CSV แล้วคืนค่า (currency, date, Decimal rate) ทีละแถว
+    reader = csv.DictReader(stream)
+    missing = {'date', 'currency', 'rate'} - {name.strip().lower() for name in reader.fieldnames or []}
+    if missing:
+        raise ValueError(f'missing column(s): {", ".join(sorted(missing))}')
+    for line, row in enumerate(reader, start=2):
+        row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        try:
+            rate = Decimal(row['rate'])
+            if not rate.is_finite() or rate <= 0:
+                raise ValueError
+            yield (normalize_currency(row['currency']),
+                   datetime.strptime(row['date'], '%Y-%m-%d').date(),
+                   rate)
+        except (InvalidOperation, ValueError):
+            raise ValueError(f'line {line}: invalid rate row {row}')
+
+
+class ExchangeRates:
+    def __init__(self, base_currency):
+        self.base_currency = base_currency
+        self.version = None
+        self.loaded_at = None
+        self._dates = {}   # currency -> [date, ...] (เรียงจากเก่าไปใหม่)
+        self._rates = {}   # currency -> [Decimal, ...]
+        self._lock = threading.Lock()
+
+    def replace(self, rows, version=None):
+        # rows = (currency, date, rate) ทั้งหมด (เรียงมาก่อนหรือไม่ก็ได้)
+        by_currency = {}
+        for currency, day, rate in rows:
+            by_currency.setdefault(currency, []).append((day, Decimal(str(rate))))
+        dates, rates = {}, {}
+        for currency, items in by_currency.items():
+            items.sort()
+            dates[currency] = [day for day, _ in items]
+            rates[currency] = [rate for _, rate in items]
+        with self._lock:
+            self._dates, self._rates, self.version = dates, rates, version
+            self.loaded_at = time.monotonic()
+
+    def currencies(self):
+        return sorted(set(self._dates) | {self.base_currency})
+
+    def rate_on(self, currency, day):
+        # อัตราของ 1 หน่วย currency เป็นสกุลเงินหลัก (None = ไม่มีอัตราถึงวันนั้น)
+        if currency == self.base_currency:
+            return Decimal('1')
+        dates = self._dates.get(currency)
+        if not dates:
+            return None
+        i = bisect_right(dates, day) - 1
+        return self._rates[currency][i] if i >= 0 else None
+
+    def convert_many(self, amounts, day):
+        # amounts = [(currency, Decimal), ...] -> (ผลรวมเป็นสกุลเงินหลัก, {สกุลเงินที่ไม่มีอัตรา})
+        # ใช้อัตราเดียวต่อสกุลเงิน (คูณครั้งเดียวหลังรวมยอดของสกุลเงินนั้นแล้ว)
+        by_currency = {}
+        for currency, amount in amounts:
+            by_currency[currency] = by_currency.get(currency, Decimal('0')) + amount
+        total, missing = Decimal('0'), set()
+        for currency, amount in by_currency.items():
+            rate = self.rate_on(currency, day)
+            if rate is None:
+                missing.add(currency)
+                continue
+            total += amount * rate
+        return total.quantize(CENT), missing
@@ -0,0 +1,108 @@
+# --- คำนวณวันที่ของธุรกรรมที่เกิดซ้ำ (Recurring Rules) ---
+#
+# frequency:
+#   - 'daily' / 'weekly' / 'monthly' / 'yearly' : ทุก ๆ interval วัน/สัปดาห์/เดือน/ปี นับจาก start_date
+#   - 'rrule' : กฎแบบ iCalendar RRULE เช่น "FREQ=MONTHLY;BYDAY=-1FR" (ศุกร์สุดท้ายของเดือน)
+#               ต้องติดตั้ง python-dateutil (pip install python-dateutil)
+#
+# รายเดือน/รายปี นับจาก start_date เสมอ (ไม่ใช่จากครั้งก่อน) -> เริ่มวันที่ 31 จะได้ 31 ม.ค., 28 ก.พ., 31 มี.ค.
+# (ถ้าเดือนนั้นไม่มีวันที่นั้น ใช้วันสุดท้ายของเดือน)
+#
+# ไฟล์นี้ไม่ import app.py
+
+import calendar
+from datetime import date, datetime, timedelta
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly', 'rrule')
+
+
+def _parse_rrule(rrule_text, start_date):
+    try:
+        from dateutil.rrule import rrulestr
+    except ImportError:
+        raise RuntimeError('frequency=rrule ต้องติดตั้งแพ็กเกจ python-dateutil ก่อน (pip install python-dateutil)')
+    text = rrule_text.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+    return rrulestr(text, dtstart=datetime.combine(start_date, datetime.min.time()))
+
+
+def validate_rule(frequency, interval, rrule_text, start_date, end_date=None):
+    # raise ValueError ถ้ากฎไม่ถูกต้อง
+    if frequency not in FREQUENCIES:
+        raise ValueError(f'frequency must be one of {", ".join(FREQUENCIES)}')
+    if frequency == 'rrule':
+        if not rrule_text:
+            raise ValueError('rrule is required when frequency=rrule')
+        try:
+            _parse_rrule(rrule_text, start_date)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f'invalid rrule: {e}')
+    elif not isinstance(interval, int) or interval < 1:
+        raise ValueError('interval must be a positive integer')
+    if end_date is not None and end_date < start_date:
+        raise ValueError('end_date must not be before start_date')
+
+
+def _add_months(start, months):
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    day = min(start.day, calendar.monthrange(year, month + 1)[1])
+    return date(year, month + 1, day)
+
+
+def _nth_occurrence(frequency, interval, start, n):
+    if frequency == 'daily':
+        return start + timedelta(days=interval * n)
+    if frequency == 'weekly':
+        return start + timedelta(weeks=interval * n)
+    if frequency == 'monthly':
+        return _add_months(start, interval * n)
+    return _add_months(start, 12 * interval * n)
+
+
+def _first_index_on_or_after(frequency, interval, start, day):
+    # ข้ามไปครั้งที่ n ที่ตรงกับ (หรืออยู่หลัง) day ได้ทันที ไม่ต้องวนนับทีละครั้งจาก start_date
+    if day <= start:
+        return 0
+    if frequency in ('daily', 'weekly'):
+        step = interval * (1 if frequency == 'daily' else 7)
+        return -(-(day - start).days // step)
+    months = (day.year - start.year) * 12 + day.month - start.month
+    step = interval * (1 if frequency == 'monthly' else 12)
+    n = max(months // step, 0)
+    while _nth_occurrence(frequency, interval, start, n) < day:
+        n += 1
+    return n
+
+
+def occurrences(frequency, interval, rrule_text, start_date, end_date, from_date, until, limit):
+    # คืนค่า (วันที่ที่ถึงกำหนดในช่วง from_date..until ไม่เกิน limit วัน, วันที่ครั้งถัดไป หรือ None ถ้าจบกฎแล้ว)
+    last = min(until, end_date) if end_date else until
+    if frequency == 'rrule':
+        rule = _parse_rrule(rrule_text, start_date)
+        dates = []
+        current = rule.after(datetime.combine(from_date, datetime.min.time()), inc=True)
+        while current is not None and current.date() <= last and len(dates) < limit:
+            dates.append(current.date())
+            current = rule.after(current)
+        next_date = current.date() if current is not None else None
+    else:
+        n = _first_index_on_or_after(frequency, interval, start_date, from_date)
+        dates = []
+        next_date = _nth_occurrence(frequency, interval, start_date, n)
+        while next_date <= last and len(dates) < limit:
+            dates.append(next_date)
+            n += 1
+            next_date = _nth_occurrence(frequency, interval, start_date, n)
+
+    if next_date is not None and end_date and next_date > end_date:
+        next_date = None
+    return dates, next_date
+
+
+def first_occurrence(frequency, interval, rrule_text, start_date, end_date=None):
+    # วันที่ครั้งแรกของกฎ (None = ไม่มีวันไหนตรงเลย)
+    _, next_date = occurrences(frequency, interval, rrule_text, start_date, end_date,
+                               start_date, start_date - timedelta(days=1), 0)
+    return next_date
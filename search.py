@@ -0,0 +1,69 @@
+# --- ค้นหาธุรกรรมจาก "รายละเอียด" (description) ---
+#
+# ใช้ Index ของฐานข้อมูลแทน LIKE '%...%' ที่ต้องสแกนทั้งตาราง (ดู migration 6 ใน migrations.py):
+#   - SQLite     : ตาราง FTS5 transactions_fts (tokenizer แบบ trigram) อัปเดตด้วย Trigger ทุกครั้งที่เพิ่ม/แก้/ลบ
+#   - PostgreSQL : GIN index แบบ pg_trgm บนคอลัมน์ description (ILIKE '%...%' ใช้ index นี้ได้เลย)
+#
+# ทำไมใช้ trigram (ตัดเป็นชุดละ 3 ตัวอักษร) แทนการตัดคำ:
+#   ภาษาไทยไม่เว้นวรรคระหว่างคำ ตัวตัดคำทั่วไป (เช่น tsvector ของ PostgreSQL) จะมองทั้งประโยคเป็นคำเดียว
+#   trigram ค้นหา "ส่วนหนึ่งของข้อความ" ได้ทุกภาษา -> พิมพ์ "กาแฟ" เจอ "ค่ากาแฟเช้า", พิมพ์ "star" เจอ "Starbucks"
+#
+# คำค้นหลายคำ (เว้นวรรค) = ต้องมีครบทุกคำ
+# คำที่สั้นกว่า 3 ตัวอักษรใช้ index ไม่ได้ -> ใช้ LIKE แต่ยังถูกจำกัดด้วย Filter กระเป๋า/วันที่อยู่แล้ว
+#
+# ไฟล์นี้ไม่ import app.py
+
+import unicodedata
+
+from sqlalchemy import and_, column, text
+
+# trigram ต้องมีอย่างน้อย 3 ตัวอักษร
+MIN_INDEXED_TERM_LENGTH = 3
+MAX_QUERY_LENGTH = 200
+MAX_TERMS = 8
+
+
+def parse_search_terms(query):
+    # แยกคำค้นด้วยช่องว่าง (ตัดคำซ้ำ ไม่สนตัวพิมพ์เล็ก/ใหญ่)
+    if not query:
+        return []
+    # NFC -> สระ/วรรณยุกต์ที่พิมพ์สลับลำดับกันได้จะเป็นรหัสเดียวกัน
+    # zero-width space (ใช้แทนการเว้นวรรคในข้อความไทยบางแหล่ง) ถือเป็นช่องว่าง
+    query = unicodedata.normalize('NFC', query[:MAX_QUERY_LENGTH]).replace('\u200b', ' ')
+    terms, seen = [], set()
+    for term in query.split():
+        if term.casefold() not in seen:
+            seen.add(term.casefold())
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _fts5_phrase(term):
+    # ใส่ "..." ให้ FTS5 มองเป็นข้อความธรรมดา (ไม่ตีความ AND / OR / * / - ที่ผู้ใช้พิมพ์มา)
+    return '"' + term.replace('"', '""') + '"'
+
+
+def description_search_filter(dialect, id_column, description_column, query):
+    # คืนเงื่อนไขสำหรับ .filter() หรือ None ถ้าไม่มีคำค้น
+    terms = parse_search_terms(query)
+    if not terms:
+        return None
+
+    conditions = []
+    if dialect == 'sqlite':
+        indexed = [t for t in terms if len(t) >= MIN_INDEXED_TERM_LENGTH]
+        if indexed:
+            matching_ids = text('SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH :search_match') \
+                .bindparams(search_match=' '.join(_fts5_phrase(t) for t in indexed)) \
+                .columns(column('rowid'))
+            conditions.append(id_column.in_(matching_ids))
+        terms = [t for t in terms if len(t) < MIN_INDEXED_TERM_LENGTH]
+
+    # PostgreSQL: ILIKE ใช้ GIN trigram index ได้ (คำ >= 3 ตัวอักษร)
+    conditions += [description_column.ilike(_like_pattern(t), escape='\\') for t in terms]
+    return and_(*conditions)
@@ -0,0 +1,55 @@
+# --- fixture กลางของชุดทดสอบ (pytest) ---
+#
+# ทุก test ได้แอปใหม่ + ฐานข้อมูล SQLite ชั่วคราว (migrations.upgrade ครบทุกเวอร์ชัน) ใน tmp_path
+# bcrypt ตั้ง rounds ต่ำสุดให้สมัคร/ล็อกอินเร็ว
+#
+# วิธีรัน (จากโฟลเดอร์โปรเจกต์):
+#   python -m pytest -q
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PASSWORD = 'password123'
+
+
+def make_app(tmp_path, **config):
+    import migrations
+    from app import create_app, db
+
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    config = dict({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'SECRET_KEY': 'test',
+        'BCRYPT_LOG_ROUNDS': 4,
+        'AUDIT_SPOOL_DIR': str(tmp_path / 'audit-spool'),
+    }, **config)
+    app = create_app(config)
+    with app.app_context():
+        migrations.upgrade(db.engine, echo=lambda message: None)
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import db
+
+    app = make_app(tmp_path)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def login(app, username):
+    # สมัคร + ล็อกอิน แล้วคืน test client ที่ล็อกอินอยู่ (แต่ละผู้ใช้ใช้ client ของตัวเอง)
+    client = app.test_client()
+    client.post('/register', data={'username': username, 'password': PASSWORD})
+    client.post('/login', data={'username': username, 'password': PASSWORD})
+    return client
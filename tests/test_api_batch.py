@@ -0,0 +1,54 @@
+# /api/v1/batch ต้องตอบ 400 (ไม่ใช่ 500) เมื่อ body ไม่ใช่ JSON object
+
+import pytest
+
+from tests.conftest import login
+
+
+@pytest.mark.parametrize('body', [[{'op': 'delete', 'id': 1}], 'operations', 7, None])
+def test_batch_rejects_non_object_body(app, body):
+    client = login(app, 'bob')
+    response = client.post('/api/v1/batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'body must be a JSON object'}
+
+
+def test_batch_rejects_missing_operations(app):
+    client = login(app, 'bob')
+    response = client.post('/api/v1/batch', json={})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'operations must be a non-empty list'}
+
+
+def setup_wallet(app):
+    client = login(app, 'bob')
+    client.post('/add_wallet', data={'wallet_name': 'cash'})
+    client.post('/add_category', data={'category_name': 'food', 'category_type': 'expense'})  # category_id 1
+    client.post('/add_category', data={'category_name': 'pay', 'category_type': 'income'})  # category_id 2
+    return client
+
+
+def create(client, **data):
+    return client.post('/api/v1/transactions', json=dict({'wallet_id': 1, 'amount': '10', 'date': '2024-01-01',
+                                                           'type': 'expense'}, **data))
+
+
+@pytest.mark.parametrize('data', [{'type': 'income', 'category_id': 1},
+                                  {'type': 'expense', 'category_id': 2},
+                                  {'category_id': True}])
+def test_create_rejects_mismatched_or_non_integer_category(app, data):
+    client = setup_wallet(app)
+    response = create(client, **data)
+    assert response.status_code == 400
+
+    from app import Transaction
+    with app.app_context():
+        assert Transaction.query.count() == 0
+
+
+def test_update_checks_category_against_resulting_type(app):
+    client = setup_wallet(app)
+    assert create(client, category_id=1).status_code == 201
+    # เปลี่ยนแค่ type แต่หมวดหมู่เดิมเป็นรายจ่าย -> ไม่ผ่าน
+    assert client.patch('/api/v1/transactions/1', json={'type': 'income'}).status_code == 400
+    assert client.patch('/api/v1/transactions/1', json={'type': 'income', 'category_id': 2}).status_code == 200
@@ -0,0 +1,157 @@
+# audit_log แบบ write-behind: process ตายกลางก้อน -> process ถัดไปเขียนต่อจากไฟล์ spool ครบและไม่ซ้ำ
+# ฐานข้อมูลล่ม -> Thread ไม่ค้างตลอดไป และไม่ทิ้งไฟล์ spool
+
+import json
+import os
+import signal
+import subprocess
+import sys
+from datetime import date
+
+from sqlalchemy import event
+
+from audit import AuditWriter, audit_record
+from tests.conftest import ROOT, login, make_app
+
+KILLED_WRITER = '''
+import os, pathlib, signal, sys
+import app as app_module
+from app import User, db
+from tests.conftest import make_app
+
+app = make_app(pathlib.Path(sys.argv[1]), AUDIT_LOG=True, AUDIT_BATCH_SIZE=10, AUDIT_FLUSH_SECONDS=0.05)
+real_write, calls = app_module._write_audit_batch, []
+
+def write_then_die(app, records):
+    calls.append(len(records))
+    if len(calls) == 2:
+        real_write(app, records[:5])  # ครึ่งก้อนลงฐานข้อมูลแล้ว process ตาย
+        os.kill(os.getpid(), signal.SIGKILL)
+    real_write(app, records)
+
+app_module._write_audit_batch = write_then_die
+with app.app_context():
+    db.session.add_all([User(username=f'user{i}', password_hash='x') for i in range(25)])
+    db.session.commit()
+    app_module.audit_writer().flush()
+'''
+
+
+def audit_rows(app):
+    from app import AuditLog
+
+    with app.app_context():
+        return [(row.event_id, row.entity, row.entity_id, row.action) for row in AuditLog.query.all()]
+
+
+def spool_files(path):
+    return sorted(os.listdir(path)) if os.path.exists(path) else []
+
+
+def spooled_lines(path):
+    # รายการที่ยังค้างในไฟล์ spool ทุกไฟล์ (ไฟล์ปัจจุบันที่เขียนครบแล้วถูกล้างเหลือไฟล์ว่าง)
+    return sum(len((path / name).read_text().splitlines()) for name in spool_files(path))
+
+
+def test_writer_killed_mid_batch_is_replayed_exactly_once(tmp_path):
+    child = subprocess.run([sys.executable, '-c', KILLED_WRITER, str(tmp_path)], cwd=ROOT,
+                           capture_output=True, text=True, timeout=60)
+    assert child.returncode == -signal.SIGKILL, child.stderr
+
+    app = make_app(tmp_path, AUDIT_LOG=True)
+    assert len(audit_rows(app)) == 15  # ก้อนแรก 10 + ครึ่งก้อนที่สอง 5
+    assert len(spool_files(tmp_path / 'audit-spool')) == 1
+
+    with app.app_context():
+        writer = app.extensions['audit']
+        assert writer.replay_orphans() == 25
+        assert writer.replay_orphans() == 0
+    rows = audit_rows(app)
+    assert len(rows) == len({event_id for event_id, *_ in rows}) == 25
+    assert sorted(entity_id for _, entity, entity_id, action in rows if entity == 'user' and action == 'create') \
+        == list(range(1, 26))
+    assert spooled_lines(tmp_path / 'audit-spool') == 0
+
+
+def test_failed_writes_keep_spool_file_until_database_returns(tmp_path):
+    spool_dir = tmp_path / 'spool'
+    written, database_up = [], [False]
+
+    def write_batch(records):
+        if not database_up[0]:
+            raise ConnectionError('database is down')
+        written.extend(record['event_id'] for record in records)
+
+    writer = AuditWriter(write_batch, str(spool_dir), flush_interval=0.01, max_attempts=1)
+    lost = [audit_record('wallet', i, 'create', None, {'wallet_id': i}) for i in range(3)]
+    writer.submit(lost)
+    assert writer.flush(timeout=5)  # ลองครบแล้วเลิก ไม่ค้าง
+    assert writer.stats()['stranded'] == 3
+    (kept,) = spool_files(spool_dir)
+    assert [json.loads(line)['event_id'] for line in (spool_dir / kept).read_text().splitlines()] \
+        == [record['event_id'] for record in lost]
+
+    # ฐานข้อมูลกลับมา -> ก้อนถัดไปเขียนได้ แล้วรับช่วงไฟล์ที่ค้างของตัวเองต่อ
+    database_up[0] = True
+    later = [audit_record('wallet', 9, 'create', None, {'wallet_id': 9})]
+    writer.submit(later)
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert sorted(written) == sorted(record['event_id'] for record in lost + later)
+    assert spooled_lines(spool_dir) == 0
+
+
+def test_replay_gives_up_and_leaves_spool_file(tmp_path):
+    spool_dir = tmp_path / 'spool'
+    spool_dir.mkdir()
+    dead = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True)
+    writer = AuditWriter(lambda records: 1 / 0, str(spool_dir), max_attempts=2)
+    orphan = spool_dir / f'audit-{writer.host}-{int(dead.stdout)}-000001.jsonl'
+    orphan.write_text(''.join(json.dumps(audit_record('user', i, 'create', None, {})) + '\n' for i in range(3)))
+
+    assert writer.replay_orphans() == 0
+    assert writer.failures == 2
+    (left,) = spool_files(spool_dir)
+    assert len((spool_dir / left).read_text().splitlines()) == 3
+
+    written = []
+    writer.write_batch = written.extend
+    assert writer.replay_orphans() == 3 and len(written) == 3
+    assert spool_files(spool_dir) == []
+
+
+def test_wallet_delete_keeps_before_image_of_every_transaction(tmp_path):
+    from app import AuditLog, Category, db
+
+    app = make_app(tmp_path, AUDIT_FLUSH_SECONDS=0.01)  # AUDIT_LOG เปิดเป็นค่าเริ่มต้น
+    client = login(app, 'bob')
+    client.post('/add_wallet', data={'wallet_name': 'cash'})
+    client.post('/add_category', data={'category_name': 'food', 'category_type': 'expense'})
+    for amount in range(1, 6):
+        client.post('/add_transaction', data={'wallet_id': 1, 'amount': str(amount), 'type': 'expense',
+                                              'category_id': 1, 'date': date.today().isoformat(),
+                                              'description': f'item {amount}'})
+    client.post('/delete_wallet/1')
+
+    with app.app_context():
+        app.extensions['audit'].flush(timeout=5)
+        deletes = AuditLog.query.filter_by(entity='transaction', action='delete').order_by(AuditLog.entity_id).all()
+        assert [row.entity_id for row in deletes] == [1, 2, 3, 4, 5]
+        before = [json.loads(row.old_values) for row in deletes]
+        assert [(b['wallet_id'], b['amount'], b['description']) for b in before] \
+            == [(1, f'{amount}.00', f'item {amount}') for amount in range(1, 6)]
+        assert all(row.new_values is None for row in deletes)
+
+        # UPDATE แบบ bulk ที่ SET เป็นค่าคงที่: SELECT ค่าก่อนครั้งเดียว ค่าหลังคำนวณจาก SET
+        selects = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, sql, *args: selects.append(sql) if sql.startswith('SELECT') else None)
+        Category.query.filter_by(user_id=1).update({'category_name': 'meals'})
+        db.session.commit()
+        app.extensions['audit'].flush(timeout=5)
+        assert len(selects) == 1
+        (update,) = AuditLog.query.filter_by(entity='category', action='update').all()
+        assert json.loads(update.old_values)['category_name'] == 'food'
+        assert json.loads(update.new_values)['category_name'] == 'meals'
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,91 @@
+# งบประมาณของผู้ใช้คนหนึ่งต้องไม่ถูกกระทบจากธุรกรรมของผู้ใช้อื่น (แม้จะส่ง category_id ของคนอื่นมา)
+
+from datetime import date
+from decimal import Decimal
+
+from tests.conftest import login
+
+
+def setup_users(app):
+    bob = login(app, 'bob')
+    bob.post('/add_wallet', data={'wallet_name': 'bob wallet'})
+    bob.post('/add_category', data={'category_name': 'bobFood', 'category_type': 'expense'})
+    bob.post('/set_budget', data={'category_id': 1, 'amount': '80'})
+
+    alice = login(app, 'alice')
+    alice.post('/add_wallet', data={'wallet_name': 'alice wallet'})
+    alice.post('/add_category', data={'category_name': 'aliceFood', 'category_type': 'expense'})
+    return bob, alice
+
+
+def bob_budget_state(app):
+    from app import BudgetUsage, Notification, User, db
+
+    with app.app_context():
+        bob_id = db.session.query(User.user_id).filter_by(username='bob').scalar()
+        spent = [usage.spent for usage in BudgetUsage.query.all()]
+        notifications = Notification.query.filter_by(user_id=bob_id).count()
+    return spent, notifications
+
+
+def test_add_transaction_rejects_other_users_category(app):
+    bob, alice = setup_users(app)
+    response = alice.post('/add_transaction', data={
+        'wallet_id': 2, 'amount': '95', 'date': date.today().isoformat(), 'type': 'expense',
+        'category_id': 1, 'description': 'not my category'})
+    assert response.status_code == 302
+
+    from app import Transaction
+    with app.app_context():
+        assert Transaction.query.count() == 0
+    assert bob_budget_state(app) == ([], 0)
+
+
+def test_edit_transaction_rejects_other_users_category(app):
+    bob, alice = setup_users(app)
+    today = date.today().isoformat()
+    alice.post('/add_transaction', data={'wallet_id': 2, 'amount': '95', 'date': today, 'type': 'expense',
+                                         'category_id': 2, 'description': 'lunch'})
+    alice.post('/edit_transaction/1', data={'wallet_id': 2, 'amount': '95', 'date': today, 'type': 'expense',
+                                            'category_id': 1, 'description': 'lunch'})
+
+    from app import Transaction
+    with app.app_context():
+        assert Transaction.query.one().category_id == 2
+    assert bob_budget_state(app) == ([], 0)
+
+
+def test_rejects_category_with_wrong_type(app):
+    bob, alice = setup_users(app)
+    alice.post('/add_transaction', data={'wallet_id': 2, 'amount': '5', 'date': date.today().isoformat(),
+                                         'type': 'income', 'category_id': 2})
+
+    from app import Transaction
+    with app.app_context():
+        assert Transaction.query.count() == 0
+
+
+def test_budget_usage_counts_only_budget_owners_wallets(app):
+    # เขียนตรงผ่านโมเดล (ข้ามการตรวจของหน้าเว็บ) -> ชั้นงบเองก็ต้องไม่นับกระเป๋าของคนอื่น
+    bob, alice = setup_users(app)
+    from app import Transaction, apply_transaction_effects, db, rebuild_budget_usage, snapshot_transaction
+
+    with app.app_context():
+        foreign = Transaction(description='x', amount=Decimal('95'), date=date.today(), type='expense',
+                              wallet_id=2, category_id=1)
+        db.session.add(foreign)
+        db.session.flush()
+        apply_transaction_effects(new=snapshot_transaction(foreign))
+        db.session.commit()
+    assert bob_budget_state(app) == ([], 0)
+
+    with app.app_context():
+        rebuild_budget_usage()
+        db.session.commit()
+    assert bob_budget_state(app) == ([], 0)
+
+    # ธุรกรรมของ bob เองยังนับตามปกติ
+    bob.post('/add_transaction', data={'wallet_id': 1, 'amount': '70', 'date': date.today().isoformat(),
+                                       'type': 'expense', 'category_id': 1})
+    spent, notifications = bob_budget_state(app)
+    assert spent == [Decimal('70.00')] and notifications == 1
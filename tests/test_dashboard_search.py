@@ -0,0 +1,25 @@
+# ยอดรวมบน dashboard ต้องใช้ Filter เดียวกับรายการธุรกรรม (รวมคำค้นหา q) ไม่อย่างนั้นยอดไม่ตรงกับแถวที่เห็น
+
+from datetime import date
+
+from tests.conftest import login
+
+
+def test_dashboard_totals_follow_search_filter(app):
+    client = login(app, 'bob')
+    client.post('/add_wallet', data={'wallet_name': 'cash'})
+    client.post('/add_category', data={'category_name': 'food', 'category_type': 'expense'})
+    client.post('/add_category', data={'category_name': 'pay', 'category_type': 'income'})
+    today = date.today().isoformat()
+    for description, amount, tx_type, category_id in (('salary', '1000', 'income', 2),
+                                                      ('coffee beans', '30', 'expense', 1),
+                                                      ('rent', '500', 'expense', 1)):
+        client.post('/add_transaction', data={'wallet_id': 1, 'amount': amount, 'type': tx_type, 'date': today,
+                                              'category_id': category_id, 'description': description})
+
+    unfiltered = client.get('/dashboard?fragment=results').get_data(as_text=True)
+    assert '฿ 470.00' in unfiltered
+
+    filtered = client.get('/dashboard?fragment=results&q=coffee').get_data(as_text=True)
+    assert 'coffee beans' in filtered and 'rent' not in filtered
+    assert '฿ -30.00' in filtered
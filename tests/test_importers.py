@@ -0,0 +1,43 @@
+# ยอดเงินที่ไม่ใช่ตัวเลขจำกัด (nan/inf) หรือใหญ่เกินคอลัมน์ amount ต้องถูกข้ามเป็นแถวผิดพลาด ไม่ใช่ 500
+
+import io
+from decimal import Decimal
+
+from importers import ImportRowError, iter_csv_rows, iter_ofx_rows
+from tests.conftest import login
+
+BAD_AMOUNTS_CSV = '''date,amount,description
+2024-01-01,nan,not a number
+2024-01-02,-Infinity,infinite
+2024-01-03,1e30,overflow
+2024-01-04,100000000,just too large
+2024-01-05,"-1,012.50",lunch
+'''
+
+
+def test_csv_rejects_non_finite_and_oversized_amounts():
+    rows = list(iter_csv_rows(io.StringIO(BAD_AMOUNTS_CSV)))
+    errors = [row for row in rows if isinstance(row, ImportRowError)]
+    assert [error.line for error in errors] == [2, 3, 4, 5]
+    (valid,) = [row for row in rows if not isinstance(row, ImportRowError)]
+    assert valid['amount'] == Decimal('1012.50') and valid['type'] == 'expense'
+
+
+def test_ofx_rejects_non_finite_amount():
+    ofx = ('<OFX><STMTTRN><DTPOSTED>20240101<TRNAMT>NaN<NAME>bad</STMTTRN>'
+           '<STMTTRN><DTPOSTED>20240102<TRNAMT>-5.00<NAME>ok</STMTTRN></OFX>')
+    rows = list(iter_ofx_rows(io.StringIO(ofx)))
+    assert isinstance(rows[0], ImportRowError) and rows[0].line == 1
+    assert rows[1]['amount'] == Decimal('5.00')
+
+
+def test_import_page_skips_bad_amount_rows(app):
+    from app import Transaction
+
+    client = login(app, 'bob')
+    client.post('/add_wallet', data={'wallet_name': 'cash'})
+    response = client.post('/import', data={'wallet_id': 1, 'file': (io.BytesIO(BAD_AMOUNTS_CSV.encode()), 'a.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 302
+    with app.app_context():
+        assert [t.amount for t in Transaction.query.all()] == [Decimal('1012.50')]
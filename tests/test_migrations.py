@@ -0,0 +1,60 @@
+# อัปเกรดฐานข้อมูลที่มีข้อมูลอยู่แล้ว -> ตารางสรุปต้องได้ยอดจากธุรกรรมเดิมทันที (ไม่ต้องรันคำสั่ง rebuild เอง)
+
+from sqlalchemy import text
+
+import migrations
+
+EXISTING_ROWS = [
+    "INSERT INTO users (user_id, username, password_hash) VALUES (1, 'old', 'x'), (2, 'other', 'x')",
+    "INSERT INTO wallets (wallet_id, wallet_name, user_id) VALUES (1, 'cash', 1), (2, 'bank', 1), (3, 'empty', 2)",
+    "INSERT INTO categories (category_id, category_name, type, user_id) "
+    "VALUES (1, 'food', 'expense', 1), (2, 'pay', 'income', 1)",
+    "INSERT INTO transactions (description, amount, date, type, wallet_id, category_id) VALUES "
+    "('salary', 1000.10, '2024-01-25', 'income', 1, 2), "
+    "('lunch', 45.25, '2024-01-26', 'expense', 1, 1), "
+    "('dinner', 100.05, '2024-02-03', 'expense', 1, 1), "
+    "('misc', 12.00, '2024-02-04', 'expense', 1, NULL), "
+    "('transfer', 500.00, '2024-02-05', 'income', 2, NULL)",
+]
+
+
+def legacy_app(tmp_path):
+    # ฐานข้อมูลเวอร์ชัน 1 (ก่อนมีตารางสรุป) ที่มีข้อมูลอยู่แล้ว แล้วอัปเกรดเป็นเวอร์ชันล่าสุด
+    from app import create_app, db
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'legacy.db'), 'SECRET_KEY': 'test'},
+                     instance_path=str(tmp_path / 'instance'))
+    with app.app_context():
+        migrations.upgrade(db.engine, target=1, echo=lambda message: None)
+        with db.engine.begin() as connection:
+            for statement in EXISTING_ROWS:
+                connection.execute(text(statement))
+        migrations.upgrade(db.engine, echo=lambda message: None)
+    return app
+
+
+def test_upgrade_backfills_wallet_balances(tmp_path):
+    app = legacy_app(tmp_path)
+    result = app.test_cli_runner().invoke(args=['balances', 'verify'])
+    assert result.exit_code == 0, result.output
+    assert 'All 3 wallet balances are in sync' in result.output
+
+
+def test_upgrade_backfills_monthly_rollups(tmp_path):
+    from app import MonthlyRollup, db
+
+    def rollups():
+        with app.app_context():
+            return sorted(((r.user_id, r.wallet_id, r.category_id or 0, r.type, r.year, r.month, r.total, r.tx_count)
+                           for r in MonthlyRollup.query.all()))
+
+    app = legacy_app(tmp_path)
+    backfilled = rollups()
+    assert len(backfilled) == 5
+
+    # ต้องตรงกับผลของ "flask rollups rebuild" ทุกแถว
+    result = app.test_cli_runner().invoke(args=['rollups', 'rebuild'])
+    assert result.exit_code == 0, result.output
+    assert backfilled == rollups()
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,32 @@
+# ตรวจสิทธิ์กระเป๋า/หมวดหมู่จากฐานข้อมูล ไม่ใช่จาก Cache
+# CACHE_BACKEND=memory แยกกันคนละ worker -> จำลอง 2 worker ด้วย 2 แอปที่ใช้ฐานข้อมูลเดียวกันแต่ Cache คนละชุด
+
+from datetime import date
+
+from tests.conftest import login, make_app
+
+
+def test_stale_cache_in_other_worker_cannot_write_into_reused_wallet_id(tmp_path):
+    from app import Transaction, db
+
+    worker_a, worker_b = make_app(tmp_path), make_app(tmp_path)
+    bob_a = login(worker_a, 'bob')
+    bob_a.post('/add_wallet', data={'wallet_name': 'bob cash'})
+    bob_a.post('/add_category', data={'category_name': 'food', 'category_type': 'expense'})
+    bob_b = login(worker_b, 'bob')
+    assert bob_b.get('/dashboard').status_code == 200  # worker B เก็บกระเป๋า 1 ของ bob ไว้ใน Cache
+
+    bob_a.post('/delete_wallet/1')
+    alice = login(worker_a, 'alice')
+    alice.post('/add_wallet', data={'wallet_name': 'alice savings'})  # SQLite ใช้ wallet_id 1 ซ้ำ
+
+    response = bob_b.post('/add_transaction', data={'wallet_id': 1, 'amount': '10', 'type': 'expense',
+                                                    'category_id': 1, 'date': date.today().isoformat()})
+    assert response.status_code == 302
+    assert bob_b.post('/api/v1/transactions', json={'wallet_id': 1, 'amount': '10', 'type': 'expense',
+                                                    'date': '2024-01-01'}).status_code == 400
+    with worker_a.app_context():
+        assert Transaction.query.count() == 0
+    for worker in (worker_a, worker_b):
+        with worker.app_context():
+            db.engine.dispose()
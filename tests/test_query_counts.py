@@ -0,0 +1,59 @@
+# จำนวน SQL ต่อ request ต้องคงที่ ไม่ว่าผู้ใช้จะมีธุรกรรมกี่แถว (กัน N+1 query กลับมา)
+# seed ข้อมูลด้วย benchmarks.seed (ข้อมูลชุดเดียวกับ benchmark) ขนาดเล็กและใหญ่ แล้วเทียบจำนวนคำสั่ง
+
+from tests.conftest import make_app
+
+# Filter ทั้งประวัติ (ค่าเริ่มต้นของ dashboard คือเดือนนี้เท่านั้น)
+ALL_TIME = 'date_from=2000-01-01'
+PAGES = (f'/dashboard?{ALL_TIME}', '/wallet/1', f'/api/transactions?{ALL_TIME}', '/api/wallet/1/transactions')
+
+
+def count_statements(app, client, url):
+    from app import db
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    db.event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        db.event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, url
+    return len(statements), response
+
+
+def seeded_counts(tmp_path, transactions_per_user):
+    from app import TRANSACTION_PAGE_SIZE, db
+    from benchmarks.seed import PASSWORD, seed_ledger
+
+    app = make_app(tmp_path)
+    with app.app_context():
+        seed_ledger(users=2, wallets_per_user=3, categories_per_user=6,
+                    transactions_per_user=transactions_per_user, echo=lambda message: None)
+    client = app.test_client()
+    client.post('/login', data={'username': 'user1', 'password': PASSWORD})
+
+    counts = {}
+    for url in PAGES:
+        # ครั้งแรก (Cache ว่าง) และครั้งที่สอง (Cache อุ่นแล้ว)
+        counts[url] = [count_statements(app, client, url)[0] for _ in range(2)]
+    # หน้าที่ 2 ของตารางธุรกรรม (ตาม cursor ที่หน้าแรกส่งมา)
+    _, first_page = count_statements(app, client, f'/api/transactions?{ALL_TIME}')
+    cursor = first_page.get_json()['next_cursor']
+    assert cursor, 'ต้องมีข้อมูลมากกว่า 1 หน้า'
+    assert len(first_page.get_json()['transactions']) == TRANSACTION_PAGE_SIZE
+    counts['next page'] = count_statements(app, client, f'/api/transactions?{ALL_TIME}&cursor={cursor}')[0]
+    with app.app_context():
+        db.engine.dispose()
+    return counts
+
+
+def test_statement_count_does_not_grow_with_rows(tmp_path):
+    small = seeded_counts(tmp_path / 'small', 120)
+    big = seeded_counts(tmp_path / 'big', 1500)
+    assert small == big
@@ -0,0 +1,29 @@
+# งบเวลาเริ่มต้นของ worker (import app.py / create_app()) วัดใน process ใหม่เหมือน benchmarks.startup
+
+import os
+import statistics
+
+from benchmarks.startup import CREATE_BUDGET, FIRST_REQUEST_BUDGET, IMPORT_BUDGET, ROOT, measure_startup
+
+
+def test_startup_within_budget(tmp_path):
+    repo_instance = os.path.join(ROOT, 'instance')
+    existed = os.path.exists(repo_instance)
+
+    _, runs = measure_startup(str(tmp_path), runs=3)
+
+    assert statistics.median(run['import'] for run in runs) < IMPORT_BUDGET
+    assert statistics.median(run['create_app'] for run in runs) < CREATE_BUDGET
+    assert statistics.median(run['first'] for run in runs) < FIRST_REQUEST_BUDGET
+    # ทุกอย่างที่ process ลูกสร้างอยู่ใน tmp_path ไม่ใช่ instance/ ของโปรเจกต์
+    assert os.path.exists(repo_instance) == existed
+
+
+def test_create_app_uses_given_instance_path(tmp_path):
+    # ไฟล์ที่แอปสร้างเอง (audit spool) ตามไปอยู่ใน instance path ที่ส่งมา
+    from app import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'x.db'), 'SECRET_KEY': 'test',
+                      'AUDIT_LOG': True}, instance_path=str(tmp_path / 'instance'))
+    assert app.instance_path == str(tmp_path / 'instance')
+    assert app.extensions['audit'].spool_dir == str(tmp_path / 'instance' / 'audit-spool')
@@ -0,0 +1,38 @@
+# ฟอร์มเพิ่ม/แก้ไขธุรกรรม: ยอดเงินต้องแปลงเป็น Decimal 2 ตำแหน่งก่อนคำนวณยอดสะสม
+# ยอดที่ผิดรูปแบบ -> flash แล้ว redirect (ไม่ใช่ 500) และยอดสะสมต้องตรงกับยอดที่บันทึกจริงเสมอ
+
+from datetime import date
+
+from tests.conftest import login
+
+
+def test_form_amounts_are_validated_and_balances_match_stored_rows(app):
+    from app import Transaction, WalletBalance, db
+
+    client = login(app, 'bob')
+    client.post('/add_wallet', data={'wallet_name': 'cash'})
+    client.post('/add_category', data={'category_name': 'food', 'category_type': 'expense'})
+    today = date.today().isoformat()
+
+    def add(amount, day=today):
+        return client.post('/add_transaction', data={'wallet_id': 1, 'amount': amount, 'type': 'expense',
+                                                     'category_id': 1, 'date': day})
+
+    for bad_amount in ('abc', 'nan', 'Infinity', '-5', '0', '1e30', ''):
+        assert add(bad_amount).status_code == 302
+    assert add('10', day='not-a-date').status_code == 302
+    assert add('1.005').status_code == 302
+    with app.app_context():
+        (row,) = Transaction.query.all()
+        assert str(row.amount) == '1.00'
+        assert db.session.get(WalletBalance, 1).expense_total == row.amount
+
+    assert client.post('/edit_transaction/1', data={'wallet_id': 1, 'amount': 'abc', 'type': 'expense',
+                                                    'category_id': 1, 'date': today}).status_code == 302
+    client.post('/edit_transaction/1', data={'wallet_id': 1, 'amount': '2.675', 'type': 'expense',
+                                             'category_id': 1, 'date': today})
+    with app.app_context():
+        row = db.session.get(Transaction, 1)
+        assert str(row.amount) == '2.68'
+        assert db.session.get(WalletBalance, 1).expense_total == row.amount
+    assert app.test_cli_runner().invoke(args=['balances', 'verify']).exit_code == 0
@@ -0,0 +1,26 @@
+# load_user อ่านผู้ใช้จาก Cache: ต้องได้แถวที่ผูกกับ Session (อ่านคอลัมน์อื่นได้) และไม่ค้างค่าเก่าหลังแก้ข้อมูลผู้ใช้
+
+from app import User, bcrypt, db, load_user
+from tests.conftest import PASSWORD, login
+
+
+def test_cached_user_is_attached_to_session(app):
+    login(app, 'bob')
+    with app.test_request_context():
+        load_user(1)  # เติม Cache
+        db.session.remove()
+
+        user = load_user(1)
+        assert db.inspect(user).persistent
+        assert bcrypt.check_password_hash(user.password_hash, PASSWORD)  # คอลัมน์ที่ไม่ได้เก็บโหลดจากฐานข้อมูล
+
+
+def test_cached_user_is_forgotten_after_update(app):
+    login(app, 'bob')
+    with app.test_request_context():
+        assert load_user(1).username == 'bob'
+        db.session.get(User, 1).username = 'robert'
+        db.session.commit()
+        db.session.remove()
+
+        assert load_user(1).username == 'robert'
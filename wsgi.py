@@ -0,0 +1,11 @@
+# --- จุดเริ่มต้นแบบ WSGI (สำหรับ gunicorn) ---
+#
+# วิธีรัน:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# แอปถูกสร้างตอน import ไฟล์นี้ -> ถ้าเปิด --preload (ค่าเริ่มต้นใน gunicorn.conf.py)
+# gunicorn จะ import แค่ครั้งเดียวใน master แล้ว fork ให้ทุก worker (worker เกิดเร็ว ใช้หน่วยความจำร่วมกัน)
+
+from app import create_app
+
+app = create_app()